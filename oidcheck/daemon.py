@@ -0,0 +1,331 @@
+# oidcheck/daemon.py
+"""
+Resident validation daemon serving requests over a Unix domain socket.
+
+Each message, in both directions, is a 4-byte big-endian length followed by
+that many bytes of UTF-8 JSON. Requests look like
+{"op": "validate", "values": {...}, "level": "standard"} or {"op": "ping"};
+responses carry either "results" or "error".
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional
+
+_HEADER = struct.Struct(">I")
+
+# Upper bound on a single message, so a bad client cannot exhaust memory
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+# Seconds the client waits for a daemon to accept and answer a ping before
+# validating in-process instead
+CONNECT_TIMEOUT = 1.0
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon rejects a request or the protocol is violated."""
+
+
+def _private_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), f"oidcheck-{os.getuid()}")
+
+
+def default_socket_path() -> str:
+    """
+    Returns the socket path from OIDCHECK_SOCKET, or a per-user default.
+
+    The default lives in XDG_RUNTIME_DIR when set, otherwise in a directory of
+    the system temporary directory that only the user can access.
+    """
+    path = os.environ.get("OIDCHECK_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "oidcheck.sock")
+    return os.path.join(_private_dir(), "daemon.sock")
+
+
+def _owned_privately(st: os.stat_result) -> bool:
+    return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def is_trusted_socket(path: str) -> bool:
+    """
+    Whether path is a socket owned by the current user and closed to others.
+
+    The CLI sends configuration values, secrets included, to the daemon, so
+    it must not talk to a socket another local user could have created.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and _owned_privately(st)
+
+
+def _peer_is_current_user(sock: socket.socket) -> bool:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True  # Not available off Linux; is_trusted_socket still applies
+    credentials = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise DaemonError("Connection closed mid-message")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one length-prefixed JSON message."""
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """
+    Receive one length-prefixed JSON message.
+
+    Returns:
+        The decoded message, or None if the peer closed the connection cleanly
+
+    Raises:
+        DaemonError: If the message is truncated or larger than MAX_MESSAGE_SIZE
+    """
+    header = sock.recv(_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _HEADER.size:
+        header += _recv_exactly(sock, _HEADER.size - len(header))
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise DaemonError(f"Message of {size} bytes exceeds {MAX_MESSAGE_SIZE}")
+    return json.loads(_recv_exactly(sock, size))
+
+
+def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one daemon request in-process.
+
+    Args:
+        request: A decoded request message
+
+    Returns:
+        The response message
+    """
+    from .models import AppConfig
+    from .validator import DEFAULT_LEVEL, validate_config
+
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True}
+    if op != "validate":
+        return {"error": f"Unknown op '{op}'"}
+
+    try:
+        config = AppConfig(**request.get("values", {}))
+        results = validate_config(config, level=request.get("level", DEFAULT_LEVEL))
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+    return {"results": results}
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        # A connection may carry any number of requests, answered in order
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (DaemonError, ValueError) as e:
+                send_message(self.request, {"error": str(e)})
+                return
+            if request is None:
+                return
+            send_message(self.request, handle_request(request))
+
+
+class ValidationDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix-socket server answering validation requests."""
+
+    daemon_threads = True
+
+
+def daemon_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for the ``oidcheck daemon`` command."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="oidcheck daemon",
+        description="Serve validation requests from a resident, warmed-up process",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Unix socket to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--prime-authorities",
+        action="store_true",
+        help="Fetch authority metadata for the known clouds at startup",
+    )
+    args = parser.parse_args(argv)
+    serve(args.socket, args.prime_authorities)
+
+
+def create_server(path: str) -> ValidationDaemon:
+    """
+    Listen on a socket that only the current user can connect to.
+
+    The per-user directory of the default path is created if needed.
+
+    Raises:
+        DaemonError: If the default directory exists but is not private to
+            the user, since another user could then replace the socket
+    """
+    directory = os.path.dirname(path)
+    if directory == _private_dir():
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        st = os.lstat(directory)
+        if not (stat.S_ISDIR(st.st_mode) and _owned_privately(st)):
+            raise DaemonError(f"{directory} is not a directory private to this user")
+
+    previous_umask = os.umask(0o177)  # Socket readable by the owner only
+    try:
+        return ValidationDaemon(path, _RequestHandler)
+    finally:
+        os.umask(previous_umask)
+
+
+def serve(socket_path: Optional[str] = None, prime_authorities: bool = False) -> None:
+    """
+    Warm up and serve validation requests until interrupted.
+
+    Args:
+        socket_path: Where to listen; defaults to default_socket_path()
+        prime_authorities: Fetch authority metadata for the known clouds first
+    """
+    from .models import AppConfig
+    from .validator import prime_authority_metadata
+
+    import msal  # noqa: F401
+
+    AppConfig.model_validate(
+        {"scope": "openid profile", "redirect_uri": "https://localhost/callback"}
+    )
+    if prime_authorities:
+        prime_authority_metadata()
+
+    path = socket_path or default_socket_path()
+    if os.path.lexists(path):
+        # A live daemon answers; anything else is a stale socket file
+        client = DaemonClient.connect(path)
+        if client is not None:
+            client.close()
+            raise DaemonError(f"A daemon is already listening on {path}")
+        os.unlink(path)
+
+    server = create_server(path)
+
+    def _stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    # Service managers stop daemons with SIGTERM; clean up the socket then too
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+class DaemonClient:
+    """A connection to a running daemon."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+
+    @classmethod
+    def connect(
+        cls,
+        socket_path: Optional[str] = None,
+        timeout: float = 30.0,
+        connect_timeout: float = CONNECT_TIMEOUT,
+    ) -> Optional["DaemonClient"]:
+        """
+        Connect to the daemon, returning None if none is running.
+
+        Sockets not owned by the current user, or open to other users, are
+        ignored, as is a daemon that does not answer a ping within
+        connect_timeout.
+
+        Args:
+            socket_path: The daemon's socket; defaults to default_socket_path()
+            timeout: Seconds to wait on each send or receive once connected
+            connect_timeout: Seconds to wait for the connection and the ping
+        """
+        path = socket_path or default_socket_path()
+        if not is_trusted_socket(path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(connect_timeout)
+        client = cls(sock)
+        try:
+            sock.connect(path)
+            alive = _peer_is_current_user(sock) and client.request({"op": "ping"}) == {
+                "ok": True
+            }
+        except (OSError, DaemonError, ValueError):
+            alive = False
+        if not alive:
+            client.close()
+            return None
+        sock.settimeout(timeout)
+        return client
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request and wait for its response."""
+        send_message(self.sock, message)
+        response = recv_message(self.sock)
+        if response is None:
+            raise DaemonError("Daemon closed the connection")
+        return response
+
+    def validate(self, values: Dict[str, Any], level: str) -> List[Dict[str, Any]]:
+        """
+        Validate configuration values in the daemon.
+
+        Raises:
+            DaemonError: If the daemon could not validate the values
+        """
+        response = self.request({"op": "validate", "values": values, "level": level})
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response["results"]
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
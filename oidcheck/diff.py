@@ -0,0 +1,111 @@
+# oidcheck/diff.py
+"""
+Diff-mode validation between two versions of a configuration.
+"""
+
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from .models import AppConfig
+from .profiling import NULL_TIMER, StageTimer
+from .validator import DEFAULT_LEVEL, Rule, get_rules, run_rule
+
+if TYPE_CHECKING:
+    from .fingerprint import FingerprintIndex
+
+
+def changed_fields(old: AppConfig, new: AppConfig) -> Set[str]:
+    """
+    Returns the names of the AppConfig fields whose values differ.
+
+    Args:
+        old: The baseline configuration
+        new: The configuration being promoted
+    """
+    return {
+        name
+        for name in AppConfig.model_fields
+        if getattr(old, name) != getattr(new, name)
+    }
+
+
+def _finding_key(result: Dict[str, Any]) -> Tuple[str, str]:
+    return result["level"], result["message"]
+
+
+def diff_configs(
+    old: AppConfig,
+    new: AppConfig,
+    level: str = DEFAULT_LEVEL,
+    timer: StageTimer = NULL_TIMER,
+    plan: Optional[Tuple[Rule, ...]] = None,
+    index: Optional["FingerprintIndex"] = None,
+) -> Dict[str, Any]:
+    """
+    Validates two versions of a configuration and classifies their findings.
+
+    Every rule runs against the old configuration, but only rules that read a
+    changed field run against the new one; the old findings of the remaining
+    rules are reused as unchanged, so an unchanged MSAL configuration never
+    builds a second MSAL client. With an index, findings are also reused
+    across calls, so diffing many services that share settings evaluates
+    each rule once per distinct group (including the auth URL of the "full"
+    level).
+
+    Args:
+        old: The baseline configuration
+        new: The configuration being promoted
+        level: The validation level, see validate_config
+        timer: Records time spent in each validation stage
+        plan: The rules to run instead of those of the level, see validate_config
+        index: Caches findings across calls; its rules are run instead of
+            those of the level or plan
+
+    Returns:
+        A dictionary with the sorted "changed_fields", the "added", "removed" and
+        "unchanged" findings, and the names of the "rerun_rules".
+
+    Raises:
+        ValueError: If the validation level is unknown
+    """
+    changed = changed_fields(old, new)
+    added: List[Dict[str, Any]] = []
+    removed: List[Dict[str, Any]] = []
+    unchanged: List[Dict[str, Any]] = []
+    rerun_rules: List[str] = []
+
+    if index is not None:
+        rules = index.rules
+        run = index.run_rule
+    else:
+        rules = plan if plan is not None else get_rules(level)
+        run = run_rule
+
+    for rule in rules:
+        old_results = run(rule, old, timer)
+        if changed.isdisjoint(rule.fields):
+            unchanged.extend(old_results)
+            continue
+
+        rerun_rules.append(rule.name)
+        new_results = run(rule, new, timer)
+        remaining = Counter(_finding_key(r) for r in old_results)
+        for result in new_results:
+            key = _finding_key(result)
+            if remaining[key]:
+                remaining[key] -= 1
+                unchanged.append(result)
+            else:
+                added.append(result)
+        for result in old_results:
+            key = _finding_key(result)
+            if remaining[key]:
+                remaining[key] -= 1
+                removed.append(result)
+
+    return {
+        "changed_fields": sorted(changed),
+        "added": added,
+        "removed": removed,
+        "unchanged": unchanged,
+        "rerun_rules": rerun_rules,
+    }
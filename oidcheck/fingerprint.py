@@ -0,0 +1,225 @@
+# oidcheck/fingerprint.py
+"""
+Fingerprint index for deduplicating validation across many configurations.
+
+Each rule only reads a few AppConfig fields (Rule.fields), so configurations
+that agree on those fields get the same findings from it. The index keys
+each rule's findings by a hash of the inputs it depends on (Rule.inputs, or
+the values of its fields) and evaluates a rule once per distinct key, however
+many configurations share it. Keys are hashed so the index never holds
+configuration values such as client secrets.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .models import AppConfig
+from .profiling import NULL_TIMER, StageTimer
+from .validator import DEFAULT_LEVEL, Rule, get_rules, run_rule, run_rule_async
+
+_GroupKey = Tuple[str, str]
+
+# Groups kept by default before the least recently used are evicted
+DEFAULT_MAX_GROUPS = 10000
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def config_fingerprint(config: AppConfig, fields: Iterable[str]) -> Tuple[Any, ...]:
+    """
+    Returns a hashable fingerprint of the given fields of a configuration.
+
+    Args:
+        config: The configuration to fingerprint
+        fields: Names of the AppConfig fields to include, in order
+    """
+    return tuple(_freeze(getattr(config, name)) for name in fields)
+
+
+def rule_fingerprint(rule: Rule, config: AppConfig) -> str:
+    """
+    Returns a SHA-256 digest of the inputs a rule's findings depend on.
+
+    Args:
+        rule: The rule
+        config: The configuration it validates
+    """
+    if rule.inputs is not None:
+        values = _freeze(rule.inputs(config))
+    else:
+        values = config_fingerprint(config, rule.fields)
+    canonical = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FingerprintIndex:
+    """
+    Validates configurations, evaluating each rule once per distinct group.
+
+    Findings of up to max_groups groups are kept, least recently used first
+    out, so configurations validated in later batches reuse the groups of
+    earlier ones. Every configuration gets its own copies of the findings, in
+    the order validate_config would return them.
+
+    Args:
+        level: The validation level, see validate_config
+        plan: The rules to run instead of those of the level, see validate_config
+        max_groups: Groups to keep between batches
+
+    Raises:
+        ValueError: If the validation level is unknown or max_groups is not positive
+    """
+
+    def __init__(
+        self,
+        level: str = DEFAULT_LEVEL,
+        plan: Optional[Tuple[Rule, ...]] = None,
+        max_groups: int = DEFAULT_MAX_GROUPS,
+    ) -> None:
+        if max_groups < 1:
+            raise ValueError(f"max_groups must be positive, got {max_groups}")
+        self.rules = plan if plan is not None else get_rules(level)
+        self.max_groups = max_groups
+        self.configs = 0
+        self.evaluations = 0
+        self._groups = {rule.name: 0 for rule in self.rules}
+        self._findings: Dict[_GroupKey, List[Dict[str, Any]]] = {}
+
+    def _plan(
+        self, configs: List[AppConfig]
+    ) -> Tuple[List[List[_GroupKey]], Dict[_GroupKey, Tuple[Rule, AppConfig]]]:
+        keys = []
+        pending: Dict[_GroupKey, Tuple[Rule, AppConfig]] = {}
+        for config in configs:
+            config_keys = []
+            for rule in self.rules:
+                key = (rule.name, rule_fingerprint(rule, config))
+                findings = self._findings.pop(key, None)
+                if findings is not None:
+                    # Most recently used groups are last
+                    self._findings[key] = findings
+                elif key not in pending:
+                    pending[key] = (rule, config)
+                    self._groups[rule.name] += 1
+                config_keys.append(key)
+            keys.append(config_keys)
+        self.configs += len(configs)
+        self.evaluations += len(pending)
+        return keys, pending
+
+    def _fan_out(self, keys: List[List[_GroupKey]]) -> List[List[Dict[str, Any]]]:
+        results = [
+            [dict(result) for key in config_keys for result in self._findings[key]]
+            for config_keys in keys
+        ]
+        # Evicted only now, as the batch may need more groups than are kept
+        self._evict()
+        return results
+
+    def _evict(self) -> None:
+        excess = len(self._findings) - self.max_groups
+        if excess > 0:
+            for key in list(self._findings)[:excess]:
+                del self._findings[key]
+
+    def run_rule(
+        self, rule: Rule, config: AppConfig, timer: StageTimer = NULL_TIMER
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs one rule against a configuration, reusing the findings of its group.
+
+        Unlike validate_many, this is not counted in stats().
+
+        Args:
+            rule: The rule, one of self.rules
+            config: The configuration to validate
+            timer: Records time spent in each validation stage
+
+        Returns:
+            Copies of the rule's findings
+        """
+        key = (rule.name, rule_fingerprint(rule, config))
+        findings = self._findings.pop(key, None)
+        if findings is None:
+            findings = run_rule(rule, config, timer)
+        self._findings[key] = findings
+        self._evict()
+        return [dict(result) for result in findings]
+
+    def validate_many(
+        self, configs: List[AppConfig], timer: StageTimer = NULL_TIMER
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Validates configurations, evaluating only groups not seen before.
+
+        Args:
+            configs: The configurations to validate
+            timer: Records time spent in each validation stage
+
+        Returns:
+            One list of findings per configuration, in input order
+        """
+        keys, pending = self._plan(configs)
+        for key, (rule, config) in pending.items():
+            self._findings[key] = run_rule(rule, config, timer)
+        return self._fan_out(keys)
+
+    async def validate_many_async(
+        self, configs: List[AppConfig], timer: StageTimer = NULL_TIMER
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Async version of validate_many.
+
+        Groups of blocking rules are evaluated concurrently, see run_rule_async;
+        the other rules are cheap and run inline.
+        """
+        keys, pending = self._plan(configs)
+        blocking = [key for key, (rule, _) in pending.items() if rule.blocking]
+        for key, (rule, config) in pending.items():
+            if not rule.blocking:
+                self._findings[key] = run_rule(rule, config, timer)
+        results = await asyncio.gather(
+            *(run_rule_async(*pending[key], timer) for key in blocking)
+        )
+        self._findings.update(zip(blocking, results))
+        return self._fan_out(keys)
+
+    def group_counts(self) -> Dict[str, int]:
+        """Returns the number of distinct groups evaluated for each rule."""
+        return dict(self._groups)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Summarizes the work saved by deduplication.
+
+        Returns:
+            A dictionary with the number of "configs", the rule "evaluations"
+            performed, the "naive_evaluations" one run per config and rule
+            would need, the evaluations "saved", and the distinct "groups"
+            of each rule.
+        """
+        naive = self.configs * len(self.rules)
+        return {
+            "configs": self.configs,
+            "evaluations": self.evaluations,
+            "naive_evaluations": naive,
+            "saved": naive - self.evaluations,
+            "groups": self.group_counts(),
+        }
+
+
+def format_dedup_stats(stats: Dict[str, Any]) -> str:
+    """Formats FingerprintIndex.stats() as a one-line summary."""
+    naive = stats["naive_evaluations"]
+    saved_pct = 100.0 * stats["saved"] / naive if naive else 0.0
+    return (
+        f"Deduplication: {stats['evaluations']} of {naive} rule evaluations "
+        f"for {stats['configs']} config(s), {saved_pct:.1f}% saved"
+    )
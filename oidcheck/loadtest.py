@@ -0,0 +1,426 @@
+# oidcheck/loadtest.py
+"""
+Load-test harness for the web service.
+
+Drives the form, form submissions and the health probes with a weighted mix
+of requests from concurrent workers, and reports throughput and latency
+percentiles. Requests go either through the Flask test client in-process,
+for network-free regression tracking in CI, or over HTTP to a running
+server. MSAL's requests to Microsoft login endpoints are answered by
+StubLoginBackend, both in-process and in a server serving load_test_app(),
+so results do not depend on the network.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+# Lowercase keys, which AppConfig reads
+_VALID_CONFIG = "\n".join(
+    [
+        "client_id=00000000-0000-0000-0000-000000000000",
+        "client_secret=loadtest-secret",
+        "tenant_id=loadtest.onmicrosoft.com",
+        "authority=https://login.microsoftonline.com/loadtest.onmicrosoft.com",
+        "redirect_uri=https://localhost/callback",
+        "scope=openid profile",
+        "log_level=INFO",
+    ]
+)
+_FLAWED_CONFIG = "\n".join(
+    [
+        "client_id=00000000-0000-0000-0000-000000000000",
+        "authority=https://login.microsoftonline.com/other-tenant",
+        "tenant_id=loadtest.onmicrosoft.us",
+        "redirect_uri=http://app.example.com/callback",
+        "scope=profile",
+        "log_level=DEBUG",
+    ]
+)
+
+# name -> (method, path, form fields); the web UI has no JSON API
+SCENARIOS: Dict[str, Tuple[str, str, Optional[Dict[str, str]]]] = {
+    "form": ("GET", "/", None),
+    "validate-quick": ("POST", "/", {"config": _VALID_CONFIG, "level": "quick"}),
+    "validate-standard": ("POST", "/", {"config": _VALID_CONFIG, "level": "standard"}),
+    "validate-full": ("POST", "/", {"config": _VALID_CONFIG, "level": "full"}),
+    "validate-flawed": ("POST", "/", {"config": _FLAWED_CONFIG, "level": "standard"}),
+    "ready": ("GET", "/health/ready", None),
+    "live": ("GET", "/health/live", None),
+}
+
+DEFAULT_MIX = "form=2,validate-standard=4,validate-quick=2,validate-flawed=1,ready=1"
+
+
+class _StubResponse:
+    def __init__(self, status_code: int, body: Dict[str, Any]) -> None:
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self.headers = {"Content-Type": "application/json"}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"Stub login backend returned {self.status_code}")
+
+
+class StubLoginBackend:
+    """
+    A requests-compatible HTTP client standing in for Microsoft login endpoints.
+
+    Answers MSAL's instance and tenant discovery for any host and tenant, after
+    an optional simulated network latency. Token requests are refused, since
+    validation never redeems credentials.
+
+    Args:
+        latency: Seconds to wait before answering each request
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _answer(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get(
+        self, url: str, params: Optional[Dict[str, str]] = None, **kwargs: Any
+    ) -> Any:
+        self._answer()
+        parsed = urlparse(url)
+        if parsed.path.endswith("/discovery/instance"):
+            endpoint = urlparse((params or {}).get("authorization_endpoint", ""))
+            tenant = endpoint.path.strip("/").split("/")[0] or "common"
+            return _StubResponse(
+                200,
+                {
+                    "tenant_discovery_endpoint": f"https://{endpoint.netloc}/{tenant}"
+                    "/v2.0/.well-known/openid-configuration",
+                    "api-version": "1.1",
+                    "metadata": [],
+                },
+            )
+        if parsed.path.endswith("/.well-known/openid-configuration"):
+            base = f"https://{parsed.netloc}/{parsed.path.strip('/').split('/')[0]}"
+            return _StubResponse(
+                200,
+                {
+                    "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                    "token_endpoint": f"{base}/oauth2/v2.0/token",
+                    "device_authorization_endpoint": f"{base}/oauth2/v2.0/devicecode",
+                    "issuer": f"{base}/v2.0",
+                },
+            )
+        return _StubResponse(404, {"error": "not_found"})
+
+    def post(self, url: str, **kwargs: Any) -> Any:
+        self._answer()
+        return _StubResponse(400, {"error": "invalid_request"})
+
+    def close(self) -> None:
+        pass
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    Parse a payload mix such as "form=2,validate-standard=5".
+
+    Raises:
+        ValueError: If a scenario is unknown or a weight is not a positive integer
+    """
+    weights: Dict[str, int] = {}
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}"
+            )
+        try:
+            weights[name] = int(weight or "1")
+        except ValueError:
+            raise ValueError(f"Invalid weight '{weight}' for scenario '{name}'")
+        if weights[name] < 1:
+            raise ValueError(f"Invalid weight '{weight}' for scenario '{name}'")
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class _InProcessTransport:
+    def __init__(self, app: Any) -> None:
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, str]]) -> int:
+        response = self.client.open(path, method=method, data=form)
+        response.close()
+        return response.status_code
+
+
+class _HttpTransport:
+    def __init__(self, base_url: str, timeout: float) -> None:
+        import http.cookiejar
+        import urllib.request
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        self._csrf_token: Optional[str] = None
+
+    def _open(self, path: str, data: Optional[bytes] = None) -> Tuple[int, bytes]:
+        import urllib.error
+
+        try:
+            with self.opener.open(self.base_url + path, data, self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, b""
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, str]]) -> int:
+        if form is None:
+            return self._open(path)[0]
+        if self._csrf_token is None:
+            import re
+
+            # One token per worker session, taken from the form
+            page = self._open("/")[1].decode("utf-8", "replace")
+            match = re.search(r'name="csrf_token" value="([^"]*)"', page)
+            self._csrf_token = match.group(1) if match else ""
+        body = urlencode({**form, "csrf_token": self._csrf_token}).encode("utf-8")
+        return self._open(path, body)[0]
+
+
+@contextmanager
+def _in_process_app(stub: StubLoginBackend) -> Iterator[Any]:
+    """The Flask app set up for load tests, restored to its settings afterwards."""
+    import os
+    import logging
+
+    from . import validator
+    from .server import app, limiter
+
+    csrf_enabled = app.config.get("WTF_CSRF_ENABLED", True)
+    limiter_enabled = limiter.enabled
+    app.config["WTF_CSRF_ENABLED"] = False
+    limiter.enabled = False
+    validator.set_msal_http_client(stub)
+
+    # The stub's discovery responses must not outlive the run in MSAL's cache
+    http_cache, discovered = validator._MSAL_HTTP_CACHE, validator._discovered
+    validator._MSAL_HTTP_CACHE, validator._discovered = {}, set()
+
+    # Audit records are still formatted, so their cost is measured, but console
+    # output is discarded; other sinks, such as an audit file, are left alone
+    handlers = [
+        h
+        for h in logging.getLogger("oidcheck").handlers
+        if isinstance(h, logging.StreamHandler)
+    ]
+    streams = [h.setStream(open(os.devnull, "w")) for h in handlers]
+    try:
+        yield app
+    finally:
+        for handler, stream in zip(handlers, streams):
+            devnull = handler.setStream(stream)
+            if devnull is not None:
+                devnull.close()
+        validator._MSAL_HTTP_CACHE, validator._discovered = http_cache, discovered
+        validator.set_msal_http_client(None)
+        limiter.enabled = limiter_enabled
+        app.config["WTF_CSRF_ENABLED"] = csrf_enabled
+
+
+def load_test_app() -> Any:
+    """
+    The Flask app configured to be load tested over HTTP.
+
+    MSAL's discovery requests are answered by StubLoginBackend instead of
+    Microsoft login endpoints, and rate limits are lifted. Serve it with
+    ``gunicorn 'oidcheck.loadtest:load_test_app()'``; never in production.
+
+    Returns:
+        The Flask app
+    """
+    from .server import app, limiter
+    from .validator import set_msal_http_client
+
+    set_msal_http_client(StubLoginBackend())
+    limiter.enabled = False
+    app.logger.warning("Serving for load tests: MSAL is stubbed, limits are off")
+    return app
+
+
+def run_load_test(
+    mix: str = DEFAULT_MIX,
+    requests: int = 500,
+    concurrency: int = 8,
+    url: Optional[str] = None,
+    seed: int = 0,
+    stub_latency: float = 0.0,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Run a load test and summarize its results.
+
+    Args:
+        mix: Weighted scenarios, see parse_mix and SCENARIOS
+        requests: Total number of requests to send
+        concurrency: Number of concurrent workers
+        url: Base URL of a running server; None runs in-process
+        seed: Seed for the order of scenarios, so runs are reproducible
+        stub_latency: Simulated login endpoint latency in seconds (in-process)
+        timeout: Seconds to wait for each HTTP response
+
+    Returns:
+        A report with overall and per-scenario counts, errors, throughput
+        and latency percentiles in milliseconds
+
+    Raises:
+        ValueError: If the mix is invalid
+    """
+    weights = parse_mix(mix)
+    rng = random.Random(seed)
+    schedule = iter(rng.choices(list(weights), list(weights.values()), k=requests))
+    schedule_lock = threading.Lock()
+    samples: List[Tuple[str, float, int]] = []
+    samples_lock = threading.Lock()
+
+    def worker(transport: Any) -> None:
+        local: List[Tuple[str, float, int]] = []
+        while True:
+            with schedule_lock:
+                name = next(schedule, None)
+            if name is None:
+                break
+            method, path, form = SCENARIOS[name]
+            start = time.perf_counter()
+            try:
+                status = transport.request(method, path, form)
+            except OSError:
+                status = 0
+            local.append((name, time.perf_counter() - start, status))
+        with samples_lock:
+            samples.extend(local)
+
+    def run(make_transport: Any) -> float:
+        transports = [make_transport() for _ in range(concurrency)]
+        threads = [threading.Thread(target=worker, args=(t,)) for t in transports]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    stub = StubLoginBackend(stub_latency)
+    if url is None:
+        with _in_process_app(stub) as app:
+            elapsed = run(lambda: _InProcessTransport(app))
+    else:
+        elapsed = run(lambda: _HttpTransport(url, timeout))
+
+    report: Dict[str, Any] = {
+        "mode": "http" if url else "in-process",
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "login_backend_requests": stub.requests if url is None else None,
+        "total": _summarize([s for s in samples], elapsed),
+        "scenarios": {
+            name: _summarize([s for s in samples if s[0] == name], elapsed)
+            for name in weights
+        },
+    }
+    return report
+
+
+def _summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latency * 1000 for _, latency, _ in samples)
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status in samples if not 200 <= status < 400),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+    }
+    if latencies:
+        for pct in (50, 90, 99):
+            summary[f"p{pct}_ms"] = round(percentile(latencies, pct), 2)
+        summary["max_ms"] = round(latencies[-1], 2)
+    return summary
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Format a load-test report as a table."""
+    header = f"{'scenario':<18} {'requests':>8} {'errors':>6} {'req/s':>8} "
+    header += f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    lines = [
+        f"{report['mode']} load test, {report['concurrency']} workers, "
+        f"{report['elapsed_s']} s",
+        header,
+    ]
+    rows = list(report["scenarios"].items()) + [("total", report["total"])]
+    for name, summary in rows:
+        line = f"{name:<18} {summary['requests']:>8} {summary['errors']:>6} "
+        line += f"{summary['throughput_rps']:>8}"
+        for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms"):
+            line += f" {summary.get(key, '-'):>8}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def loadtest_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for the ``oidcheck loadtest`` command."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="oidcheck loadtest",
+        description="Measure web service throughput and latency under load",
+    )
+    parser.add_argument(
+        "--url",
+        help="Base URL of a server serving oidcheck.loadtest:load_test_app(); "
+        "by default requests run in-process through the Flask test client",
+    )
+    parser.add_argument("--requests", "-n", type=int, default=500)
+    parser.add_argument("--concurrency", "-c", type=int, default=8)
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"Weighted scenarios from: {', '.join(SCENARIOS)} (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stub-latency",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Simulated login endpoint latency in milliseconds (in-process only)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        report = run_load_test(
+            args.mix,
+            args.requests,
+            args.concurrency,
+            args.url,
+            args.seed,
+            args.stub_latency / 1000,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if report["total"]["errors"]:
+        sys.exit(1)
@@ -0,0 +1,309 @@
+# oidcheck/log_sink.py
+"""
+Durable local file sink for audit logs.
+
+Records are appended to a buffered file that is rotated by size and,
+optionally, by age. Rotated segments are compressed and pruned in a
+background thread so that rotation never stalls the request being logged.
+
+Several processes may share one file, e.g. the workers of a preloaded
+gunicorn server: whole records are appended with O_APPEND, so records of
+different processes never interleave, and an advisory lock beside the file
+lets one process at a time rotate it.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+FSYNC_POLICIES = ("always", "batch", "never")
+COMPRESSIONS = ("gzip", "zstd", "none")
+
+
+def _compress_gzip(source: str) -> str:
+    target = source + ".gz"
+    with open(source, "rb") as src, gzip.open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return target
+
+
+def _compress_zstd(source: str) -> str:
+    import zstandard  # type: ignore[import-not-found]
+
+    target = source + ".zst"
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        zstandard.ZstdCompressor().copy_stream(src, dst)
+    return target
+
+
+class RotatingAuditFileHandler(logging.Handler):
+    """
+    Logging handler appending records to a size-capped, rotating file.
+
+    The background flush thread and compression worker are started by the
+    first record each process emits, so a handler created before a fork
+    works in every child; records buffered by the parent are written out by
+    the parent only.
+
+    Args:
+        path: The active log file; rotated segments sit beside it, named with
+            the time of rotation
+        max_bytes: Rotate before the file would exceed this size
+        rotate_interval: Also rotate after this many seconds, if given
+        backup_count: Number of rotated segments to keep
+        compression: "gzip", "zstd" (needs the zstandard package) or "none"
+        fsync: "always" flushes and fsyncs every record, "batch" does so every
+            flush_interval seconds, and "never" only flushes on that interval
+            and leaves durability to the operating system
+        buffer_size: Size of the append buffer in bytes
+        flush_interval: Seconds between background flushes
+
+    Raises:
+        ValueError: If the fsync policy or compression is unknown or unavailable
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 50 * 1024 * 1024,
+        rotate_interval: Optional[float] = None,
+        backup_count: int = 10,
+        compression: str = "gzip",
+        fsync: str = "batch",
+        buffer_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(
+                f"Unknown fsync policy '{fsync}'. Choose one of: {', '.join(FSYNC_POLICIES)}"
+            )
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}'. "
+                f"Choose one of: {', '.join(COMPRESSIONS)}"
+            )
+        if compression == "zstd":
+            try:
+                import zstandard  # type: ignore[import-not-found]  # noqa: F401
+            except ImportError:
+                raise ValueError(
+                    "zstd compression requires the zstandard package "
+                    "(pip install flask-oidc-config-validator[zstd])"
+                )
+        super().__init__()
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compression = compression
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+
+        directory, name = os.path.split(self.path)
+        self._lock_path = os.path.join(directory, f".{name}.lock")
+        self._buffer = bytearray()
+        self._dirty = False
+        self._open()
+
+        # Per-process state, see _check_process
+        self._pid = os.getpid()
+        self._lock_file = open(self._lock_path, "ab")
+        self._lock_file_mutex = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # One worker, so segments are compressed and pruned in rotation order
+        self._background: Optional[ThreadPoolExecutor] = None
+
+    def _check_process(self) -> None:
+        if self._pid == os.getpid():
+            return
+        # Forked: threads did not survive, the lock must not be shared with
+        # the parent, and the parent writes out what it had buffered
+        self._pid = os.getpid()
+        self._lock_file = open(self._lock_path, "ab")
+        self._lock_file_mutex = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self._background = None
+        self._buffer.clear()
+        self._dirty = False
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None and self.fsync != "always":
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, daemon=True
+            )
+            self._flusher.start()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Holds the advisory lock shared by every process writing the file.
+
+        Threads of one process share the lock file, and so its lock, so they
+        take turns through a thread lock first.
+        """
+        with self._lock_file_mutex:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _open(self) -> None:
+        # Unbuffered: records are buffered whole in self._buffer instead
+        self._file = open(self.path, "ab", buffering=0)
+        stat = os.fstat(self._file.fileno())
+        self._inode = stat.st_ino
+        self._size = stat.st_size + len(self._buffer)
+        self._rollover_at = (
+            time.time() + self.rotate_interval if self.rotate_interval else None
+        )
+
+    def _reopen_if_rotated(self) -> None:
+        try:
+            rotated = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._file.close()
+            self._open()
+
+    def _write_buffer(self) -> None:
+        """Appends the buffered records; the caller holds the file lock."""
+        self._reopen_if_rotated()
+        written = 0
+        with memoryview(self._buffer) as view:
+            while written < len(view):
+                written += self._file.write(view[written:])
+        self._buffer.clear()
+
+    def _sync(self) -> None:
+        if self._buffer:
+            with self._locked(exclusive=False):
+                self._write_buffer()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._dirty = False
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            with self.lock:  # type: ignore
+                if self._dirty and not self._file.closed:
+                    self._sync()
+
+    def _should_rotate(self, size: int) -> bool:
+        if self._size and self._size + size > self.max_bytes:
+            return True
+        return self._rollover_at is not None and time.time() >= self._rollover_at
+
+    def rotate(self) -> None:
+        """Close the active file, move it aside and start a new one."""
+        self._check_process()
+        with self._locked(exclusive=True):
+            self._write_buffer()
+            self._rotate_locked()
+
+    def _rotate_if_due(self, size: int) -> None:
+        with self._locked(exclusive=True):
+            self._write_buffer()
+            # Another process may have rotated the file while we waited
+            self._size = os.fstat(self._file.fileno()).st_size
+            if self._should_rotate(size):
+                self._rotate_locked()
+
+    def _rotate_locked(self) -> None:
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        segment = f"{self.path}.{stamp}"
+        os.replace(self.path, segment)
+        self._open()
+        if self._background is None:
+            self._background = ThreadPoolExecutor(max_workers=1)
+        self._background.submit(self._finish_segment, segment)
+
+    def _finish_segment(self, segment: str) -> None:
+        if self.compression == "gzip":
+            compressed = _compress_gzip(segment)
+        elif self.compression == "zstd":
+            compressed = _compress_zstd(segment)
+        else:
+            compressed = segment
+        if compressed != segment:
+            os.remove(segment)
+        with self._locked(exclusive=True):
+            self._prune()
+
+    def segments(self) -> List[str]:
+        """Returns the paths of the rotated segments, oldest first."""
+        directory, name = os.path.split(self.path)
+        return sorted(
+            os.path.join(directory, entry)
+            for entry in os.listdir(directory)
+            if entry.startswith(name + ".")
+        )
+
+    def _prune(self) -> None:
+        segments = self.segments()
+        for segment in segments[: max(0, len(segments) - self.backup_count)]:
+            try:
+                os.remove(segment)
+            except FileNotFoundError:
+                pass  # Pruned by another process
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._check_process()
+            self._start_flusher()
+            data = (self.format(record) + "\n").encode("utf-8")
+            if self._should_rotate(len(data)):
+                self._rotate_if_due(len(data))
+            if len(self._buffer) + len(data) > self.buffer_size:
+                self._sync()
+            self._buffer += data
+            self._size += len(data)
+            if self.fsync == "always":
+                self._sync()
+            else:
+                self._dirty = True
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:  # type: ignore
+            self._check_process()
+            if not self._file.closed:
+                self._sync()
+
+    def close(self) -> None:
+        """Flush the active file and wait for pending compression."""
+        with self.lock:  # type: ignore
+            self._check_process()
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self.lock:  # type: ignore
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+            self._lock_file.close()
+        if self._background is not None:
+            self._background.shutdown(wait=True)
+        super().close()
@@ -4,10 +4,15 @@ import json
 import sys
 from datetime import datetime
 from typing import Dict, Any, List, Optional
+from .request_context import current_request
 
 
 class StructuredFormatter(logging.Formatter):
-    """Custom formatter that outputs structured JSON logs for audit trails."""  # noqa: E501
+    """Custom formatter that outputs structured JSON logs for audit trails.
+
+    Records logged during a request also carry the user IP and correlation ID
+    of the current request context, unless given explicitly.
+    """
 
     def format(self, record: logging.LogRecord) -> str:
         log_entry: Dict[str, Any] = {
@@ -19,22 +24,48 @@ class StructuredFormatter(logging.Formatter):
             "line": record.lineno,
         }
 
+        context = current_request()
+
         # Add extra fields if present
-        if hasattr(record, "user_ip"):
-            log_entry["user_ip"] = record.user_ip  # type: ignore
+        user_ip = getattr(record, "user_ip", None)
+        if user_ip is None and context is not None:
+            user_ip = context.user_ip
+        if user_ip is not None:
+            log_entry["user_ip"] = user_ip
         if hasattr(record, "config_validation"):
             log_entry["config_validation"] = record.config_validation  # type: ignore  # noqa: E501
         if hasattr(record, "validation_results"):
             log_entry["validation_results"] = record.validation_results  # type: ignore  # noqa: E501
-        if hasattr(record, "request_id"):
-            log_entry["request_id"] = record.request_id  # type: ignore
+        if hasattr(record, "error"):
+            log_entry["error"] = record.error  # type: ignore
+        request_id = getattr(record, "request_id", None)
+        if request_id is None and context is not None:
+            request_id = context.correlation_id
+        if request_id is not None:
+            log_entry["request_id"] = request_id
 
         return json.dumps(log_entry)
 
 
-def setup_structured_logging(log_level: str = "INFO") -> logging.Logger:
+def setup_structured_logging(
+    log_level: str = "INFO",
+    log_file: Optional[str] = None,
+    max_bytes: int = 50 * 1024 * 1024,
+    rotate_interval: Optional[float] = None,
+    backup_count: int = 10,
+    compression: str = "gzip",
+    fsync: str = "batch",
+    console: bool = True,
+) -> logging.Logger:
     """
     Sets up structured logging for audit trails.
+
+    Records go to stdout and, when log_file is given, to a rotating,
+    size-capped file; see log_sink.RotatingAuditFileHandler for the file
+    options.
+
+    Raises:
+        ValueError: If a file option is invalid
     """
     logger = logging.getLogger("oidcheck")
     logger.setLevel(getattr(logging, log_level.upper()))
@@ -42,11 +73,27 @@ def setup_structured_logging(log_level: str = "INFO") -> logging.Logger:
     # Remove existing handlers
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+        handler.close()
 
-    # Create console handler with structured formatter
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(StructuredFormatter())
-    logger.addHandler(handler)
+    if console:
+        # Create console handler with structured formatter
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(StructuredFormatter())
+        logger.addHandler(console_handler)
+
+    if log_file:
+        from .log_sink import RotatingAuditFileHandler
+
+        file_handler = RotatingAuditFileHandler(
+            log_file,
+            max_bytes=max_bytes,
+            rotate_interval=rotate_interval,
+            backup_count=backup_count,
+            compression=compression,
+            fsync=fsync,
+        )
+        file_handler.setFormatter(StructuredFormatter())
+        logger.addHandler(file_handler)
 
     return logger
 
@@ -57,24 +104,30 @@ def log_validation_event(
     config_source: str,
     results: List[Dict[str, Any]],
     request_id: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
 ) -> None:
     """
     Log a configuration validation event with structured data.
+
+    When given, per-stage timings (in milliseconds) are included under
+    config_validation.timings_ms.
     """
+    config_validation: Dict[str, Any] = {
+        "source": config_source,
+        "error_count": len([r for r in results if r["level"] == "ERROR"]),
+        "warning_count": len([r for r in results if r["level"] == "WARNING"]),
+        "info_count": len([r for r in results if r["level"] == "INFO"]),
+    }
+    if timings:
+        config_validation["timings_ms"] = {
+            stage: round(ms, 3) for stage, ms in timings.items()
+        }
+
     logger.info(
         "Configuration validation completed",
         extra={
             "user_ip": user_ip,
-            "config_validation": {
-                "source": config_source,
-                "error_count": len(
-                    [r for r in results if r["level"] == "ERROR"]
-                ),  # noqa: E501
-                "warning_count": len(
-                    [r for r in results if r["level"] == "WARNING"]
-                ),  # noqa: E501
-                "info_count": len([r for r in results if r["level"] == "INFO"]),
-            },
+            "config_validation": config_validation,
             "validation_results": results,
             "request_id": request_id,
         },
@@ -1,46 +1,440 @@
 # oidcheck/main.py
 import argparse
+import cProfile
 import json
 import asyncio
-from .validator import validate_config_async
-from .models import AppConfig
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from .daemon import DaemonClient, DaemonError, daemon_main
+from .validator import (
+    DEFAULT_LEVEL,
+    VALIDATION_LEVELS,
+    Rule,
+    validate_config,
+    validate_config_async,
+)
+from .utils import locate_keys
+from .secret_resolver import FileSecretProvider, SecretResolver
+from .report import REPORT_FORMATS, ReportWriter
+from .profiling import NULL_TIMER, StageTimer, format_stage_timings, write_speedscope
 from dotenv import dotenv_values
 
+if TYPE_CHECKING:
+    from .fingerprint import FingerprintIndex
+    from .models import AppConfig
+
+# Files validated concurrently per window in batch mode
+BATCH_WINDOW = 32
+
+
+PROFILE_EXTENSIONS = (".prof", ".pstats", ".json")
+
+
+def profile_path(path: str) -> str:
+    """argparse type for --profile PATH: a cProfile or speedscope file name."""
+    if path != "-" and not path.endswith(PROFILE_EXTENSIONS):
+        raise argparse.ArgumentTypeError(
+            f"profile file must end in one of: {', '.join(PROFILE_EXTENSIONS)}"
+        )
+    return path
+
+
+def write_profile(path: str, timer: StageTimer) -> None:
+    """
+    Report stage timings on stderr and, for a speedscope path, write them out.
+
+    Args:
+        path: "-" for stderr only, or a path ending in .json for a speedscope file
+        timer: The timer holding the recorded stages
+    """
+    print(format_stage_timings(timer.timings), file=sys.stderr)
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            write_speedscope(timer, f)
+
+
+def load_values(path: str, timer: StageTimer = NULL_TIMER) -> Dict[str, str]:
+    """
+    Load the key/value pairs of a configuration file.
+
+    Args:
+        path: Path to the configuration file
+        timer: Records time spent in the "load" stage
+    """
+    with timer.stage("load"):
+        config_values = dotenv_values(path)
+        # Filter out None values and let Pydantic handle defaults
+        return {k: v for k, v in config_values.items() if v is not None}
+
+
+def build_config(values: Dict[str, str], timer: StageTimer = NULL_TIMER) -> "AppConfig":
+    """
+    Build an AppConfig from loaded key/value pairs.
+
+    Args:
+        values: The pairs returned by load_values
+        timer: Records time spent in the "model" stage
+    """
+    # Imported here so the daemon client path never loads pydantic
+    from .models import AppConfig
+
+    with timer.stage("model"):
+        return AppConfig(**values)  # type: ignore
+
+
+def load_config(path: str, timer: StageTimer = NULL_TIMER) -> "AppConfig":
+    """
+    Load a configuration file into an AppConfig.
+
+    Args:
+        path: Path to the configuration file
+        timer: Records time spent in the "load" and "model" stages
+    """
+    return build_config(load_values(path, timer), timer)
+
+
+def invalid_config_results(path: str, error: Exception) -> List[Dict[str, Any]]:
+    """The finding reported for a configuration file that cannot be validated."""
+    return [
+        {
+            "level": "ERROR",
+            "rule": "config-invalid",
+            "message": f"Cannot validate {path}: {error}",
+        }
+    ]
+
+
+def load_checked(
+    path: str, timer: StageTimer = NULL_TIMER
+) -> Tuple[Dict[str, str], Optional["AppConfig"], List[Dict[str, Any]]]:
+    """
+    Load a configuration file, turning a file that cannot be read or fails
+    model validation into a finding, so one bad file does not end a batch.
+
+    Args:
+        path: Path to the configuration file
+        timer: Records time spent in the "load" and "model" stages
+
+    Returns:
+        The file's values, its AppConfig and no findings, or empty values,
+        None and the finding describing the failure
+    """
+    try:
+        values = load_values(path, timer)
+        return values, build_config(values, timer), []
+    except (OSError, ValueError) as e:
+        # pydantic's ValidationError is a ValueError
+        return {}, None, invalid_config_results(path, e)
+
+
+def validate_with_daemon(
+    client: DaemonClient, path: str, level: str
+) -> List[Dict[str, Any]]:
+    """
+    Validate a configuration file in a running daemon.
+
+    Falls back to in-process validation when the daemon fails, so errors in
+    the configuration surface exactly as they would without a daemon.
+    """
+    try:
+        return client.validate(load_values(path), level)
+    except (DaemonError, OSError):
+        _, config, errors = load_checked(path)
+        if config is None:
+            return errors
+        return validate_config(config, level=level)
+
+
+def print_diff(diff: Dict[str, Any], as_json: bool) -> None:
+    """Print a diff-mode result as text or JSON."""
+    if as_json:
+        print(json.dumps(diff, indent=2))
+        return
+
+    print(f"Changed fields: {', '.join(diff['changed_fields']) or 'none'}")
+    for marker, key in (("+", "added"), ("-", "removed"), ("=", "unchanged")):
+        for result in diff[key]:
+            print(f"{marker} [{result['level']}] {result['message']}")
+
+
+async def validate_files(
+    paths: List[str],
+    level: str,
+    timer: StageTimer,
+    emit: Callable[[str, List[Dict[str, Any]]], None],
+    window: int = BATCH_WINDOW,
+    resolver: Optional[SecretResolver] = None,
+    index: Optional["FingerprintIndex"] = None,
+    plan: Optional[Tuple[Rule, ...]] = None,
+) -> None:
+    """
+    Validate configuration files concurrently in bounded windows.
+
+    Each file's findings are passed to emit, in input order, as soon as its
+    window completes, so at most one window of results is held in memory.
+
+    Args:
+        paths: Paths of the configuration files to validate
+        level: The validation level, see validate_config
+        timer: Records time spent in each validation stage
+        emit: Called with each file's path and findings
+        window: Maximum number of files validated concurrently
+        resolver: Checks Key Vault secret references before validation
+        index: Deduplicates rule evaluations across files, see FingerprintIndex
+        plan: A policy's rules to run instead of those of the level
+    """
+    for start in range(0, len(paths), window):
+        chunk = paths[start : start + window]
+        loaded = [load_checked(path, timer) for path in chunk]
+        secret_results = resolve_secrets(resolver, [v for v, _, _ in loaded], timer)
+        configs = [config for _, config, _ in loaded if config is not None]
+        if index is not None:
+            valid_results = await index.validate_many_async(configs, timer)
+        else:
+            valid_results = await asyncio.gather(
+                *(
+                    validate_config_async(config, timer, level, plan=plan)
+                    for config in configs
+                )
+            )
+        chunk_results = iter(valid_results)
+        for path, (_, config, errors), secrets in zip(chunk, loaded, secret_results):
+            emit(path, errors if config is None else secrets + next(chunk_results))
+
+
+def resolve_secrets(
+    resolver: Optional[SecretResolver],
+    values: List[Dict[str, str]],
+    timer: StageTimer = NULL_TIMER,
+) -> List[List[Dict[str, Any]]]:
+    """Run the secret-resolver stage, if configured, over raw config values."""
+    if resolver is None:
+        return [[] for _ in values]
+    with timer.stage("secrets"):
+        return resolver.resolve_many(values)
+
 
 def main() -> None:
+    if sys.argv[1:2] == ["daemon"]:
+        daemon_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["loadtest"]:
+        from .loadtest import loadtest_main
+
+        loadtest_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Flask OIDC Config Validator")
     parser.add_argument(
         "--file",
         "-f",
-        default=".env",
-        help="Path to configuration file (e.g., .env)",
+        action="append",
+        help="Path to configuration file (e.g., .env); repeat to validate "
+        "several files into one report (default: .env)",
     )
     parser.add_argument(
         "--json",
         action="store_true",
-        help="Output validation results in JSON format",
+        help="Output validation results in JSON format (same as --format json)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=REPORT_FORMATS,
+        default="text",
+        help="Report format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        metavar="PATH",
+        help="Write the report to PATH instead of stdout",
     )
     parser.add_argument(
         "--strict",
         action="store_true",
         help="Exit with non-zero status on validation warnings",
     )
+    parser.add_argument(
+        "--level",
+        choices=VALIDATION_LEVELS,
+        default=DEFAULT_LEVEL,
+        help="Validation depth: 'quick' skips MSAL, 'standard' builds an MSAL "
+        "client, 'full' also generates an auth URL (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--diff",
+        metavar="BASE",
+        help="Compare --file against the BASE configuration and report added, "
+        "removed and unchanged findings",
+    )
+    parser.add_argument(
+        "--secrets-file",
+        metavar="PATH",
+        help="Check Key Vault secret references against a local JSON stub of "
+        "vault contents",
+    )
+    parser.add_argument(
+        "--policy-file",
+        metavar="PATH",
+        help="JSON file of named policy profiles (default: $OIDCHECK_POLICY_FILE)",
+    )
+    parser.add_argument(
+        "--policy",
+        metavar="NAME",
+        help="Policy profile from --policy-file that adjusts rule severities "
+        "and options",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Evaluate each rule once per distinct set of the values it reads, "
+        "and report the evaluations saved",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Validate in-process even if an oidcheck daemon is running",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        type=profile_path,
+        metavar="PATH",
+        help="Print a per-stage timing breakdown to stderr; with PATH, also write "
+        "a cProfile (.prof, .pstats) or speedscope (.json) profile",
+    )
     args = parser.parse_args()
 
-    config_values = dotenv_values(args.file)
-    # Filter out None values and let Pydantic handle defaults
-    filtered_values = {k: v for k, v in config_values.items() if v is not None}
-    config = AppConfig(**filtered_values)  # type: ignore
+    files = args.file or [".env"]
+    output_format = "json" if args.json else args.format
+    if args.diff and (len(files) > 1 or output_format not in ("text", "json")):
+        parser.error("--diff compares a single --file with text or JSON output")
+    if args.diff and (args.secrets_file or args.dedupe):
+        parser.error("--diff cannot be combined with --secrets-file or --dedupe")
+    if args.diff and args.policy_file and not args.policy:
+        parser.error("--diff with --policy-file needs --policy")
+    policy_file = args.policy_file or os.environ.get("OIDCHECK_POLICY_FILE")
+
+    plan = None
+    policy = None
+    if args.policy:
+        if not policy_file:
+            parser.error("--policy needs --policy-file or OIDCHECK_POLICY_FILE")
+        from .policy import get_policy, load_policies
+
+        try:
+            policy = get_policy(load_policies(policy_file), args.policy)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        plan = policy.plan(args.level)
+
+    resolver = None
+    if args.secrets_file:
+        provider = FileSecretProvider(args.secrets_file)
+        try:
+            provider.load()
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read secrets file {args.secrets_file}: {e}")
+        resolver = SecretResolver(provider)
 
-    results = asyncio.run(validate_config_async(config))
+    timer = StageTimer() if args.profile else NULL_TIMER
+    profiler = None
+    if args.profile and args.profile.endswith((".prof", ".pstats")):
+        profiler = cProfile.Profile()
+        profiler.enable()
 
-    if args.json:
-        print(json.dumps(results, indent=2))
+    if args.diff:
+        from .diff import diff_configs
+
+        diff = diff_configs(
+            load_config(args.diff, timer),
+            load_config(files[0], timer),
+            args.level,
+            timer,
+            plan,
+        )
+        print_diff(diff, output_format == "json")
+        # Strict mode only fails on findings the change introduced
+        failed = any(r["level"] in ["WARNING", "ERROR"] for r in diff["added"])
     else:
-        for result in results:
-            print(f"[{result['level']}] {result['message']}")
+        stream = open(args.output, "w") if args.output else sys.stdout
+        try:
+            with ReportWriter(stream, output_format, len(files) > 1) as writer:
+
+                def emit(path: str, results: List[Dict[str, Any]]) -> None:
+                    if policy is not None:
+                        # Secret-reference findings are made outside the plan
+                        results = policy.apply(results)
+                    key_lines = locate_keys(path) if writer.uses_locations else None
+                    writer.write_results(path, results, key_lines)
+
+                index = None
+                if args.dedupe:
+                    from .fingerprint import FingerprintIndex
+
+                    index = FingerprintIndex(args.level, plan)
+
+                client: Optional[DaemonClient] = None
+                in_process = args.profile or resolver or index or plan
+                if not (args.no_daemon or in_process):
+                    client = DaemonClient.connect()
+
+                if client is not None:
+                    with client:
+                        for path in files:
+                            emit(path, validate_with_daemon(client, path, args.level))
+                elif profiler is not None:
+                    # cProfile only sees the calling thread, so skip the thread hop
+                    for path in files:
+                        values, config, errors = load_checked(path, timer)
+                        if config is None:
+                            emit(path, errors)
+                            continue
+                        secrets = resolve_secrets(resolver, [values], timer)[0]
+                        if index is not None:
+                            [results] = index.validate_many([config], timer)
+                        else:
+                            results = validate_config(config, timer, args.level, plan)
+                        emit(path, secrets + results)
+                else:
+                    asyncio.run(
+                        validate_files(
+                            files,
+                            args.level,
+                            timer,
+                            emit,
+                            resolver=resolver,
+                            index=index,
+                            plan=plan,
+                        )
+                    )
+        finally:
+            if args.output:
+                stream.close()
+
+        summary = writer.summary
+        if args.output:
+            print(
+                f"Wrote {output_format} report for {summary['sources']} file(s) to "
+                f"{args.output}: {summary['ERROR']} error(s), "
+                f"{summary['WARNING']} warning(s), {summary['INFO']} info",
+                file=sys.stderr,
+            )
+        if index is not None:
+            from .fingerprint import format_dedup_stats
+
+            print(format_dedup_stats(index.stats()), file=sys.stderr)
+        failed = bool(summary["ERROR"] or summary["WARNING"])
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    if args.profile:
+        write_profile(args.profile, timer)
 
-    if args.strict and any(r["level"] in ["WARNING", "ERROR"] for r in results):
+    if args.strict and failed:
         exit(1)
 
 
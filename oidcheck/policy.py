@@ -0,0 +1,222 @@
+# oidcheck/policy.py
+"""
+Named policy profiles compiled into immutable rule plans.
+
+A policy file is a JSON object mapping profile names to their settings:
+
+    {
+      "dod": {
+        "severity": {"authority-unknown-cloud": "ERROR"},
+        "options": {"require_us_gov_authority": true}
+      },
+      "internal-dev": {
+        "disable": ["secret-storage"],
+        "options": {"allow_http_localhost": true}
+      }
+    }
+
+"severity" overrides the level of findings by ID (see FINDING_FIELDS),
+"disable" drops findings by ID or whole rules by name, and "options" are
+the rule options in RULE_OPTIONS. Each profile is compiled once into a rule
+plan per validation level, so selecting a profile for a validation is a
+dictionary lookup.
+"""
+
+import functools
+import json
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Tuple
+from .profiling import StageTimer
+from .validator import (
+    DEFAULT_LEVEL,
+    FINDING_FIELDS,
+    RULE_OPTIONS,
+    RULES_BY_LEVEL,
+    VALIDATION_LEVELS,
+    Rule,
+)
+
+DEFAULT_POLICY = "default"
+
+SEVERITIES = ("ERROR", "WARNING", "INFO")
+
+_POLICY_KEYS = ("severity", "disable", "options")
+_RULE_NAMES = frozenset(
+    rule.name for rules in RULES_BY_LEVEL.values() for rule in rules
+)
+
+
+class Policy(NamedTuple):
+    """A compiled policy profile: one immutable rule plan per validation level."""
+
+    name: str
+    plans: Mapping[str, Tuple[Rule, ...]]
+    severity: Mapping[str, str] = MappingProxyType({})
+    disabled: FrozenSet[str] = frozenset()
+
+    def apply(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply the severity and disable settings to findings made outside the
+        rule plans, such as those of the secret resolver.
+
+        Findings of the plans already have them applied, and applying them
+        again changes nothing.
+        """
+        if not (self.severity or self.disabled):
+            return results
+        return _apply_overrides(results, self.severity, self.disabled)
+
+    def plan(self, level: str = DEFAULT_LEVEL) -> Tuple[Rule, ...]:
+        """
+        Returns the rules to run at a validation level under this policy.
+
+        Raises:
+            ValueError: If the level is not one of VALIDATION_LEVELS
+        """
+        try:
+            return self.plans[level]
+        except KeyError:
+            raise ValueError(
+                f"Unknown validation level '{level}'. "
+                f"Choose one of: {', '.join(VALIDATION_LEVELS)}"
+            ) from None
+
+
+def _apply_overrides(
+    findings: List[Dict[str, Any]],
+    severity: Mapping[str, str],
+    disabled: FrozenSet[str],
+) -> List[Dict[str, Any]]:
+    results = []
+    for result in findings:
+        rule_id = result.get("rule")
+        if not isinstance(rule_id, str):
+            results.append(result)
+            continue
+        if rule_id in disabled:
+            continue
+        if rule_id in severity:
+            result = {**result, "level": severity[rule_id]}
+        results.append(result)
+    return results
+
+
+def _override_findings(
+    check: Callable[[Any, StageTimer], List[Dict[str, Any]]],
+    severity: Mapping[str, str],
+    disabled: FrozenSet[str],
+) -> Callable[[Any, StageTimer], List[Dict[str, Any]]]:
+    @functools.wraps(check)
+    def checked(config: Any, timer: StageTimer) -> List[Dict[str, Any]]:
+        return _apply_overrides(check(config, timer), severity, disabled)
+
+    return checked
+
+
+def compile_policy(name: str, spec: Dict[str, Any]) -> Policy:
+    """
+    Compile a policy profile into its rule plans.
+
+    Args:
+        name: The profile name
+        spec: The profile settings, as described in the module docstring
+
+    Raises:
+        ValueError: If the settings have the wrong type, or name an unknown
+            finding, rule, option or severity
+    """
+    unknown = set(spec) - set(_POLICY_KEYS)
+    if unknown:
+        raise ValueError(f"Policy '{name}' has unknown settings: {sorted(unknown)}")
+    for key, kind, description in (
+        ("severity", dict, "an object"),
+        ("disable", list, "a list"),
+        ("options", dict, "an object"),
+    ):
+        if not isinstance(spec.get(key, kind()), kind):
+            raise ValueError(f"Policy '{name}' setting '{key}' must be {description}")
+
+    severity = {}
+    for rule_id, level in spec.get("severity", {}).items():
+        if rule_id not in FINDING_FIELDS:
+            raise ValueError(f"Policy '{name}' overrides unknown finding '{rule_id}'")
+        if str(level).upper() not in SEVERITIES:
+            raise ValueError(f"Policy '{name}' uses unknown severity '{level}'")
+        severity[rule_id] = str(level).upper()
+
+    disabled_rules = set()
+    disabled_findings = set()
+    for entry in spec.get("disable", []):
+        if not isinstance(entry, str):
+            raise ValueError(f"Policy '{name}' disables '{entry}', which is not a name")
+        if entry in _RULE_NAMES:
+            disabled_rules.add(entry)
+        elif entry in FINDING_FIELDS:
+            disabled_findings.add(entry)
+        else:
+            raise ValueError(
+                f"Policy '{name}' disables unknown rule or finding '{entry}'"
+            )
+
+    options: Dict[str, Dict[str, bool]] = {}
+    for option, value in spec.get("options", {}).items():
+        if option not in RULE_OPTIONS:
+            raise ValueError(f"Policy '{name}' sets unknown option '{option}'")
+        if not isinstance(value, bool):
+            raise ValueError(f"Policy '{name}' option '{option}' must be true or false")
+        options.setdefault(RULE_OPTIONS[option], {})[option] = value
+
+    frozen_severity = MappingProxyType(severity)
+    frozen_disabled = frozenset(disabled_findings)
+
+    def compile_rule(rule: Rule) -> Rule:
+        check = rule.check
+        if rule.name in options:
+            check = functools.partial(check, **options[rule.name])
+        if frozen_severity or frozen_disabled:
+            check = _override_findings(check, frozen_severity, frozen_disabled)
+        return rule._replace(check=check)
+
+    plans = {
+        level: tuple(compile_rule(r) for r in rules if r.name not in disabled_rules)
+        for level, rules in RULES_BY_LEVEL.items()
+    }
+    return Policy(name, MappingProxyType(plans), frozen_severity, frozen_disabled)
+
+
+def load_policies(path: str) -> Mapping[str, Policy]:
+    """
+    Load and compile every profile in a policy file.
+
+    A "default" profile with no overrides is added unless the file defines one.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not valid JSON or a profile is invalid
+    """
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    if not isinstance(specs, dict):
+        raise ValueError("A policy file must be a JSON object of named profiles")
+
+    policies = {DEFAULT_POLICY: compile_policy(DEFAULT_POLICY, {})}
+    for name, spec in specs.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"Policy '{name}' must be a JSON object")
+        policies[name] = compile_policy(name, spec)
+    return MappingProxyType(policies)
+
+
+def get_policy(policies: Mapping[str, Policy], name: str) -> Policy:
+    """
+    Look up a compiled policy by name.
+
+    Raises:
+        ValueError: If no policy has that name
+    """
+    try:
+        return policies[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown policy '{name}'. Choose one of: {', '.join(policies)}"
+        ) from None
@@ -0,0 +1,119 @@
+# oidcheck/profiling.py
+"""
+Lightweight per-stage timing for the validation pipeline.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, TextIO, Tuple
+
+
+class StageTimer:
+    """
+    Records the wall-clock time spent in each named validation stage.
+
+    Stages may be entered concurrently (MSAL checks run on a thread pool), so
+    updates to the recorded timings and events are serialised by a lock.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.events: List[Tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + (end - start) * 1000
+                self.events.append((name, start - self.origin, end - self.origin))
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """
+        Time the enclosed block as the given stage.
+
+        Repeated stages accumulate, so a stage entered once per config in a
+        batch reports its total time.
+        """
+        return self._timed(name)
+
+
+class _NullStageTimer(StageTimer):
+    """A StageTimer that records nothing, used when profiling is disabled."""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        self.timings = {}
+        self.events = []
+        self._null = nullcontext()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return self._null
+
+
+NULL_TIMER: StageTimer = _NullStageTimer()
+
+
+def format_stage_timings(timings: Dict[str, float]) -> str:
+    """
+    Format stage timings as a human-readable breakdown.
+
+    Args:
+        timings: Mapping of stage name to elapsed milliseconds
+
+    Returns:
+        A table with one line per stage, in execution order, and a total
+    """
+    width = max([len(name) for name in timings] + [len("total")])
+    lines = [f"{name:<{width}}  {ms:9.3f} ms" for name, ms in timings.items()]
+    lines.append(f"{'total':<{width}}  {sum(timings.values()):9.3f} ms")
+    return "\n".join(lines)
+
+
+def write_speedscope(timer: StageTimer, stream: TextIO, name: str = "oidcheck") -> None:
+    """
+    Write the recorded stages as a speedscope evented profile.
+
+    Args:
+        timer: The timer holding the recorded stage events
+        stream: Writable text stream for the JSON document
+        name: Profile name shown by speedscope
+    """
+    frames: List[Dict[str, str]] = []
+    frame_index: Dict[str, int] = {}
+    events: List[Dict[str, Any]] = []
+    for stage, start, end in sorted(timer.events, key=lambda e: e[1]):
+        if stage not in frame_index:
+            frame_index[stage] = len(frames)
+            frames.append({"name": stage})
+        events.append({"type": "O", "frame": frame_index[stage], "at": start * 1000})
+        events.append({"type": "C", "frame": frame_index[stage], "at": end * 1000})
+    events.sort(key=lambda e: (e["at"], e["type"] == "O"))
+
+    json.dump(
+        {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "evented",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": max((e["at"] for e in events), default=0),
+                    "events": events,
+                }
+            ],
+        },
+        stream,
+    )
@@ -0,0 +1,254 @@
+# oidcheck/report.py
+"""
+Streaming report writers for batch validation results.
+"""
+
+import csv
+import json
+import os
+from pathlib import PurePath
+from urllib.parse import quote
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
+from . import __version__
+from .utils import iter_validation_results
+from .validator import FINDING_FIELDS
+
+REPORT_FORMATS = ("text", "json", "ndjson", "csv", "sarif", "junit")
+
+# Formats that report the file line of each finding's key
+LOCATED_FORMATS = ("sarif", "junit")
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"ERROR": "error", "WARNING": "warning", "INFO": "note"}
+
+
+def artifact_uri(source: str) -> str:
+    """
+    Returns a SARIF artifact URI for a file path.
+
+    Paths are made relative to the working directory where possible and
+    written with forward slashes and percent-encoding, so Windows paths and
+    names with spaces yield valid URI references.
+    """
+    if os.path.isabs(source):
+        try:
+            source = os.path.relpath(source)
+        except ValueError:
+            # On another Windows drive; only an absolute file URI can name it
+            return PurePath(source).as_uri()
+    return quote(PurePath(source).as_posix())
+
+
+class ReportWriter:
+    """
+    Writes validation findings to a stream as they are produced.
+
+    Findings are never accumulated: each one is written as soon as it is
+    passed in, and only running counts are kept for the summary. Use as a
+    context manager, or call close() to write the closing bracket of the
+    JSON and SARIF formats.
+    """
+
+    def __init__(
+        self, stream: TextIO, output_format: str = "json", label_sources: bool = False
+    ) -> None:
+        if output_format not in REPORT_FORMATS:
+            raise ValueError(
+                f"Unknown report format '{output_format}'. "
+                f"Choose one of: {', '.join(REPORT_FORMATS)}"
+            )
+        self.stream = stream
+        self.output_format = output_format
+        # Prefix text lines with their source, for reports covering many files
+        self.label_sources = label_sources
+        self.summary: Dict[str, int] = {
+            "sources": 0,
+            "ERROR": 0,
+            "WARNING": 0,
+            "INFO": 0,
+        }
+        self._written = 0
+        self._closed = False
+        self._csv: Optional[Any] = None
+        self._rule_index = {rule: index for index, rule in enumerate(FINDING_FIELDS)}
+        self._open()
+
+    @property
+    def uses_locations(self) -> bool:
+        """Whether write_results makes use of key line numbers."""
+        return self.output_format in LOCATED_FORMATS
+
+    def _open(self) -> None:
+        if self.output_format == "json":
+            self.stream.write("[")
+        elif self.output_format == "csv":
+            self._csv = csv.writer(self.stream, lineterminator="\n")
+            self._csv.writerow(["source", "level", "rule", "message"])
+        elif self.output_format == "sarif":
+            header = json.dumps(
+                {
+                    "version": "2.1.0",
+                    "$schema": SARIF_SCHEMA,
+                    "runs": [
+                        {
+                            "tool": {
+                                "driver": {
+                                    "name": "oidcheck",
+                                    "version": __version__,
+                                    "rules": [
+                                        {"id": rule, "properties": {"field": field}}
+                                        for rule, field in FINDING_FIELDS.items()
+                                    ],
+                                }
+                            },
+                            "results": [],
+                        }
+                    ],
+                }
+            )
+            # Everything up to the empty results array; findings go in between
+            self.stream.write(header[: header.rindex("[]") + 1])
+        elif self.output_format == "junit":
+            self.stream.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n<testsuites name="oidcheck">\n'
+            )
+
+    @staticmethod
+    def _line(result: Dict[str, Any], key_lines: Dict[str, int]) -> Optional[int]:
+        return key_lines.get(FINDING_FIELDS.get(result.get("rule", ""), ""))
+
+    def _write_junit_suite(
+        self, source: str, results: List[Dict[str, Any]], key_lines: Dict[str, int]
+    ) -> None:
+        failures = sum(1 for r in results if r["level"] in ("ERROR", "WARNING"))
+        parts = [
+            f'  <testsuite name={quoteattr(source)} tests="{len(results)}" '
+            f'failures="{failures}" errors="0">\n'
+        ]
+        for result in results:
+            line = self._line(result, key_lines)
+            attributes = (
+                f"classname={quoteattr(source)} "
+                f"name={quoteattr(result.get('rule', result['level'].lower()))} "
+                f"file={quoteattr(source)}" + (f' line="{line}"' if line else "")
+            )
+            if result["level"] in ("ERROR", "WARNING"):
+                parts.append(
+                    f"    <testcase {attributes}>\n"
+                    f"      <failure type=\"{result['level']}\" "
+                    f"message={quoteattr(result['message'])}>"
+                    f"{escape(result['message'])}</failure>\n"
+                    f"    </testcase>\n"
+                )
+            else:
+                parts.append(
+                    f"    <testcase {attributes}>\n"
+                    f"      <system-out>{escape(result['message'])}</system-out>\n"
+                    f"    </testcase>\n"
+                )
+        parts.append("  </testsuite>\n")
+        self.stream.write("".join(parts))
+
+    def _count(self, results: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for result in results:
+            yield result
+            # Counted once written, so _written tells whether a separator is due
+            self._written += 1
+            if result["level"] in self.summary:
+                self.summary[result["level"]] += 1
+
+    def _write_formatted(self, source: str, results: Iterable[Dict[str, Any]]) -> None:
+        # Text, JSON and NDJSON findings are formatted by iter_validation_results
+        if self.output_format == "text":
+            prefix = f"{source}: " if self.label_sources else ""
+            for line in iter_validation_results(results, "text"):
+                self.stream.write(prefix + line)
+            return
+
+        records = ({"source": source, **result} for result in results)
+        for line in iter_validation_results(records, "ndjson"):
+            if self.output_format == "ndjson":
+                self.stream.write(line)
+            else:
+                # One array spans every source, so only its items are taken
+                separator = "," if self._written else ""
+                self.stream.write(f"{separator}\n  {line[:-1]}")
+
+    def _write_finding(
+        self, source: str, result: Dict[str, Any], key_lines: Dict[str, int]
+    ) -> None:
+        if self.output_format == "csv":
+            assert self._csv is not None
+            self._csv.writerow(
+                [source, result["level"], result.get("rule", ""), result["message"]]
+            )
+            return
+
+        physical_location: Dict[str, Any] = {
+            "artifactLocation": {"uri": artifact_uri(source)}
+        }
+        line = self._line(result, key_lines)
+        if line:
+            physical_location["region"] = {"startLine": line}
+        sarif_result: Dict[str, Any] = {
+            "level": SARIF_LEVELS.get(result["level"], "none"),
+            "message": {"text": result["message"]},
+            "locations": [{"physicalLocation": physical_location}],
+        }
+        if result.get("rule") in self._rule_index:
+            sarif_result["ruleId"] = result["rule"]
+            sarif_result["ruleIndex"] = self._rule_index[result["rule"]]
+        self.stream.write(("," if self._written else "") + json.dumps(sarif_result))
+
+    def write_results(
+        self,
+        source: str,
+        results: Iterable[Dict[str, Any]],
+        key_lines: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Write the findings for one configuration source.
+
+        Args:
+            source: Name of the validated configuration, usually its file path
+            results: Findings with 'level' and 'message' keys; may be a generator
+            key_lines: Line numbers of the source's keys, as returned by
+                utils.locate_keys; locates findings in the SARIF and JUnit formats
+        """
+        key_lines = key_lines or {}
+        self.summary["sources"] += 1
+        counted = self._count(results)
+        if self.output_format == "junit":
+            # A test suite's counts precede its test cases, so buffer one source
+            self._write_junit_suite(source, list(counted), key_lines)
+        elif self.output_format in ("csv", "sarif"):
+            for result in counted:
+                self._write_finding(source, result, key_lines)
+        else:
+            self._write_formatted(source, counted)
+
+    def close(self) -> Dict[str, int]:
+        """
+        Finish the report and return the summary counts.
+
+        The stream itself is left open, since it is usually stdout.
+        """
+        if not self._closed:
+            if self.output_format == "json":
+                self.stream.write("\n]\n" if self._written else "]\n")
+            elif self.output_format == "sarif":
+                self.stream.write("]}]}\n")
+            elif self.output_format == "junit":
+                self.stream.write("</testsuites>\n")
+            self._closed = True
+        return self.summary
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        # An aborted report is left unterminated rather than passed off as
+        # complete: a JSON, SARIF or JUnit consumer then rejects it
+        if exc_type is None:
+            self.close()
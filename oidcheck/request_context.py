@@ -0,0 +1,117 @@
+# oidcheck/request_context.py
+"""
+Per-request context carried in a context variable.
+
+The context follows the request into code that copies the current context,
+such as asyncio.to_thread and submit() (used by validate_config_async), so
+log records emitted anywhere during a request carry its correlation ID
+without threading it through every call.
+"""
+
+import itertools
+import os
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar, Token, copy_context
+from typing import Any, Callable, Optional
+
+
+def _new_prefix() -> str:
+    return f"{os.getpid():x}-{os.urandom(4).hex()}"
+
+
+# IDs are a per-process random prefix plus a counter: unique across workers
+# and far cheaper to generate than uuid4
+_prefix = _new_prefix()
+_counter = itertools.count(1)
+
+
+def _reset_ids() -> None:
+    global _prefix, _counter
+    _prefix = _new_prefix()
+    _counter = itertools.count(1)
+
+
+# Forked workers (e.g. gunicorn --preload) must not repeat the parent's IDs
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_ids)
+
+
+def new_correlation_id() -> str:
+    """Returns a correlation ID unique to this process and call."""
+    return f"{_prefix}-{next(_counter):x}"
+
+
+class RequestContext:
+    """
+    State of the request being handled.
+
+    The correlation ID is only generated when first read, so requests that
+    never log or echo it do not pay for it.
+    """
+
+    __slots__ = ("_correlation_id", "user_ip")
+
+    def __init__(
+        self, correlation_id: Optional[str] = None, user_ip: Optional[str] = None
+    ) -> None:
+        self._correlation_id = correlation_id
+        self.user_ip = user_ip
+
+    @property
+    def correlation_id(self) -> str:
+        if self._correlation_id is None:
+            self._correlation_id = new_correlation_id()
+        return self._correlation_id
+
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar(
+    "oidcheck_request_context", default=None
+)
+
+
+def begin_request(
+    correlation_id: Optional[str] = None, user_ip: Optional[str] = None
+) -> Token:
+    """
+    Make a new request context current.
+
+    Args:
+        correlation_id: An incoming correlation ID to reuse, if any
+        user_ip: The client address, included in log records
+
+    Returns:
+        A token to pass to end_request
+    """
+    return _current.set(RequestContext(correlation_id, user_ip))
+
+
+def end_request(token: Token) -> None:
+    """Restore the context that was current before begin_request."""
+    _current.reset(token)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Returns the current request context, or None outside a request."""
+    return _current.get()
+
+
+def get_correlation_id() -> Optional[str]:
+    """Returns the current request's correlation ID, or None outside a request."""
+    context = _current.get()
+    return context.correlation_id if context is not None else None
+
+
+def peek_correlation_id() -> Optional[str]:
+    """
+    Returns the current request's correlation ID without generating one.
+
+    Returns None outside a request and when the request was not given an ID
+    and has not needed one yet.
+    """
+    context = _current.get()
+    return context._correlation_id if context is not None else None
+
+
+def submit(executor: Executor, fn: Callable[..., Any], *args: Any) -> Future:
+    """Submit fn to an executor so that it runs in a copy of the current context."""
+    return executor.submit(copy_context().run, fn, *args)
@@ -0,0 +1,347 @@
+# oidcheck/secret_resolver.py
+"""
+Resolution of Key Vault secret references ahead of AppConfig construction.
+
+Only the existence and metadata of referenced secrets are checked; secret
+values are never requested, cached or logged.
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from .request_context import submit
+
+# App Service / Functions style references, e.g.
+# @Microsoft.KeyVault(SecretUri=https://myvault.vault.azure.net/secrets/name/version)
+# @Microsoft.KeyVault(VaultName=myvault;SecretName=name;SecretVersion=version)
+_REFERENCE_PATTERN = re.compile(r"^\s*@Microsoft\.KeyVault\((?P<body>.*)\)\s*$", re.I)
+_SECRET_URI_PATTERN = re.compile(
+    r"^https://(?P<vault>[^./]+)\.vault\.[^/]+/secrets/(?P<name>[^/]+)(?:/(?P<version>[^/]*))?/?$",
+    re.I,
+)
+
+# Secrets expiring within this window produce a warning
+EXPIRY_WARNING_WINDOW = timedelta(days=30)
+
+
+class SecretReference(NamedTuple):
+    """A reference to a secret in a vault."""
+
+    vault: str
+    name: str
+    version: Optional[str] = None
+
+
+class SecretMetadata(NamedTuple):
+    """What a provider knows about a referenced secret, excluding its value."""
+
+    exists: bool
+    enabled: bool = True
+    expires_on: Optional[datetime] = None
+
+
+def parse_secret_reference(value: Optional[str]) -> Optional[SecretReference]:
+    """
+    Parse a Key Vault reference.
+
+    Args:
+        value: A configuration value, such as CLIENT_SECRET
+
+    Returns:
+        The reference, or None if the value is not a Key Vault reference
+    """
+    match = _REFERENCE_PATTERN.match(value or "")
+    if not match:
+        return None
+    body = match.group("body").strip()
+
+    if body.lower().startswith("secreturi="):
+        uri_match = _SECRET_URI_PATTERN.match(body.split("=", 1)[1].strip())
+        if not uri_match:
+            return None
+        return SecretReference(
+            uri_match.group("vault").lower(),
+            uri_match.group("name"),
+            uri_match.group("version") or None,
+        )
+
+    parts = {}
+    for part in body.split(";"):
+        key, _, part_value = part.partition("=")
+        parts[key.strip().lower()] = part_value.strip()
+    if not (parts.get("vaultname") and parts.get("secretname")):
+        return None
+    return SecretReference(
+        parts["vaultname"].lower(),
+        parts["secretname"],
+        parts.get("secretversion") or None,
+    )
+
+
+class SecretProvider(ABC):
+    """
+    Base class for secret metadata providers.
+
+    Subclasses create one client per vault in _create_client, which is then
+    reused for every lookup against that vault, and implement get_metadata.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, Any] = {}
+        self._clients_lock = threading.Lock()
+
+    def client_for(self, vault: str) -> Any:
+        """Returns the shared client for a vault, creating it on first use."""
+        with self._clients_lock:
+            if vault not in self._clients:
+                self._clients[vault] = self._create_client(vault)
+            return self._clients[vault]
+
+    @abstractmethod
+    def _create_client(self, vault: str) -> Any:
+        """Create the client used for every lookup against a vault."""
+
+    @abstractmethod
+    def get_metadata(self, reference: SecretReference) -> SecretMetadata:
+        """
+        Look up a referenced secret.
+
+        Raises:
+            OSError: If the vault cannot be reached
+        """
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp, accepting a "Z" suffix on any Python version.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp
+    """
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _check_secret(name: str, secret: Any) -> None:
+    """
+    Check the metadata of one secret in a secrets file.
+
+    Raises:
+        ValueError: If the metadata is not an object, or a known key has the
+            wrong type or an unparseable timestamp
+    """
+    if not isinstance(secret, dict):
+        raise ValueError(f"secret '{name}' must be a JSON object")
+    if not isinstance(secret.get("enabled", True), bool):
+        raise ValueError(f"secret '{name}' has a non-boolean 'enabled'")
+    versions = secret.get("versions", [])
+    if not isinstance(versions, list) or not all(isinstance(v, str) for v in versions):
+        raise ValueError(f"secret '{name}' must list its 'versions' as strings")
+    expires_on = secret.get("expires_on")
+    if expires_on is not None:
+        if not isinstance(expires_on, str):
+            raise ValueError(f"secret '{name}' has a non-string 'expires_on'")
+        try:
+            parse_timestamp(expires_on)
+        except ValueError:
+            raise ValueError(
+                f"secret '{name}' has an invalid 'expires_on' timestamp "
+                f"'{expires_on}'"
+            ) from None
+
+
+class FileSecretProvider(SecretProvider):
+    """
+    Local stub provider backed by a JSON file, for tests and offline runs.
+
+    The file maps vault names to secrets and their metadata, e.g.
+    {"myvault": {"client-secret": {"enabled": true,
+    "expires_on": "2027-01-01T00:00:00+00:00", "versions": ["abc123"]}}}.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._vaults: Optional[Dict[str, Any]] = None
+
+    def load(self) -> None:
+        """
+        Read the secrets file, if it has not been read yet.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a JSON object of vaults, or a
+                secret's metadata is malformed
+        """
+        if self._vaults is not None:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            vaults = json.load(f)
+        if not isinstance(vaults, dict) or not all(
+            isinstance(v, dict) for v in vaults.values()
+        ):
+            raise ValueError(
+                "A secrets file must be a JSON object mapping vault names "
+                "to objects of secrets"
+            )
+        for vault, secrets in vaults.items():
+            for name, secret in secrets.items():
+                _check_secret(f"{vault}/{name}", secret)
+        self._vaults = {name.lower(): v for name, v in vaults.items()}
+
+    def _create_client(self, vault: str) -> Dict[str, Any]:
+        self.load()
+        assert self._vaults is not None
+        return self._vaults.get(vault, {})
+
+    def get_metadata(self, reference: SecretReference) -> SecretMetadata:
+        secret = self.client_for(reference.vault).get(reference.name)
+        if secret is None:
+            return SecretMetadata(exists=False)
+        if reference.version and reference.version not in secret.get("versions", []):
+            return SecretMetadata(exists=False)
+        expires_on = secret.get("expires_on")
+        return SecretMetadata(
+            exists=True,
+            enabled=secret.get("enabled", True),
+            expires_on=parse_timestamp(expires_on) if expires_on else None,
+        )
+
+
+class SecretResolver:
+    """
+    Checks secret references concurrently, with a TTL cache of lookups.
+
+    Args:
+        provider: Where secret metadata is looked up
+        ttl: Seconds a lookup is reused before it is repeated
+        max_workers: Maximum number of concurrent lookups
+    """
+
+    def __init__(
+        self, provider: SecretProvider, ttl: float = 300.0, max_workers: int = 8
+    ) -> None:
+        self.provider = provider
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._cache: Dict[SecretReference, Tuple[float, SecretMetadata]] = {}
+        self._cache_lock = threading.Lock()
+
+    def check(self, reference: SecretReference) -> Optional[SecretMetadata]:
+        """
+        Look up one reference, using the cache when the lookup is fresh.
+
+        Returns:
+            The secret metadata, or None if the provider could not be reached
+        """
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(reference)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        try:
+            metadata = self.provider.get_metadata(reference)
+        except OSError:
+            return None
+        with self._cache_lock:
+            self._cache[reference] = (now + self.ttl, metadata)
+        return metadata
+
+    def resolve_many(
+        self, values_list: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Check the CLIENT_SECRET references of many configurations at once.
+
+        Distinct references are looked up concurrently, so a batch is not
+        serialized on one lookup at a time, and each is looked up only once.
+
+        Args:
+            values_list: Raw key/value pairs of each configuration
+
+        Returns:
+            The secret findings for each configuration, in input order
+        """
+        references = [parse_secret_reference(_client_secret(v)) for v in values_list]
+        distinct = list({r for r in references if r is not None})
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [submit(executor, self.check, r) for r in distinct]
+            metadata = {r: f.result() for r, f in zip(distinct, futures)}
+        return [
+            _secret_findings(reference, metadata[reference]) if reference else []
+            for reference in references
+        ]
+
+
+def _client_secret(values: Dict[str, Any]) -> Optional[str]:
+    for key, value in values.items():
+        if key.lower() == "client_secret":
+            return value
+    return None
+
+
+def _secret_findings(
+    reference: SecretReference, metadata: Optional[SecretMetadata]
+) -> List[Dict[str, Any]]:
+    secret = f"Key Vault secret '{reference.name}' in vault '{reference.vault}'"
+    if metadata is None:
+        return [
+            {
+                "level": "WARNING",
+                "rule": "secret-reference-unverified",
+                "message": f"CLIENT_SECRET references {secret}, which could not be "
+                "checked because the vault was unreachable.",
+            }
+        ]
+    if not metadata.exists:
+        return [
+            {
+                "level": "ERROR",
+                "rule": "secret-reference-missing",
+                "message": f"CLIENT_SECRET references {secret}, which does not exist.",
+            }
+        ]
+    if not metadata.enabled:
+        return [
+            {
+                "level": "ERROR",
+                "rule": "secret-reference-disabled",
+                "message": f"CLIENT_SECRET references {secret}, which is disabled.",
+            }
+        ]
+    if metadata.expires_on:
+        expires_on = metadata.expires_on
+        if expires_on.tzinfo is None:
+            expires_on = expires_on.replace(tzinfo=timezone.utc)
+        remaining = expires_on - datetime.now(timezone.utc)
+        if remaining <= timedelta(0):
+            return [
+                {
+                    "level": "ERROR",
+                    "rule": "secret-reference-expired",
+                    "message": f"CLIENT_SECRET references {secret}, which has expired.",
+                }
+            ]
+        if remaining <= EXPIRY_WARNING_WINDOW:
+            return [
+                {
+                    "level": "WARNING",
+                    "rule": "secret-reference-expiring",
+                    "message": f"CLIENT_SECRET references {secret}, which expires on "
+                    f"{expires_on.date().isoformat()}.",
+                }
+            ]
+    return [
+        {
+            "level": "INFO",
+            "rule": "secret-reference-resolved",
+            "message": f"CLIENT_SECRET is resolved from {secret}.",
+        }
+    ]
@@ -1,13 +1,37 @@
 # oidcheck/server.py
-from flask import Flask, render_template, request, flash, jsonify, g
+from flask import (
+    Flask,
+    render_template,
+    request,
+    flash,
+    jsonify,
+    g,
+    session,
+    url_for,
+)
 from pydantic import ValidationError
-from .validator import validate_config
+from .validator import (
+    DEFAULT_LEVEL,
+    VALIDATION_LEVELS,
+    validate_config,
+    prime_authority_metadata,
+)
 from .models import AppConfig
+from .policy import DEFAULT_POLICY, Policy, compile_policy, load_policies
 from .logging_config import setup_structured_logging, log_validation_event
+from .profiling import NULL_TIMER, StageTimer
+from .request_context import begin_request, end_request, peek_correlation_id
+from .utils import parse_config_text
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_wtf.csrf import CSRFProtect
-import uuid
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+from werkzeug.exceptions import RequestEntityTooLarge
+from typing import Any, Dict, List, Mapping, Tuple
+import gc
+import gzip
+import hashlib
+import threading
+import time
 import os
 
 app = Flask(__name__)
@@ -36,19 +60,261 @@ validate_environment()
 
 app.secret_key = os.environ.get("FLASK_SECRET_KEY") or os.urandom(32)
 
+
+def logging_options() -> Dict[str, Any]:
+    """Read the audit log file sink settings from the environment."""
+    if not os.environ.get("OIDCHECK_LOG_FILE"):
+        return {}
+    rotate_seconds = os.environ.get("OIDCHECK_LOG_ROTATE_SECONDS")
+    return {
+        "log_file": os.environ["OIDCHECK_LOG_FILE"],
+        "max_bytes": int(os.environ.get("OIDCHECK_LOG_MAX_BYTES", 50 * 1024 * 1024)),
+        "rotate_interval": float(rotate_seconds) if rotate_seconds else None,
+        "backup_count": int(os.environ.get("OIDCHECK_LOG_BACKUPS", "10")),
+        "compression": os.environ.get("OIDCHECK_LOG_COMPRESSION", "gzip"),
+        "fsync": os.environ.get("OIDCHECK_LOG_FSYNC", "batch"),
+    }
+
+
 # Setup structured logging
-logger = setup_structured_logging()
+logger = setup_structured_logging(**logging_options())
+
+
+def server_policies() -> Mapping[str, Policy]:
+    """Load the policy profiles named by OIDCHECK_POLICY_FILE, if set."""
+    path = os.environ.get("OIDCHECK_POLICY_FILE")
+    if not path:
+        return {DEFAULT_POLICY: compile_policy(DEFAULT_POLICY, {})}
+    return load_policies(path)
+
+
+# Compiled once; each validation picks its rule plan by name
+policies = server_policies()
+
+# Record per-stage timings of form validations in their audit log events
+PROFILE_REQUESTS = os.environ.get("OIDCHECK_PROFILE", "0") == "1"
+
+# Longest configuration accepted from the form, in characters
+MAX_CONFIG_LENGTH = 10000
+
+# Bodies over this size are refused with 413 from their Content-Length, or as
+# soon as a chunked body exceeds it, before the form is parsed. It leaves room
+# for a percent-encoded config somewhat over MAX_CONFIG_LENGTH, which is
+# answered with a form error instead.
+app.config["MAX_CONTENT_LENGTH"] = int(
+    os.environ.get("OIDCHECK_MAX_CONTENT_LENGTH", 64 * 1024)
+)
+# Limit on each field of multipart bodies, which are parsed incrementally
+app.config["MAX_FORM_MEMORY_SIZE"] = 4 * MAX_CONFIG_LENGTH
+
+
+# Probes and assets skip the per-request context and correlation header
+_UNTRACKED_ENDPOINTS = frozenset({"health", "liveness", "static"})
+
+
+@app.before_request
+def limit_streamed_body() -> None:
+    """Refuse a chunked form body once it goes past MAX_CONTENT_LENGTH.
+
+    Bodies with a Content-Length are refused by Werkzeug before they are read,
+    but a chunked body is only cut off at the limit, so the form would be
+    parsed from a truncated body. Registered before CSRF protection, which is
+    the first to read the form. Only form submissions are checked, so probes
+    and assets never touch the input stream.
+    """
+    if request.method != "POST" or request.endpoint in _UNTRACKED_ENDPOINTS:
+        return
+    if request.content_length is None and "wsgi.input_terminated" in request.environ:
+        # Buffered for form parsing; a further byte means the body was cut off
+        request.get_data(cache=True, parse_form_data=False)
+        if request.stream.read(1):
+            raise RequestEntityTooLarge()
+
 
 # Setup CSRF protection
 csrf = CSRFProtect(app)
 
 
-# Generate correlation ID for each request
 @app.before_request
 def before_request():
-    """Generate correlation ID for request tracking."""
-    g.correlation_id = request.headers.get("X-Correlation-ID") or str(uuid.uuid4())
-    g.request_start_time = request.environ.get("REQUEST_TIME", 0)
+    """Make a request context current, reusing any incoming correlation ID."""
+    if request.endpoint in _UNTRACKED_ENDPOINTS:
+        return
+    g.request_context_token = begin_request(
+        request.headers.get("X-Correlation-ID"), get_remote_address()
+    )
+
+
+@app.teardown_request
+def teardown_request(exc):
+    """Restore the context that was current before the request."""
+    token = g.pop("request_context_token", None)
+    if token is not None:
+        end_request(token)
+
+
+# Fingerprinted static URLs are immutable, so browsers may keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# HTML responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 500
+COMPRESS_LEVEL = 6
+
+# Stands in for the CSRF token in the cached empty-form page
+_CSRF_PLACEHOLDER = "__oidcheck_csrf_token__"
+
+_static_fingerprints: Dict[str, str] = {}
+_page_cache: Dict[str, str] = {}
+
+
+def static_fingerprint(filename: str) -> str:
+    """Returns a short content hash of a static file, computed once per process."""
+    fingerprint = _static_fingerprints.get(filename)
+    if fingerprint is None:
+        assert app.static_folder is not None
+        with open(os.path.join(app.static_folder, filename), "rb") as f:
+            fingerprint = hashlib.sha256(f.read()).hexdigest()[:12]
+        _static_fingerprints[filename] = fingerprint
+    return fingerprint
+
+
+@app.context_processor
+def inject_static_url() -> Dict[str, Any]:
+    """Expose static_url() to templates, for cache-busting asset URLs."""
+
+    def static_url(filename: str) -> str:
+        return url_for("static", filename=filename, v=static_fingerprint(filename))
+
+    return {"static_url": static_url}
+
+
+def render_empty_form() -> str:
+    """Render the form without results, reusing a cached rendering.
+
+    Only the CSRF token differs between renderings of the empty form, so the
+    page is rendered once per mount point (its URLs include the script root)
+    with a placeholder that is substituted per request. Requests with pending
+    flashed messages are rendered in full.
+    """
+    if session.get("_flashes"):
+        return render_index([], "", DEFAULT_LEVEL, DEFAULT_POLICY)
+
+    cache_key = f"empty_form:{request.script_root}"
+    page = _page_cache.get(cache_key)
+    if page is None:
+        page = render_template(
+            "index.html",
+            results=[],
+            config_text="",
+            levels=VALIDATION_LEVELS,
+            level=DEFAULT_LEVEL,
+            policies=policies,
+            policy=DEFAULT_POLICY,
+            csrf_token=lambda: _CSRF_PLACEHOLDER,
+        )
+        _page_cache[cache_key] = page
+    return page.replace(_CSRF_PLACEHOLDER, generate_csrf())
+
+
+def render_index(
+    results: List[Dict[str, Any]],
+    config_text: str,
+    level: str,
+    policy: str = DEFAULT_POLICY,
+) -> str:
+    """Render the form with the submitted configuration and its results."""
+    return render_template(
+        "index.html",
+        results=results,
+        config_text=config_text,
+        levels=VALIDATION_LEVELS,
+        level=level,
+        policies=policies,
+        policy=policy,
+    )
+
+
+# Populated by warm_up(); /health reports not-ready until "ready" is True
+_warmup_state: Dict[str, Any] = {"ready": False, "steps": {}}
+
+
+def warm_up(prime_authorities: bool = False) -> Dict[str, Any]:
+    """Pay one-time initialization costs before the first request is served.
+
+    Compiles and pre-renders the index template (for the root mount point;
+    others render on their first request), builds the AppConfig validators
+    and, when requested, primes MSAL's discovery cache for the known clouds
+    so the first validation in each worker does not absorb those costs.
+    Finally runs the readiness checks, so probes find them cached.
+
+    Args:
+        prime_authorities: Fetch authority metadata for the known clouds
+
+    Returns:
+        The warm-up state, including the outcome of each step
+    """
+    steps = _warmup_state["steps"]
+
+    app.jinja_env.get_template("index.html")
+    with app.test_request_context("/"):
+        render_empty_form()
+    steps["templates"] = "ok"
+
+    AppConfig.model_validate(
+        {
+            "client_id": "warmup",
+            "authority": "https://login.microsoftonline.com/warmup",
+            "redirect_uri": "https://localhost/callback",
+            "scope": "openid profile",
+        }
+    )
+    steps["models"] = "ok"
+
+    import msal  # noqa: F401
+
+    steps["msal"] = "ok"
+
+    if prime_authorities:
+        steps["authority_metadata"] = prime_authority_metadata()
+
+    refresh_readiness()
+    _warmup_state["ready"] = True
+    return _warmup_state
+
+
+def _warm_up_in_background(prime_authorities: bool) -> None:
+    # Warm-up only pays costs early, so a worker whose warm-up fails can still
+    # serve; it is marked ready and degraded rather than kept out of rotation
+    try:
+        warm_up(prime_authorities)
+    except Exception as e:
+        logger.exception("Warm-up failed; serving without it")
+        _warmup_state["steps"]["error"] = str(e)
+        _warmup_state.update(ready=True, degraded=True)
+
+
+def start_warm_up() -> None:
+    """Run warm-up according to the OIDCHECK_WARMUP environment variable.
+
+    "sync" (default) warms up during import, so a server preloading the app
+    before forking (e.g. gunicorn --preload) shares the warmed memory with its
+    workers; OIDCHECK_PRELOAD=1 additionally freezes the collected objects so
+    garbage collection does not dirty the shared pages. "background" warms up
+    in a thread while requests are accepted, and "off" skips warm-up entirely.
+    """
+    mode = os.environ.get("OIDCHECK_WARMUP", "sync").lower()
+    prime = os.environ.get("OIDCHECK_PRIME_AUTHORITIES", "0") == "1"
+
+    if mode == "off":
+        _warmup_state["ready"] = True
+    elif mode == "background":
+        threading.Thread(
+            target=_warm_up_in_background, args=(prime,), daemon=True
+        ).start()
+    else:
+        warm_up(prime)
+        if os.environ.get("OIDCHECK_PRELOAD", "0") == "1":
+            gc.freeze()
 
 
 limiter = Limiter(
@@ -56,41 +322,112 @@ limiter = Limiter(
 )
 
 
-@app.route("/health")
-def health():
-    """Health check endpoint for monitoring and load balancer checks.
+# Seconds a readiness result is served before it is recomputed in the background
+READINESS_TTL = float(os.environ.get("OIDCHECK_READINESS_TTL", "10"))
+
+_readiness: Dict[str, Any] = {"checks": None, "checked_at": 0.0}
+_readiness_lock = threading.Lock()
+
+
+def check_dependencies() -> Dict[str, str]:
+    """Run the readiness checks that are too costly to run on every probe.
 
     Returns:
-        JSON response indicating the service health status and dependency checks
+        The outcome of each check: "ok", "warning" or "error"
     """
-    health_status = {
-        "status": "healthy",
-        "checks": {
-            "app": "ok",
-            "csrf": "ok" if csrf else "warning",
-            "limiter": "ok" if limiter else "warning",
-        },
+    checks = {
+        "app": "ok",
+        "csrf": "ok" if csrf else "warning",
+        "limiter": "ok" if limiter else "warning",
+        "logging": "ok" if logger.handlers else "error",
     }
 
-    # Check if we can initialize the logging system
     try:
-        logger.info("Health check performed")
-        health_status["checks"]["logging"] = "ok"
+        import msal  # noqa: F401
+
+        checks["msal"] = "ok"
+    except ImportError:
+        checks["msal"] = "error"
+
+    # The rate limiter's storage, which is shared between workers in production
+    try:
+        checks["cache_backend"] = "ok" if limiter.storage.check() else "error"
     except Exception:
-        health_status["checks"]["logging"] = "error"
-        health_status["status"] = "degraded"
+        checks["cache_backend"] = "error"
+
+    return checks
+
+
+def refresh_readiness() -> Dict[str, str]:
+    """Recompute the dependency checks and cache them."""
+    checks = check_dependencies()
+    _readiness.update(checks=checks, checked_at=time.monotonic())
+    return checks
 
-    # Check MSAL availability
+
+def _refresh_readiness_in_background() -> None:
     try:
-        import msal  # noqa: F401
+        refresh_readiness()
+    finally:
+        _readiness_lock.release()
 
-        health_status["checks"]["msal"] = "ok"
-    except ImportError:
-        health_status["checks"]["msal"] = "error"
-        health_status["status"] = "unhealthy"
 
-    status_code = 200 if health_status["status"] == "healthy" else 503
-    return jsonify(health_status), status_code
+def cached_dependency_checks() -> Dict[str, str]:
+    """Returns the cached dependency checks, refreshing them when stale.
+
+    Only a probe arriving before any checks have run waits for them; later
+    probes get the cached result while at most one background thread
+    recomputes a stale one.
+    """
+    checks = _readiness["checks"]
+    if checks is None:
+        with _readiness_lock:
+            return _readiness["checks"] or refresh_readiness()
+
+    stale = time.monotonic() - _readiness["checked_at"] > READINESS_TTL
+    if stale and _readiness_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh_readiness_in_background, daemon=True).start()
+    return checks
+
+
+@app.route("/health/live")
+@limiter.exempt
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({"status": "alive"})
+
+
+@app.route("/health")
+@app.route("/health/ready")
+@limiter.exempt
+def health():
+    """Readiness probe for monitoring and load balancer checks.
+
+    Dependency checks come from a cache that is refreshed in the background,
+    and warm-up state is read directly, so probes stay cheap and are neither
+    rate limited nor logged.
+
+    Returns:
+        JSON response indicating the service health status and dependency checks
+    """
+    checks = dict(cached_dependency_checks())
+    status = "healthy"
+    if checks["logging"] == "error":
+        status = "degraded"
+    if checks["msal"] == "error" or checks["cache_backend"] == "error":
+        status = "unhealthy"
+
+    # Workers are not ready until warm-up has finished
+    if _warmup_state.get("degraded"):
+        checks["warmup"] = "degraded"
+    elif _warmup_state["ready"]:
+        checks["warmup"] = "ok"
+    else:
+        checks["warmup"] = "pending"
+        status = "starting"
+
+    status_code = 200 if status == "healthy" else 503
+    return jsonify({"status": status, "checks": checks}), status_code
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -104,28 +441,48 @@ def index() -> str:
     Returns:
         Rendered HTML template with validation results if applicable
     """
+    if request.method == "GET":
+        return render_empty_form()
+
     results = []
     config_text = ""
+    level = DEFAULT_LEVEL
+    policy = DEFAULT_POLICY
     if request.method == "POST":
         config_text = request.form.get("config", "")
-        if len(config_text) > 10000:
+        level = request.form.get("level", DEFAULT_LEVEL)
+        policy = request.form.get("policy", DEFAULT_POLICY)
+        if len(config_text) > MAX_CONFIG_LENGTH:
             flash(
-                "Configuration is too large. Please limit to 10000 characters.",
+                "Configuration is too large. "
+                f"Please limit to {MAX_CONFIG_LENGTH} characters.",
                 "error",
             )
-            return render_template(
-                "index.html", results=results, config_text=config_text
-            )
+            return render_index(results, "", level)
+
+        timer = StageTimer() if PROFILE_REQUESTS else NULL_TIMER
+        with timer.stage("parse"):
+            parsed = parse_config_text(config_text)
+        # Secrets never leave the request: the form is re-rendered redacted
+        config_text = parsed.redacted_text
 
-        config_dict = {}
-        for line in config_text.splitlines():
-            if "=" in line:
-                key, value = line.split("=", 1)
-                config_dict[key.strip()] = value.strip()
+        if level not in VALIDATION_LEVELS:
+            flash(f"Unknown validation level '{level}'.", "error")
+            return render_index(results, config_text, DEFAULT_LEVEL)
+        if policy not in policies:
+            flash(f"Unknown policy '{policy}'.", "error")
+            return render_index(results, config_text, level)
 
         try:
-            config = AppConfig.model_validate(config_dict)
-            results = validate_config(config)
+            with timer.stage("model"):
+                config = AppConfig.model_validate(parsed.values)
+            plan = policies[policy].plan(level)
+            results = validate_config(config, timer, level, plan)
+            if parsed.secrets:
+                results = [
+                    {**result, "message": parsed.redact(result["message"])}
+                    for result in results
+                ]
 
             # Log the validation event for audit trail
             log_validation_event(
@@ -133,62 +490,91 @@ def index() -> str:
                 get_remote_address(),
                 "web_form",
                 results,
-                g.correlation_id,
+                timings=timer.timings,
             )
 
         except ValidationError as e:
-            error_msg = f"Configuration validation error: {e}"
-            flash(error_msg, "error")
+            error = parsed.redact(str(e))
+            flash(f"Configuration validation error: {error}", "error")
             logger.error(
                 "Configuration validation failed",
-                extra={
-                    "user_ip": get_remote_address(),
-                    "error": str(e),
-                    "correlation_id": g.correlation_id,
-                },
+                extra={"error": error},
             )
         except (ValueError, KeyError) as e:
-            error_msg = f"Invalid configuration format: {e}"
-            flash(error_msg, "error")
+            error = parsed.redact(str(e))
+            flash(f"Invalid configuration format: {error}", "error")
             logger.error(
                 "Configuration format error",
-                extra={
-                    "user_ip": get_remote_address(),
-                    "error": str(e),
-                    "correlation_id": g.correlation_id,
-                },
+                extra={"error": error},
             )
         except RuntimeError as e:
-            error_msg = f"Service temporarily unavailable: {e}"
-            flash(error_msg, "error")
+            error = parsed.redact(str(e))
+            flash(f"Service temporarily unavailable: {error}", "error")
             logger.error(
                 "Service runtime error",
-                extra={
-                    "user_ip": get_remote_address(),
-                    "error": str(e),
-                    "correlation_id": g.correlation_id,
-                },
+                extra={"error": error},
             )
         except Exception as e:
-            error_msg = f"Unexpected error during validation: {e}"
-            flash(error_msg, "error")
+            error = parsed.redact(str(e))
+            flash(f"Unexpected error during validation: {error}", "error")
             logger.error(
                 "Unexpected validation error",
-                extra={
-                    "user_ip": get_remote_address(),
-                    "error": str(e),
-                    "correlation_id": g.correlation_id,
-                },
+                extra={"error": error},
             )
 
-    return render_template("index.html", results=results, config_text=config_text)
+    return render_index(results, config_text, level, policy)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e: RequestEntityTooLarge) -> Tuple[str, int]:
+    """Answer an oversized form post with the empty form and an error."""
+    flash(
+        f"Request is too large. Please limit the configuration to "
+        f"{MAX_CONFIG_LENGTH} characters.",
+        "error",
+    )
+    return render_index([], "", DEFAULT_LEVEL), 413
+
+
+def compress_response(response):
+    """Gzip an HTML response when the client accepts it and it is worth it."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype != "text/html"
+        or "Content-Encoding" in response.headers
+        or not request.accept_encodings["gzip"]
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, COMPRESS_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 @app.after_request
 def after_request(response):
-    """Add correlation ID to response headers for request tracking."""
-    response.headers["X-Correlation-ID"] = g.correlation_id
-    return response
+    """Echo the correlation ID, if the request was given or needed one."""
+    correlation_id = peek_correlation_id()
+    if correlation_id is not None:
+        response.headers["X-Correlation-ID"] = correlation_id
+
+    # Fingerprinted asset URLs change whenever the file does
+    if request.endpoint == "static" and response.status_code == 200:
+        filename = (request.view_args or {}).get("filename", "")
+        if request.args.get("v") == static_fingerprint(filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+
+    return compress_response(response)
+
+
+start_warm_up()
 
 
 if __name__ == "__main__":
@@ -5,23 +5,71 @@ Utility functions for oidcheck.
 """
 
 import json
-from typing import List, Dict, Any, Optional
+import re
+from io import StringIO
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Tuple
+from .secret_resolver import parse_secret_reference
+
+_ENV_KEY_PATTERN = re.compile(r"\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_.]*)\s*=")
+
+# Keys whose values are hidden in logs and re-rendered forms
+_SECRET_KEY_PATTERN = re.compile(r"secret|password|passwd|token|api_?key", re.I)
+
+REDACTED = "********"
+
+# Line boundaries str.splitlines() recognizes besides "\n" and "\r", mapped
+# to "\n" one character for one, so offsets into the text are unchanged
+_OTHER_LINE_BREAKS = "\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_OTHER_LINE_BREAK_PATTERN = re.compile(f"[{_OTHER_LINE_BREAKS}]")
+_NORMALIZE_LINE_BREAKS = str.maketrans(dict.fromkeys(_OTHER_LINE_BREAKS, "\n"))
+
+# Shorter secret values are still hidden in the text, but not searched for in
+# messages, where they would match unrelated words
+_MIN_REDACTED_LENGTH = 4
+
+
+class ParsedConfig(NamedTuple):
+    """Key/value pairs parsed from pasted configuration text."""
+
+    values: Dict[str, str]
+    # The text with secret values replaced by REDACTED
+    redacted_text: str
+    secrets: Tuple[str, ...]
+
+    def redact(self, message: str) -> str:
+        """Returns message with every secret value replaced by REDACTED."""
+        for secret in self.secrets:
+            message = message.replace(secret, REDACTED)
+        return message
 
 
 def format_validation_results(
-    results: List[Dict[str, Any]], output_format: str = "text"
+    results: List[Dict[str, Any]],
+    output_format: str = "text",
+    source: str = ".env",
+    key_lines: Optional[Dict[str, int]] = None,
 ) -> str:
     """
     Format validation results for different output formats.
 
     Args:
         results: List of validation result dictionaries
-        output_format: Output format ("text", "json", "html")
+        output_format: Output format ("text", "json", "html", "sarif", "junit")
+        source: Name of the validated file, used by the SARIF and JUnit formats
+        key_lines: Line numbers of the file's keys, as returned by locate_keys;
+            used by the SARIF and JUnit formats to locate each finding
 
     Returns:
         Formatted string representation of results
     """
-    if output_format == "json":
+    if output_format in ("sarif", "junit"):
+        from .report import ReportWriter
+
+        stream = StringIO()
+        with ReportWriter(stream, output_format) as writer:
+            writer.write_results(source, results, key_lines)
+        return stream.getvalue()
+    elif output_format == "json":
         return json.dumps(results, indent=2)
     elif output_format == "html":
         html_parts = []
@@ -38,6 +86,139 @@ def format_validation_results(
         )
 
 
+def iter_validation_results(
+    results: Iterable[Dict[str, Any]], output_format: str = "text"
+) -> Iterator[str]:
+    """
+    Streaming counterpart of format_validation_results.
+
+    Yields the formatted output one result at a time, so neither the results
+    nor the formatted text need to be held in memory.
+
+    Args:
+        results: Iterable of validation result dictionaries; may be a generator
+        output_format: Output format ("text", "json", "ndjson", "html")
+
+    Yields:
+        Formatted chunks of output
+    """
+    if output_format == "json":
+        separator = "[\n"
+        for result in results:
+            yield separator + "  " + json.dumps(result)
+            separator = ",\n"
+        yield "[]\n" if separator == "[\n" else "\n]\n"
+    elif output_format == "ndjson":
+        for result in results:
+            yield json.dumps(result) + "\n"
+    elif output_format == "html":
+        for result in results:
+            level_class = f"result-{result['level'].lower()}"
+            yield (
+                f'<div class="{level_class}"><strong>{result["level"]}</strong>: '
+                f"{result['message']}</div>\n"
+            )
+    else:  # text format
+        for result in results:
+            yield f"[{result['level']}] {result['message']}\n"
+
+
+def locate_keys(file_path: str) -> Dict[str, int]:
+    """
+    Find the line on which each key of a .env file is set.
+
+    Keys are lower-cased so they can be matched against AppConfig field names.
+    As with python-dotenv, the last assignment of a repeated key wins.
+
+    Args:
+        file_path: Path to the configuration file
+
+    Returns:
+        Dictionary mapping lower-cased key names to 1-based line numbers; empty
+        if the file cannot be read, which, as for python-dotenv, is not an error
+    """
+    key_lines = {}
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                match = _ENV_KEY_PATTERN.match(line)
+                if match:
+                    key_lines[match.group(1).lower()] = line_number
+    except (OSError, UnicodeDecodeError):
+        return {}
+    return key_lines
+
+
+def parse_config_text(text: str) -> ParsedConfig:
+    """
+    Parse KEY=VALUE lines in a single pass, noting secret values to redact.
+
+    Lines end at the same boundaries as with str.splitlines(). Values of keys
+    that look like secrets (CLIENT_SECRET, *_PASSWORD, *_TOKEN, ...) are
+    redacted unless empty or a Key Vault reference. As in a .env file, the
+    last assignment of a repeated key wins.
+
+    Args:
+        text: The configuration text, e.g. as pasted into the web form
+
+    Returns:
+        The parsed values, the redacted text and the secret values
+    """
+    values = {}
+    secret_keys: Dict[str, bool] = {}
+    secret_spans = []
+    position = 0
+    length = len(text)
+    # Rare line breaks become "\n", so only "\n" and "\r" need searching for
+    scan = text
+    if _OTHER_LINE_BREAK_PATTERN.search(text):
+        scan = text.translate(_NORMALIZE_LINE_BREAKS)
+    while True:
+        # Jump from "=" to "=", so lines without one cost nothing
+        equals = scan.find("=", position)
+        if equals < 0:
+            break
+        start = max(
+            scan.rfind("\n", position, equals), scan.rfind("\r", position, equals)
+        )
+        start = position if start < 0 else start + 1
+        end = scan.find("\n", equals)
+        end = length if end < 0 else end
+        carriage_return = scan.find("\r", equals, end)
+        end = end if carriage_return < 0 else carriage_return
+        position = end
+
+        key = text[start:equals].strip()
+        raw_value = text[equals + 1 : end]
+        value = raw_value.strip()
+        values[key] = value
+        if key not in secret_keys:
+            secret_keys[key] = bool(_SECRET_KEY_PATTERN.search(key))
+        if value and secret_keys[key] and parse_secret_reference(value) is None:
+            value_start = end - len(raw_value.lstrip())
+            secret_spans.append((value_start, value_start + len(value)))
+
+    if not secret_spans:
+        return ParsedConfig(values, text, ())
+    parts = []
+    position = 0
+    for start, end in secret_spans:
+        parts += [text[position:start], REDACTED]
+        position = end
+    parts.append(text[position:])
+    # Longest first, so a secret containing another is redacted whole
+    secrets = sorted(
+        {text[start:end] for start, end in secret_spans} - {""},
+        key=len,
+        reverse=True,
+    )
+    return ParsedConfig(
+        values,
+        "".join(parts),
+        tuple(s for s in secrets if len(s) >= _MIN_REDACTED_LENGTH),
+    )
+
+
 def load_config_from_file(file_path: str) -> Dict[str, Optional[str]]:
     """
     Load configuration from various file formats.
@@ -1,131 +1,274 @@
 # oidcheck/validator.py
-from .models import AppConfig
-import msal
+from __future__ import annotations
+
+from .profiling import NULL_TIMER, StageTimer
+from .request_context import submit
+from .secret_resolver import parse_secret_reference
 import asyncio
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Dict,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlparse
 
+if TYPE_CHECKING:
+    # Only needed for annotations, which keeps pydantic off the daemon client path
+    from .models import AppConfig
 
-def validate_config(config: AppConfig) -> List[Dict[str, Any]]:
-    """
-    Validates the OIDC configuration using a Pydantic model.
+# Shared by every MSAL client built in this process so OIDC discovery responses
+# (cached by MSAL for 24h) are fetched once instead of on every validation.
+_MSAL_HTTP_CACHE: Dict[str, Any] = {}
 
-    Args:
-        config: An AppConfig instance containing the OIDC configuration to validate
+# Transport for MSAL's requests to login endpoints; None uses a pooled session
+_msal_http_client: Optional[Any] = None
+_msal_session: Optional[Any] = None
 
-    Returns:
-        A list of validation results, each containing 'level' and 'message' keys.
-        Levels can be 'INFO', 'WARNING', or 'ERROR'.
+# MSAL is synchronous, so async validation runs blocking rules on this many
+# dedicated threads; the other rules run inline on the event loop
+MSAL_WORKERS = int(os.environ.get("OIDCHECK_MSAL_WORKERS", "8"))
+_msal_executor: Optional[ThreadPoolExecutor] = None
 
-    Raises:
-        ValueError: If the configuration contains invalid values that prevent validation
+# Authorities whose discovery documents are in _MSAL_HTTP_CACHE; until then,
+# one validation per authority fetches them while the others wait
+_discovered: set = set()
+_discovery_locks: Dict[str, threading.Lock] = {}
+_init_lock = threading.Lock()
+
+# Seconds a failed discovery is reported again without retrying it, so a
+# burst of validations against an unreachable authority does not queue up
+# behind one network timeout after another
+FAILED_DISCOVERY_TTL = float(os.environ.get("OIDCHECK_FAILED_DISCOVERY_TTL", "30"))
+
+# authority -> (monotonic expiry, the finding its discovery failed with)
+_failed_discoveries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _reset_after_fork() -> None:
+    global _msal_session, _msal_executor, _init_lock, _discovery_locks
+    _msal_session = None
+    _msal_executor = None
+    _init_lock = threading.Lock()
+    _discovery_locks = {}
+
+
+# Forked workers (e.g. gunicorn --preload) must not share the parent's pooled
+# connections, or inherit its worker threads and locks
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+KNOWN_CLOUD_AUTHORITIES = (
+    "https://login.microsoftonline.com/organizations",
+    "https://login.microsoftonline.us/organizations",
+)
+
+# "quick" runs only the heuristic rules, "standard" also builds an MSAL client
+# and "full" additionally simulates the auth code flow to produce an auth URL.
+VALIDATION_LEVELS = ("quick", "standard", "full")
+DEFAULT_LEVEL = "standard"
+
+
+# Stable finding IDs, each mapped to the AppConfig field its source location
+# points at when findings are reported against a configuration file.
+FINDING_FIELDS: Dict[str, str] = {
+    "authority-mixed-clouds": "authority",
+    "authority-unknown-cloud": "authority",
+    "authority-not-us-gov": "authority",
+    "tenant-gov-authority-not-gov": "tenant_id",
+    "authority-gov-tenant-not-gov": "tenant_id",
+    "tenant-dod-authority-mismatch": "tenant_id",
+    "tenant-gcc-high-authority-mismatch": "tenant_id",
+    "tenant-not-in-authority": "tenant_id",
+    "redirect-uri-not-https": "redirect_uri",
+    "scope-missing-openid": "scope",
+    "scope-missing-profile": "scope",
+    "log-level-sensitive": "log_level",
+    "secret-storage": "client_secret",
+    "authority-format": "authority",
+    "msal-client-initialized": "client_id",
+    "msal-client-failed": "authority",
+    "msal-client-error": "authority",
+    "msal-auth-url": "redirect_uri",
+    "secret-reference-resolved": "client_secret",
+    "secret-reference-missing": "client_secret",
+    "secret-reference-disabled": "client_secret",
+    "secret-reference-expired": "client_secret",
+    "secret-reference-expiring": "client_secret",
+    "secret-reference-unverified": "client_secret",
+}
+
+
+class Rule(NamedTuple):
+    """A validation rule and the AppConfig fields it reads."""
+
+    name: str
+    fields: Tuple[str, ...]
+    check: Callable[[AppConfig, StageTimer], List[Dict[str, Any]]]
+    # Blocking rules call into MSAL and may perform network I/O
+    blocking: bool = False
+    # What the findings depend on, when narrower than the values of fields
+    # (e.g. only whether a field is set); None means the field values
+    inputs: Optional[Callable[[AppConfig], Tuple[Any, ...]]] = None
+
+
+def _check_authority(
+    config: AppConfig, timer: StageTimer, require_us_gov_authority: bool = False
+) -> List[Dict[str, Any]]:
     """
-    results = []
+    Checks the authority cloud and its consistency with the tenant ID.
+
+    With require_us_gov_authority, any authority that is not a US Government
+    (.us) endpoint is an error, whatever the tenant.
+    """
+    results: List[Dict[str, Any]] = []
+    if not config.authority:
+        return results
+
+    authority_lower = config.authority.lower()
+    is_commercial = "login.microsoftonline.com" in authority_lower
+    is_us_gov = "login.microsoftonline.us" in authority_lower
+    is_dod = "login.microsoftonline.us" in authority_lower and "dod" in authority_lower
+    is_gcc_high = "login.microsoftonline.us" in authority_lower
 
-    # 1. Pydantic already handles missing fields if they are not Optional
-    # and type validation (e.g., for HttpUrl).
+    if is_commercial and is_us_gov:
+        results.append(
+            {
+                "level": "ERROR",
+                "rule": "authority-mixed-clouds",
+                "message": "Authority mixes commercial (.com) and US Government "
+                "(.us) endpoints.",
+            }
+        )
+    elif not is_commercial and not is_us_gov:
+        results.append(
+            {
+                "level": "WARNING",
+                "rule": "authority-unknown-cloud",
+                "message": "Authority does not appear to be a standard Microsoft "
+                "public cloud endpoint.",
+            }
+        )
+
+    if require_us_gov_authority and not is_us_gov:
+        results.append(
+            {
+                "level": "ERROR",
+                "rule": "authority-not-us-gov",
+                "message": "Policy requires a US Government (.us) authority.",
+            }
+        )
+
+    if config.tenant_id:
+        tenant_id_lower = config.tenant_id.lower()
 
-    # 2. Authority validation
-    if config.authority:
-        authority_lower = config.authority.lower()
-        is_commercial = "login.microsoftonline.com" in authority_lower
-        is_us_gov = "login.microsoftonline.us" in authority_lower
-        is_dod = (
-            "login.microsoftonline.us" in authority_lower and "dod" in authority_lower
+        # Enhanced GCC-High detection patterns
+        tenant_is_gov = (
+            ".onmicrosoft.us" in tenant_id_lower
+            or tenant_id_lower.endswith(".us")
+            or ".mail.mil" in tenant_id_lower
+            or ".gov" in tenant_id_lower
         )
-        is_gcc_high = "login.microsoftonline.us" in authority_lower
 
-        if is_commercial and is_us_gov:
+        # More specific tenant type detection
+        tenant_is_dod = ".mail.mil" in tenant_id_lower or "dod" in tenant_id_lower
+        tenant_is_gcc_high = ".onmicrosoft.us" in tenant_id_lower and not tenant_is_dod
+
+        if tenant_is_gov and not is_us_gov:
             results.append(
                 {
                     "level": "ERROR",
-                    "message": "Authority mixes commercial (.com) and US Government "
-                    "(.us) endpoints.",
+                    "rule": "tenant-gov-authority-not-gov",
+                    "message": "Tenant ID appears to be for a US Government environment, "
+                    "but the authority is not a .us endpoint.",
                 }
             )
-        elif not is_commercial and not is_us_gov:
+        elif not tenant_is_gov and is_us_gov:
             results.append(
                 {
                     "level": "WARNING",
-                    "message": "Authority does not appear to be a standard Microsoft "
-                    "public cloud endpoint.",
+                    "rule": "authority-gov-tenant-not-gov",
+                    "message": "Authority is a US Government endpoint, but the tenant ID "
+                    "does not appear to be a standard US Government tenant.",
                 }
             )
 
-        if config.tenant_id:
-            tenant_id_lower = config.tenant_id.lower()
-
-            # Enhanced GCC-High detection patterns
-            tenant_is_gov = (
-                ".onmicrosoft.us" in tenant_id_lower
-                or tenant_id_lower.endswith(".us")
-                or ".mail.mil" in tenant_id_lower
-                or ".gov" in tenant_id_lower
+        # Additional validation for specific gov cloud types
+        if tenant_is_dod and not is_dod:
+            results.append(
+                {
+                    "level": "WARNING",
+                    "rule": "tenant-dod-authority-mismatch",
+                    "message": "Tenant appears to be DoD but authority may not be "
+                    "configured for DoD environment.",
+                }
+            )
+        elif tenant_is_gcc_high and not is_gcc_high:
+            results.append(
+                {
+                    "level": "WARNING",
+                    "rule": "tenant-gcc-high-authority-mismatch",
+                    "message": "Tenant appears to be GCC-High but authority may not be "
+                    "configured correctly.",
+                }
             )
 
-            # More specific tenant type detection
-            tenant_is_dod = ".mail.mil" in tenant_id_lower or "dod" in tenant_id_lower
-            tenant_is_gcc_high = (
-                ".onmicrosoft.us" in tenant_id_lower and not tenant_is_dod
+        if config.tenant_id not in config.authority:
+            results.append(
+                {
+                    "level": "WARNING",
+                    "rule": "tenant-not-in-authority",
+                    "message": "TENANT_ID is not present in AUTHORITY string.",
+                }
             )
 
-            if tenant_is_gov and not is_us_gov:
-                results.append(
-                    {
-                        "level": "ERROR",
-                        "message": "Tenant ID appears to be for a US Government environment, "
-                        "but the authority is not a .us endpoint.",
-                    }
-                )
-            elif not tenant_is_gov and is_us_gov:
-                results.append(
-                    {
-                        "level": "WARNING",
-                        "message": "Authority is a US Government endpoint, but the tenant ID "
-                        "does not appear to be a standard US Government tenant.",
-                    }
-                )
+    return results
 
-            # Additional validation for specific gov cloud types
-            if tenant_is_dod and not is_dod:
-                results.append(
-                    {
-                        "level": "WARNING",
-                        "message": "Tenant appears to be DoD but authority may not be "
-                        "configured for DoD environment.",
-                    }
-                )
-            elif tenant_is_gcc_high and not is_gcc_high:
-                results.append(
-                    {
-                        "level": "WARNING",
-                        "message": "Tenant appears to be GCC-High but authority may not be "
-                        "configured correctly.",
-                    }
-                )
 
-            if config.tenant_id not in config.authority:
-                results.append(
-                    {
-                        "level": "WARNING",
-                        "message": "TENANT_ID is not present in AUTHORITY string.",
-                    }
-                )
+_LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "[::1]", "::1")
 
-    # 3. Redirect URI validation (Pydantic validates the URL format)
-    if config.redirect_uri and config.redirect_uri.scheme != "https":
-        results.append(
-            {
-                "level": "WARNING",
-                "message": "REDIRECT_URI is not using HTTPS. This is not secure.",
-            }
-        )
 
-    # 4. Scope validation
+def _check_redirect_uri(
+    config: AppConfig, timer: StageTimer, allow_http_localhost: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Checks that the redirect URI uses HTTPS (Pydantic validates the format).
+
+    With allow_http_localhost, plain HTTP is accepted for loopback hosts.
+    """
+    if not config.redirect_uri or config.redirect_uri.scheme == "https":
+        return []
+    if allow_http_localhost and config.redirect_uri.host in _LOOPBACK_HOSTS:
+        return []
+    return [
+        {
+            "level": "WARNING",
+            "rule": "redirect-uri-not-https",
+            "message": "REDIRECT_URI is not using HTTPS. This is not secure.",
+        }
+    ]
+
+
+def _check_scope(config: AppConfig, timer: StageTimer) -> List[Dict[str, Any]]:
+    """Checks that the scopes needed for OIDC sign-in are requested."""
+    results = []
     scope_list: List[str] = config.scope if config.scope is not None else []
     if "openid" not in scope_list:
         results.append(
             {
                 "level": "WARNING",
+                "rule": "scope-missing-openid",
                 "message": "SCOPE is missing 'openid'. This is required for OIDC.",
             }
         )
@@ -133,103 +276,453 @@ def validate_config(config: AppConfig) -> List[Dict[str, Any]]:
         results.append(
             {
                 "level": "WARNING",
+                "rule": "scope-missing-profile",
                 "message": "SCOPE is missing 'profile'. This is often needed to get "
                 "user information.",
             }
         )
+    return results
+
 
-    # 5. Log Level
+def _check_log_level(config: AppConfig, timer: StageTimer) -> List[Dict[str, Any]]:
+    """Checks for log levels that may leak sensitive information."""
     if config.log_level.upper() in ["DEBUG", "TRACE"]:
-        results.append(
+        return [
             {
                 "level": "WARNING",
+                "rule": "log-level-sensitive",
                 "message": f"LOG_LEVEL is set to '{config.log_level}'. This may log "
                 f"sensitive information.",
             }
-        )
+        ]
+    return []
+
 
-    # 6. Secret Storage
-    results.append(
+def _check_secret_storage(config: AppConfig, timer: StageTimer) -> List[Dict[str, Any]]:
+    """Recommends secure secret storage unless the secret is a Key Vault reference."""
+    if parse_secret_reference(config.client_secret):
+        return []
+    return [
         {
             "level": "INFO",
+            "rule": "secret-storage",
             "message": "For production, use a secure secret storage like Azure Key Vault "
             "instead of .env files.",
         }
-    )
+    ]
 
-    # 7. MSAL ConfidentialClientApplication simulation
-    if config.client_id and config.authority:
-        try:
+
+def _check_authority_format(
+    config: AppConfig, timer: StageTimer
+) -> List[Dict[str, Any]]:
+    """
+    Applies MSAL's local authority URL checks without building an MSAL client.
+
+    MSAL rejects authorities that are not https URLs with a host and at least
+    one path segment (the tenant) before making any network call.
+    """
+    if not (config.client_id and config.authority):
+        return []
+
+    parsed = urlparse(config.authority)
+    if parsed.scheme == "https" and parsed.hostname and parsed.path.strip("/"):
+        return []
+    return [
+        {
+            "level": "ERROR",
+            "rule": "authority-format",
+            "message": "AUTHORITY must be an https URL with a hostname and a tenant "
+            "path segment, e.g. https://login.microsoftonline.com/{tenant}.",
+        }
+    ]
+
+
+def set_msal_http_client(http_client: Optional[Any]) -> None:
+    """
+    Route MSAL's requests to login endpoints through a requests-like client.
+
+    Used by the load-test harness to answer OIDC discovery locally; pass None
+    to restore MSAL's default transport.
+    """
+    global _msal_http_client
+    _msal_http_client = http_client
+
+
+def _pooled_session() -> Any:
+    global _msal_session
+    with _init_lock:
+        if _msal_session is None:
+            import requests
+
+            # As MSAL's default transport, but shared so connections to login
+            # endpoints are reused across clients
+            adapter = requests.adapters.HTTPAdapter(
+                max_retries=1, pool_maxsize=MSAL_WORKERS
+            )
+            _msal_session = requests.Session()
+            _msal_session.mount("https://", adapter)
+            _msal_session.mount("http://", adapter)
+        return _msal_session
+
+
+def _msal_options() -> Dict[str, Any]:
+    return {
+        "http_cache": _MSAL_HTTP_CACHE,
+        "http_client": (
+            _msal_http_client if _msal_http_client is not None else _pooled_session()
+        ),
+    }
+
+
+class _RecentDiscoveryFailure(Exception):
+    """Raised instead of retrying a discovery that failed moments ago."""
+
+    def __init__(self, finding: Dict[str, Any]) -> None:
+        super().__init__(finding["message"])
+        self.finding = finding
+
+
+def _raise_recent_failure(authority: str) -> None:
+    failure = _failed_discoveries.get(authority)
+    if failure is not None and failure[0] > time.monotonic():
+        raise _RecentDiscoveryFailure(failure[1])
+
+
+def _remember_failure(authority: str, finding: Dict[str, Any]) -> None:
+    now = time.monotonic()
+    for expired in [a for a, (until, _) in _failed_discoveries.items() if until <= now]:
+        _failed_discoveries.pop(expired, None)
+    _failed_discoveries[authority] = (now + FAILED_DISCOVERY_TTL, finding)
+
+
+@contextmanager
+def _single_discovery(authority: str) -> Iterator[None]:
+    """Lets one caller at a time build a client until the authority is cached.
+
+    Callers that waited for a discovery that failed get its failure instead
+    of retrying, see FAILED_DISCOVERY_TTL.
+    """
+    if authority in _discovered:
+        yield
+        return
+    with _init_lock:
+        lock = _discovery_locks.setdefault(authority, threading.Lock())
+    with lock:
+        _raise_recent_failure(authority)
+        yield
+        _discovered.add(authority)
+        _failed_discoveries.pop(authority, None)
+
+
+def _simulate_msal(
+    config: AppConfig, timer: StageTimer, auth_flow: bool
+) -> List[Dict[str, Any]]:
+    """Builds an MSAL ConfidentialClientApplication and optionally an auth URL."""
+    results: List[Dict[str, Any]] = []
+    if not (config.client_id and config.authority):
+        return results
+
+    app = None
+    try:
+        import msal
+
+        _raise_recent_failure(config.authority)
+        with timer.stage("msal_client"), _single_discovery(config.authority):
             app = msal.ConfidentialClientApplication(
                 client_id=config.client_id,
                 authority=config.authority,
                 client_credential=config.client_secret,
+                **_msal_options(),
             )
-            # This doesn't make a network call, just validates the authority format
-            flow = app.initiate_auth_code_flow(
-                scopes=scope_list,
-                redirect_uri=str(config.redirect_uri) if config.redirect_uri else None,
-            )
-            results.append(
-                {
-                    "level": "INFO",
-                    "message": "Successfully initialized MSAL ConfidentialClientApplication.",
-                }
-            )
+        results.append(
+            {
+                "level": "INFO",
+                "rule": "msal-client-initialized",
+                "message": "Successfully initialized MSAL ConfidentialClientApplication.",
+            }
+        )
+
+        if auth_flow:
+            # Generates PKCE verifier, state and nonce; no network call
+            with timer.stage("auth_url"):
+                flow = app.initiate_auth_code_flow(
+                    scopes=config.scope if config.scope is not None else [],
+                    redirect_uri=(
+                        str(config.redirect_uri) if config.redirect_uri else None
+                    ),
+                )
             results.append(
                 {
                     "level": "INFO",
+                    "rule": "msal-auth-url",
                     "message": f"Generated Auth URL: {flow['auth_uri']}",
                 }
             )
 
-        except (ValueError, RuntimeError) as e:
-            results.append(
-                {
-                    "level": "ERROR",
-                    "message": f"Failed to initialize MSAL client: {e}",
-                }
-            )
-        except Exception as e:
-            results.append(
-                {
-                    "level": "ERROR",
-                    "message": f"Unexpected error during MSAL initialization: {e}",
-                }
+    except _RecentDiscoveryFailure as e:
+        return [dict(e.finding)]
+    except (ValueError, RuntimeError) as e:
+        results.append(
+            {
+                "level": "ERROR",
+                "rule": "msal-client-failed",
+                "message": f"Failed to initialize MSAL client: {e}",
+            }
+        )
+    except Exception as e:
+        results.append(
+            {
+                "level": "ERROR",
+                "rule": "msal-client-error",
+                "message": f"Unexpected error during MSAL initialization: {e}",
+            }
+        )
+
+    if app is None and results:
+        _remember_failure(config.authority, results[-1])
+    return results
+
+
+def _check_msal_client(config: AppConfig, timer: StageTimer) -> List[Dict[str, Any]]:
+    return _simulate_msal(config, timer, auth_flow=False)
+
+
+def _check_msal_auth_flow(config: AppConfig, timer: StageTimer) -> List[Dict[str, Any]]:
+    return _simulate_msal(config, timer, auth_flow=True)
+
+
+def _secret_is_reference(config: AppConfig) -> Tuple[Any, ...]:
+    return (parse_secret_reference(config.client_secret) is not None,)
+
+
+def _client_and_authority(config: AppConfig) -> Tuple[Any, ...]:
+    # MSAL accepts any client ID and secret string when building a client, so
+    # only whether a client ID is set changes the outcome
+    return (bool(config.client_id), config.authority)
+
+
+def _auth_flow_inputs(config: AppConfig) -> Tuple[Any, ...]:
+    # The auth URL includes the client ID, but never the secret
+    return (
+        config.client_id,
+        config.authority,
+        str(config.redirect_uri) if config.redirect_uri else None,
+        tuple(config.scope) if config.scope is not None else None,
+    )
+
+
+_HEURISTIC_RULES = (
+    Rule("authority", ("authority", "tenant_id"), _check_authority),
+    Rule("redirect_uri", ("redirect_uri",), _check_redirect_uri),
+    Rule("scope", ("scope",), _check_scope),
+    Rule("log_level", ("log_level",), _check_log_level),
+    Rule(
+        "secret_storage",
+        ("client_secret",),
+        _check_secret_storage,
+        inputs=_secret_is_reference,
+    ),
+)
+
+_MSAL_CLIENT_FIELDS = ("client_id", "client_secret", "authority")
+_MSAL_FLOW_FIELDS = _MSAL_CLIENT_FIELDS + ("redirect_uri", "scope")
+
+RULES_BY_LEVEL: Dict[str, Tuple[Rule, ...]] = {
+    "quick": _HEURISTIC_RULES
+    + (
+        Rule(
+            "authority_format",
+            ("client_id", "authority"),
+            _check_authority_format,
+            inputs=_client_and_authority,
+        ),
+    ),
+    "standard": _HEURISTIC_RULES
+    + (
+        Rule(
+            "msal_client",
+            _MSAL_CLIENT_FIELDS,
+            _check_msal_client,
+            blocking=True,
+            inputs=_client_and_authority,
+        ),
+    ),
+    "full": _HEURISTIC_RULES
+    + (
+        Rule(
+            "msal_auth_flow",
+            _MSAL_FLOW_FIELDS,
+            _check_msal_auth_flow,
+            blocking=True,
+            inputs=_auth_flow_inputs,
+        ),
+    ),
+}
+
+
+# Options a policy may set, and the rule whose check accepts each as a keyword
+RULE_OPTIONS: Dict[str, str] = {
+    "allow_http_localhost": "redirect_uri",
+    "require_us_gov_authority": "authority",
+}
+
+
+def get_rules(level: str = DEFAULT_LEVEL) -> Tuple[Rule, ...]:
+    """
+    Returns the rules run at the given validation level.
+
+    Raises:
+        ValueError: If the level is not one of VALIDATION_LEVELS
+    """
+    try:
+        return RULES_BY_LEVEL[level]
+    except KeyError:
+        raise ValueError(
+            f"Unknown validation level '{level}'. "
+            f"Choose one of: {', '.join(VALIDATION_LEVELS)}"
+        ) from None
+
+
+def run_rule(
+    rule: Rule, config: AppConfig, timer: StageTimer = NULL_TIMER
+) -> List[Dict[str, Any]]:
+    """Runs a single rule, timing non-blocking rules as the "rules" stage."""
+    if rule.blocking:
+        return rule.check(config, timer)
+    with timer.stage("rules"):
+        return rule.check(config, timer)
+
+
+def _blocking_executor() -> ThreadPoolExecutor:
+    global _msal_executor
+    with _init_lock:
+        if _msal_executor is None:
+            _msal_executor = ThreadPoolExecutor(
+                max_workers=MSAL_WORKERS, thread_name_prefix="oidcheck-msal"
             )
+        return _msal_executor
+
+
+async def run_rule_async(
+    rule: Rule, config: AppConfig, timer: StageTimer = NULL_TIMER
+) -> List[Dict[str, Any]]:
+    """
+    Async version of run_rule.
+
+    Non-blocking rules run inline on the event loop. Blocking rules run on a
+    pool of MSAL_WORKERS threads, in a copy of the current context.
+    """
+    if not rule.blocking:
+        return run_rule(rule, config, timer)
+    return await asyncio.wrap_future(
+        submit(_blocking_executor(), run_rule, rule, config, timer)
+    )
+
 
+def validate_config(
+    config: AppConfig,
+    timer: StageTimer = NULL_TIMER,
+    level: str = DEFAULT_LEVEL,
+    plan: Optional[Tuple[Rule, ...]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Validates the OIDC configuration using a Pydantic model.
+
+    Args:
+        config: An AppConfig instance containing the OIDC configuration to validate
+        timer: Records time spent in the "rules", "msal_client" and "auth_url" stages
+        level: "quick" skips MSAL entirely, "standard" builds an MSAL client and
+            "full" also simulates the auth code flow
+        plan: The rules to run instead of those of the level, such as a
+            policy's compiled plan (see policy.Policy.plan)
+
+    Returns:
+        A list of validation results, each containing 'level', 'rule' and 'message'
+        keys. Levels can be 'INFO', 'WARNING', or 'ERROR'; 'rule' is a stable
+        finding ID from FINDING_FIELDS.
+
+    Raises:
+        ValueError: If the validation level is unknown
+    """
+    results = []
+    for rule in plan if plan is not None else get_rules(level):
+        results.extend(run_rule(rule, config, timer))
     return results
 
 
-async def validate_config_async(config: AppConfig) -> List[Dict[str, Any]]:
+def prime_authority_metadata(
+    authorities: Iterable[str] = KNOWN_CLOUD_AUTHORITIES,
+) -> Dict[str, str]:
+    """
+    Fetches authority metadata for the given clouds into the shared MSAL cache.
+
+    Args:
+        authorities: Authority URLs whose OIDC discovery documents should be cached
+
+    Returns:
+        A mapping of authority URL to "ok" or "error", one entry per authority.
+    """
+    import msal
+
+    status = {}
+    for authority in authorities:
+        try:
+            msal.ConfidentialClientApplication(
+                client_id="00000000-0000-0000-0000-000000000000",
+                authority=authority,
+                **_msal_options(),
+            )
+            status[authority] = "ok"
+        except Exception:
+            status[authority] = "error"
+    return status
+
+
+async def validate_config_async(
+    config: AppConfig,
+    timer: StageTimer = NULL_TIMER,
+    level: str = DEFAULT_LEVEL,
+    plan: Optional[Tuple[Rule, ...]] = None,
+) -> List[Dict[str, Any]]:
     """
     Async version of validate_config for better performance when validating multiple configs.
 
+    Only blocking (MSAL) rules leave the event loop, see run_rule_async; a
+    "quick" validation never does.
+
     Args:
         config: An AppConfig instance containing the OIDC configuration to validate
+        timer: Records time spent in each validation stage
+        level: The validation level, see validate_config
+        plan: The rules to run instead of those of the level, see validate_config
 
     Returns:
-        A list of validation results, each containing 'level' and 'message' keys.
-        Levels can be 'INFO', 'WARNING', or 'ERROR'.
+        A list of validation results, each containing 'level', 'rule' and 'message'
+        keys. Levels can be 'INFO', 'WARNING', or 'ERROR'.
     """
-    return await asyncio.to_thread(validate_config, config)
+    results = []
+    for rule in plan if plan is not None else get_rules(level):
+        results.extend(await run_rule_async(rule, config, timer))
+    return results
 
 
 async def validate_multiple_configs(
     configs: List[AppConfig],
+    level: str = DEFAULT_LEVEL,
 ) -> List[List[Dict[str, Any]]]:
     """
     Validates multiple configurations concurrently for better performance.
 
     Args:
         configs: A list of AppConfig instances to validate
+        level: The validation level, see validate_config
 
     Returns:
         A list of validation result lists, one for each input configuration.
         Each inner list contains validation results with 'level' and 'message' keys.
 
     Raises:
-        ValueError: If any configuration contains invalid values that prevent validation
+        ValueError: If the validation level is unknown
     """
-    tasks = [validate_config_async(config) for config in configs]
+    tasks = [validate_config_async(config, level=level) for config in configs]
     return await asyncio.gather(*tasks)
@@ -0,0 +1,141 @@
+import os
+import socket
+import threading
+import time
+import pytest
+from oidcheck.daemon import (
+    MAX_MESSAGE_SIZE,
+    DaemonClient,
+    DaemonError,
+    create_server,
+    default_socket_path,
+    is_trusted_socket,
+    handle_request,
+    recv_message,
+    send_message,
+)
+
+
+@pytest.fixture
+def daemon_socket(tmp_path):
+    """A daemon serving on a temporary socket for the duration of a test."""
+    path = str(tmp_path / "oidcheck.sock")
+    server = create_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_default_socket_path(monkeypatch):
+    """Test socket path selection from the environment."""
+    monkeypatch.setenv("OIDCHECK_SOCKET", "/run/custom.sock")
+    assert default_socket_path() == "/run/custom.sock"
+    monkeypatch.delenv("OIDCHECK_SOCKET")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert default_socket_path() == "/run/user/1000/oidcheck.sock"
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    directory, name = os.path.split(default_socket_path())
+    assert name == "daemon.sock"
+    assert os.path.basename(directory) == f"oidcheck-{os.getuid()}"
+
+
+def test_default_directory_must_be_private(tmp_path, monkeypatch):
+    """Test that the daemon refuses a default directory others can access."""
+    monkeypatch.delenv("OIDCHECK_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr("tempfile.gettempdir", lambda: str(tmp_path))
+    path = default_socket_path()
+    server = create_server(path)
+    server.server_close()
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+    assert is_trusted_socket(path)
+
+    os.unlink(path)
+    os.chmod(os.path.dirname(path), 0o755)
+    with pytest.raises(DaemonError, match="not a directory private"):
+        create_server(path)
+
+
+def test_message_round_trip():
+    """Test the length-prefixed JSON framing."""
+    left, right = socket.socketpair()
+    with left, right:
+        send_message(left, {"op": "ping", "values": {"scope": "openid"}})
+        assert recv_message(right) == {"op": "ping", "values": {"scope": "openid"}}
+        left.shutdown(socket.SHUT_WR)
+        assert recv_message(right) is None
+
+
+def test_oversized_message_rejected():
+    """Test that messages above the size limit are refused before reading."""
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall((MAX_MESSAGE_SIZE + 1).to_bytes(4, "big"))
+        with pytest.raises(DaemonError, match="exceeds"):
+            recv_message(right)
+
+
+def test_handle_request():
+    """Test request dispatch inside the daemon."""
+    assert handle_request({"op": "ping"}) == {"ok": True}
+    assert "error" in handle_request({"op": "reload"})
+    assert "error" in handle_request({"op": "validate", "values": {}, "level": "x"})
+
+    response = handle_request(
+        {"op": "validate", "values": {"log_level": "DEBUG"}, "level": "quick"}
+    )
+    assert any(r["rule"] == "log-level-sensitive" for r in response["results"])
+
+
+def test_client_validates_through_daemon(daemon_socket):
+    """Test several requests over one client connection."""
+    with DaemonClient.connect(daemon_socket) as client:
+        assert client.request({"op": "ping"}) == {"ok": True}
+        results = client.validate({"scope": "openid profile"}, "quick")
+        assert [r["rule"] for r in results] == ["secret-storage"]
+        with pytest.raises(DaemonError, match="Unknown validation level"):
+            client.validate({}, "exhaustive")
+
+
+def test_client_connect_without_daemon(tmp_path):
+    """Test that connecting returns None when no daemon is running."""
+    assert DaemonClient.connect(str(tmp_path / "missing.sock")) is None
+
+
+def test_client_ignores_untrusted_sockets(tmp_path):
+    """Test that sockets open to other users, or other files, are not used."""
+    path = str(tmp_path / "open.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    try:
+        os.chmod(path, 0o666)
+        assert not is_trusted_socket(path)
+        assert DaemonClient.connect(path) is None
+    finally:
+        listener.close()
+
+    regular = tmp_path / "regular.sock"
+    regular.write_text("")
+    os.chmod(regular, 0o600)
+    assert not is_trusted_socket(str(regular))
+
+
+def test_client_gives_up_on_hung_daemon(tmp_path):
+    """Test that a daemon that accepts but never answers is skipped quickly."""
+    path = str(tmp_path / "hung.sock")
+    previous_umask = os.umask(0o177)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(previous_umask)
+    listener.listen()
+    try:
+        start = time.monotonic()
+        assert DaemonClient.connect(path, connect_timeout=0.1) is None
+        assert time.monotonic() - start < 1
+    finally:
+        listener.close()
@@ -0,0 +1,91 @@
+import pytest
+from oidcheck.diff import changed_fields, diff_configs
+from oidcheck.models import AppConfig
+
+
+@pytest.fixture
+def base_config():
+    """A valid base configuration."""
+    return {
+        "client_id": "test-client-id",
+        "client_secret": "test-client-secret",
+        "tenant_id": "test-tenant-id",
+        "authority": "https://login.microsoftonline.com/test-tenant-id",
+        "redirect_uri": "https://localhost/callback",
+        "scope": ["openid", "profile"],
+        "log_level": "INFO",
+    }
+
+
+def test_changed_fields(base_config):
+    old = AppConfig(**base_config)
+    base_config["log_level"] = "DEBUG"
+    base_config["scope"] = ["openid"]
+    new = AppConfig(**base_config)
+    assert changed_fields(old, new) == {"log_level", "scope"}
+    assert changed_fields(old, old) == set()
+
+
+def test_diff_reruns_only_affected_rules(base_config, mocker):
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    old = AppConfig(**base_config)
+    base_config["redirect_uri"] = "http://localhost/callback"
+    base_config["log_level"] = "DEBUG"
+    new = AppConfig(**base_config)
+
+    diff = diff_configs(old, new)
+
+    assert diff["changed_fields"] == ["log_level", "redirect_uri"]
+    assert diff["rerun_rules"] == ["redirect_uri", "log_level"]
+    # The MSAL fields did not change, so only the old config built a client
+    assert mock_msal_app.call_count == 1
+    added = [r["message"] for r in diff["added"]]
+    assert any("REDIRECT_URI is not using HTTPS" in m for m in added)
+    assert any("LOG_LEVEL is set to 'DEBUG'" in m for m in added)
+    assert diff["removed"] == []
+    assert any("Azure Key Vault" in r["message"] for r in diff["unchanged"])
+
+
+def test_diff_reports_removed_findings(base_config):
+    base_config["scope"] = ["profile"]
+    old = AppConfig(**base_config)
+    base_config["scope"] = ["openid", "profile", "email"]
+    new = AppConfig(**base_config)
+
+    diff = diff_configs(old, new, level="quick")
+
+    assert diff["added"] == []
+    assert [r["message"] for r in diff["removed"]] == [
+        "SCOPE is missing 'openid'. This is required for OIDC."
+    ]
+
+
+def test_diff_keeps_findings_shared_by_both_versions(base_config):
+    base_config["tenant_id"] = "tenant.onmicrosoft.us"
+    old = AppConfig(**base_config)
+    base_config["authority"] = "https://login.microsoftonline.com/other-tenant"
+    new = AppConfig(**base_config)
+
+    diff = diff_configs(old, new, level="quick")
+
+    assert diff["rerun_rules"] == ["authority", "authority_format"]
+    assert any("US Government environment" in r["message"] for r in diff["unchanged"])
+    assert diff["removed"] == []
+
+
+def test_diff_reuses_findings_across_calls(base_config, mocker):
+    from oidcheck.fingerprint import FingerprintIndex
+
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    index = FingerprintIndex("full")
+    old = AppConfig(**base_config)
+    base_config["log_level"] = "DEBUG"
+    new = AppConfig(**base_config)
+
+    first = diff_configs(old, new, index=index)
+    second = diff_configs(old, new, index=index)
+
+    assert first == second
+    # The auth URL was built once, for the old config of the first call
+    assert mock_msal_app.call_count == 1
+    assert first["rerun_rules"] == ["log_level"]
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from oidcheck.fingerprint import (
+    FingerprintIndex,
+    config_fingerprint,
+    format_dedup_stats,
+    rule_fingerprint,
+)
+from oidcheck.models import AppConfig
+from oidcheck.validator import Rule, get_rules, validate_config
+
+
+@pytest.fixture
+def fleet():
+    """Six services sharing two authority/scope setups, each with its own client."""
+    configs = []
+    for i in range(6):
+        tenant = f"tenant-{i % 2}"
+        configs.append(
+            AppConfig(
+                client_id=f"client-{i}",
+                client_secret="shared-secret",
+                tenant_id=tenant,
+                authority=f"https://login.microsoftonline.com/{tenant}",
+                redirect_uri="https://localhost/callback",
+                scope=["openid"] if i % 2 else ["openid", "profile"],
+                log_level="INFO",
+            )
+        )
+    return configs
+
+
+def test_config_fingerprint(fleet):
+    assert config_fingerprint(fleet[0], ("authority", "scope")) == (
+        "https://login.microsoftonline.com/tenant-0",
+        ("openid", "profile"),
+    )
+    assert config_fingerprint(fleet[0], ("redirect_uri",)) == (
+        "https://localhost/callback",
+    )
+
+
+def test_validate_many_matches_validate_config(fleet, mocker):
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    index = FingerprintIndex()
+
+    results = index.validate_many(fleet)
+
+    assert results == [validate_config(config) for config in fleet]
+    stats = index.stats()
+    assert stats["naive_evaluations"] == 36
+    # authority, scope and msal: 2 groups; redirect_uri, log_level, secret: 1
+    assert stats["groups"] == {
+        "authority": 2,
+        "redirect_uri": 1,
+        "scope": 2,
+        "log_level": 1,
+        "secret_storage": 1,
+        "msal_client": 2,
+    }
+    assert stats["evaluations"] == 9
+    assert stats["saved"] == 27
+    # Building a client only depends on the authority once a client ID is set,
+    # so one client per authority, plus one per config for validate_config
+    assert mock_msal_app.call_count == 8
+
+
+def test_groups_are_reused_across_batches(fleet, mocker):
+    check = mocker.patch("oidcheck.validator._check_log_level", return_value=[])
+    mocker.patch(
+        "oidcheck.fingerprint.get_rules",
+        return_value=(Rule("log_level", ("log_level",), check),),
+    )
+    index = FingerprintIndex()
+    index.validate_many(fleet[:3])
+    index.validate_many(fleet[3:])
+    assert check.call_count == 1
+    assert index.stats()["saved"] == 5
+
+
+def test_fanned_out_findings_are_copies(fleet):
+    first, second = FingerprintIndex("quick").validate_many(fleet[:2])
+    first[0]["message"] = "changed"
+    assert second[0]["message"] != "changed"
+
+
+def test_validate_many_async(fleet, mocker):
+    mocker.patch("msal.ConfidentialClientApplication")
+    index = FingerprintIndex()
+    results = asyncio.run(index.validate_many_async(fleet + fleet))
+    assert results[:6] == results[6:]
+    assert index.stats()["evaluations"] == 9
+    assert "9 of 72 rule evaluations" in format_dedup_stats(index.stats())
+
+
+def test_keys_are_hashed_and_only_cover_rule_inputs(fleet):
+    index = FingerprintIndex("full")
+    index.validate_many(fleet[:1])
+    assert all("shared-secret" not in repr(key) for key in index._findings)
+
+    rules = {rule.name: rule for rule in get_rules("full") + get_rules("quick")}
+    rotated = fleet[0].model_copy(update={"client_secret": "rotated"})
+    renamed = fleet[0].model_copy(update={"client_id": "other-client"})
+    for name in ("authority_format", "msal_auth_flow"):
+        assert rule_fingerprint(rules[name], rotated) == rule_fingerprint(
+            rules[name], fleet[0]
+        )
+    assert rule_fingerprint(rules["authority_format"], renamed) == rule_fingerprint(
+        rules["authority_format"], fleet[0]
+    )
+    # The auth URL includes the client ID
+    assert rule_fingerprint(rules["msal_auth_flow"], renamed) != rule_fingerprint(
+        rules["msal_auth_flow"], fleet[0]
+    )
+
+
+def test_groups_are_bounded(fleet, mocker):
+    check = mocker.patch("oidcheck.validator._check_log_level", return_value=[])
+    mocker.patch(
+        "oidcheck.fingerprint.get_rules",
+        return_value=(Rule("scope", ("scope",), check),),
+    )
+    index = FingerprintIndex(max_groups=1)
+    # A batch may need more groups than are kept
+    assert len(index.validate_many(fleet)) == 6
+    assert len(index._findings) == 1
+    index.validate_many(fleet[1:2])
+    index.validate_many(fleet[:1])
+    assert check.call_count == 3
+    assert index.stats()["groups"] == {"scope": 3}
+
+    with pytest.raises(ValueError):
+        FingerprintIndex(max_groups=0)
+
+
+def test_unknown_level():
+    with pytest.raises(ValueError):
+        FingerprintIndex("deep")
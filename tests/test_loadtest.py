@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from oidcheck.loadtest import (
+    StubLoginBackend,
+    format_report,
+    load_test_app,
+    loadtest_main,
+    parse_mix,
+    percentile,
+    run_load_test,
+)
+
+
+def test_parse_mix():
+    """Test parsing of weighted scenario mixes."""
+    assert parse_mix("form=2, ready") == {"form": 2, "ready": 1}
+    with pytest.raises(ValueError, match="Unknown scenario"):
+        parse_mix("form=1,json=2")
+    with pytest.raises(ValueError, match="Invalid weight"):
+        parse_mix("form=0")
+    with pytest.raises(ValueError, match="Invalid weight"):
+        parse_mix("form=x")
+
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([7.0], 90) == 7.0
+
+
+def test_stub_backend_answers_msal_discovery():
+    """Test that MSAL initializes against the stub without the network."""
+    import msal
+
+    stub = StubLoginBackend()
+    msal.ConfidentialClientApplication(
+        client_id="00000000-0000-0000-0000-000000000000",
+        authority="https://login.microsoftonline.us/stub-tenant",
+        client_credential="secret",
+        http_client=stub,
+    )
+    assert stub.requests >= 1
+    assert stub.post("https://login.microsoftonline.us/t/token").status_code == 400
+
+
+def test_run_load_test_in_process():
+    """Test an in-process run and that the app settings are restored."""
+    from oidcheck.server import app, limiter
+    from oidcheck import validator
+
+    limiter_enabled = limiter.enabled
+    csrf_enabled = app.config.get("WTF_CSRF_ENABLED", True)
+    report = run_load_test(
+        "form=1,validate-full=2,validate-flawed=1,live=1", requests=40, concurrency=4
+    )
+
+    assert report["mode"] == "in-process"
+    assert report["total"]["requests"] == 40
+    assert report["total"]["errors"] == 0
+    assert sum(s["requests"] for s in report["scenarios"].values()) == 40
+    assert report["total"]["p50_ms"] <= report["total"]["p99_ms"]
+    assert limiter.enabled == limiter_enabled
+    assert app.config["WTF_CSRF_ENABLED"] == csrf_enabled
+    assert validator._msal_http_client is None
+    assert "validate-full" in format_report(report)
+
+
+def test_in_process_run_leaves_msal_cache_and_log_sinks_alone():
+    """Test that stubbed discovery responses and log streams do not leak."""
+    import io
+    import logging
+
+    from oidcheck import validator
+
+    http_cache, discovered = validator._MSAL_HTTP_CACHE, validator._discovered
+    logger = logging.getLogger("oidcheck")
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    other_handler = logging.NullHandler()
+    logger.addHandler(stream_handler)
+    logger.addHandler(other_handler)
+    try:
+        run_load_test("validate-standard", requests=4, concurrency=2)
+    finally:
+        logger.removeHandler(stream_handler)
+        logger.removeHandler(other_handler)
+
+    assert validator._MSAL_HTTP_CACHE is http_cache
+    assert validator._discovered is discovered
+    assert not any("loadtest" in str(key) for key in http_cache)
+    assert stream_handler.stream is stream
+    assert stream.getvalue() == ""
+
+
+def test_load_test_app_stubs_msal_and_lifts_limits():
+    """Test the app served for HTTP load tests."""
+    from unittest.mock import patch
+
+    from oidcheck import validator
+    from oidcheck.server import app, limiter
+
+    with patch.object(limiter, "enabled", True):
+        with patch.object(validator, "_msal_http_client", None):
+            assert load_test_app() is app
+            assert isinstance(validator._msal_http_client, StubLoginBackend)
+            assert limiter.enabled is False
+
+
+def test_loadtest_main_json(capsys):
+    """Test the loadtest command's JSON report."""
+    loadtest_main(["-n", "10", "-c", "2", "--mix", "ready", "--json"])
+    report = json.loads(capsys.readouterr().out)
+    assert report["scenarios"]["ready"]["requests"] == 10
+
+
+def test_loadtest_main_rejects_bad_mix():
+    """Test that an invalid mix is a usage error."""
+    with pytest.raises(SystemExit):
+        loadtest_main(["--mix", "nope"])
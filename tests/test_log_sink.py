@@ -0,0 +1,156 @@
+import gzip
+import json
+import logging
+import os
+import time
+
+import pytest
+from oidcheck.log_sink import RotatingAuditFileHandler
+from oidcheck.logging_config import StructuredFormatter, setup_structured_logging
+
+
+def _record(message):
+    return logging.LogRecord("oidcheck", logging.INFO, __file__, 1, message, (), None)
+
+
+@pytest.fixture
+def make_handler(tmp_path):
+    handlers = []
+
+    def make(**options):
+        handler = RotatingAuditFileHandler(str(tmp_path / "audit.log"), **options)
+        handler.setFormatter(StructuredFormatter())
+        handlers.append(handler)
+        return handler
+
+    yield make
+    for handler in handlers:
+        handler.close()
+
+
+def _messages(data):
+    return [json.loads(line)["message"] for line in data.decode().splitlines()]
+
+
+def test_size_rotation_compresses_and_prunes(tmp_path, make_handler):
+    handler = make_handler(max_bytes=400, backup_count=2, fsync="never")
+    for i in range(20):
+        handler.emit(_record(f"record {i}"))
+    handler.close()
+
+    segments = handler.segments()
+    assert len(segments) == 2
+    assert all(s.endswith(".gz") for s in segments)
+    assert all(os.path.getsize(s) > 0 for s in segments)
+    assert os.path.getsize(tmp_path / "audit.log") <= 400
+
+    # The newest records survive, in order, across the kept segments
+    kept = []
+    for segment in segments:
+        with gzip.open(segment) as f:
+            kept += _messages(f.read())
+    kept += _messages((tmp_path / "audit.log").read_bytes())
+    assert kept == [f"record {i}" for i in range(20 - len(kept), 20)]
+
+
+def test_time_rotation(tmp_path, make_handler, mocker):
+    clock = mocker.patch("oidcheck.log_sink.time.time", return_value=1000.0)
+    handler = make_handler(rotate_interval=60, compression="none", fsync="never")
+    handler.emit(_record("before"))
+    clock.return_value = 1061.0
+    handler.emit(_record("after"))
+    handler.close()
+
+    [segment] = handler.segments()
+    with open(segment, "rb") as f:
+        assert _messages(f.read()) == ["before"]
+    assert _messages((tmp_path / "audit.log").read_bytes()) == ["after"]
+
+
+def test_fsync_always_syncs_every_record(make_handler, mocker):
+    fsync = mocker.patch("oidcheck.log_sink.os.fsync")
+    handler = make_handler(fsync="always")
+    handler.emit(_record("one"))
+    handler.emit(_record("two"))
+    assert fsync.call_count == 2
+
+
+def test_fsync_batch_syncs_in_background(tmp_path, make_handler, mocker):
+    fsync = mocker.patch("oidcheck.log_sink.os.fsync")
+    handler = make_handler(fsync="batch", flush_interval=0.01)
+    for i in range(50):
+        handler.emit(_record(f"record {i}"))
+    assert fsync.call_count < 50
+
+    deadline = time.monotonic() + 2
+    while not (tmp_path / "audit.log").stat().st_size and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(_messages((tmp_path / "audit.log").read_bytes())) == 50
+    assert fsync.called
+
+
+def test_fsync_never(make_handler, mocker):
+    fsync = mocker.patch("oidcheck.log_sink.os.fsync")
+    handler = make_handler(fsync="never")
+    handler.emit(_record("one"))
+    handler.close()
+    fsync.assert_not_called()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_processes_share_the_file(tmp_path, make_handler):
+    handler = make_handler(max_bytes=2000, compression="none", fsync="never")
+    handler.emit(_record("before fork"))
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        status = 1
+        try:
+            for i in range(40):
+                handler.emit(_record(f"child {i}"))
+            handler.close()
+            status = 0
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    # The child rotated the file, so the parent reopens it before writing
+    handler.emit(_record("after fork"))
+    handler.close()
+
+    segments = handler.segments()
+    assert segments
+    messages = []
+    for segment in segments + [str(tmp_path / "audit.log")]:
+        with open(segment, "rb") as f:
+            messages += _messages(f.read())
+    # Every line is a whole record, and the parent's buffer was written once
+    assert sorted(messages) == sorted(
+        ["before fork", "after fork"] + [f"child {i}" for i in range(40)]
+    )
+    assert _messages((tmp_path / "audit.log").read_bytes())[-1] == "after fork"
+
+
+def test_invalid_options(tmp_path):
+    with pytest.raises(ValueError, match="fsync"):
+        RotatingAuditFileHandler(str(tmp_path / "a.log"), fsync="sometimes")
+    with pytest.raises(ValueError, match="compression"):
+        RotatingAuditFileHandler(str(tmp_path / "a.log"), compression="lz4")
+
+
+def test_zstd_requires_zstandard(tmp_path, mocker):
+    mocker.patch.dict("sys.modules", {"zstandard": None})
+    with pytest.raises(ValueError, match="zstandard"):
+        RotatingAuditFileHandler(str(tmp_path / "a.log"), compression="zstd")
+
+
+def test_setup_structured_logging_with_file(tmp_path):
+    log_file = tmp_path / "audit.log"
+    logger = setup_structured_logging(log_file=str(log_file), fsync="never")
+    try:
+        logger.info("Audited")
+        assert len(logger.handlers) == 2
+    finally:
+        setup_structured_logging()
+    assert _messages(log_file.read_bytes()) == ["Audited"]
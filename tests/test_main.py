@@ -4,6 +4,12 @@ from unittest.mock import patch
 from io import StringIO
 
 
+@pytest.fixture(autouse=True)
+def no_local_daemon(tmp_path, monkeypatch):
+    """Keep a daemon running on the developer's machine out of these tests."""
+    monkeypatch.setenv("OIDCHECK_SOCKET", str(tmp_path / "no-daemon.sock"))
+
+
 def test_main_with_valid_file():
     """Test main function with a valid configuration file."""
     mock_config = {
@@ -109,3 +115,390 @@ def test_main_with_strict_mode_with_errors():
                 with pytest.raises(SystemExit) as exc_info:
                     main()
                 assert exc_info.value.code == 1
+
+
+def test_main_with_profile_breakdown():
+    """Test that --profile prints a per-stage breakdown to stderr."""
+    with patch("oidcheck.main.dotenv_values", return_value={"LOG_LEVEL": "INFO"}):
+        with patch("oidcheck.main.validate_config_async") as mock_validate:
+            mock_validate.return_value = [
+                {"level": "INFO", "message": "Validation successful"}
+            ]
+
+            with patch("sys.argv", ["oidcheck", "--profile"]):
+                captured_error = StringIO()
+                with patch("sys.stderr", captured_error), patch("sys.stdout"):
+                    main()
+
+    breakdown = captured_error.getvalue()
+    assert "load" in breakdown
+    assert "model" in breakdown
+    assert "total" in breakdown
+
+
+def test_main_with_profile_files(tmp_path):
+    """Test that --profile writes cProfile and speedscope files."""
+    pstats_path = tmp_path / "oidcheck.prof"
+    speedscope_path = tmp_path / "oidcheck.json"
+
+    with patch(
+        "oidcheck.main.dotenv_values", return_value={"LOG_LEVEL": "INFO"}
+    ) as mock_load:
+        with patch("oidcheck.main.validate_config") as mock_validate:
+            mock_validate.return_value = []
+            with patch("sys.argv", ["oidcheck", "--profile", str(pstats_path)]):
+                with patch("sys.stderr"), patch("sys.stdout"):
+                    main()
+            mock_validate.assert_called_once()
+        # The file is read once, for both secret resolution and the model
+        mock_load.assert_called_once()
+
+        with patch("oidcheck.main.validate_config_async") as mock_validate_async:
+            mock_validate_async.return_value = []
+            with patch("sys.argv", ["oidcheck", "--profile", str(speedscope_path)]):
+                with patch("sys.stderr"), patch("sys.stdout"):
+                    main()
+
+    assert pstats_path.stat().st_size > 0
+    assert "speedscope" in speedscope_path.read_text()
+
+
+def test_main_with_level():
+    """Test that --level is passed through to validation."""
+    with patch("oidcheck.main.dotenv_values", return_value={"LOG_LEVEL": "INFO"}):
+        with patch("oidcheck.main.validate_config_async") as mock_validate:
+            mock_validate.return_value = []
+            with patch("sys.argv", ["oidcheck", "--level", "quick"]):
+                with patch("sys.stdout"):
+                    main()
+
+    assert mock_validate.call_args.args[2] == "quick"
+
+
+def test_main_with_diff(tmp_path):
+    """Test that --diff reports findings introduced by the new config."""
+    base = tmp_path / "base.env"
+    base.write_text("log_level=INFO\nscope=openid profile\n")
+    new = tmp_path / "new.env"
+    new.write_text("log_level=DEBUG\nscope=openid profile\n")
+
+    argv = ["oidcheck", "--file", str(new), "--diff", str(base), "--strict"]
+    with patch("sys.argv", argv):
+        captured_output = StringIO()
+        with patch("sys.stdout", captured_output):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+
+    output = captured_output.getvalue()
+    assert exc_info.value.code == 1
+    assert "Changed fields: log_level" in output
+    assert "+ [WARNING] LOG_LEVEL is set to 'DEBUG'" in output
+    assert "= [INFO] For production" in output
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        ["--secrets-file", "vaults.json"],
+        ["--dedupe"],
+        ["--policy-file", "policies.json"],
+    ],
+)
+def test_main_diff_rejects_options_it_would_ignore(tmp_path, extra):
+    """Test that --diff refuses options that do not apply to a diff."""
+    base = tmp_path / "base.env"
+    base.write_text("scope=openid profile\n")
+    argv = ["oidcheck", "--file", str(base), "--diff", str(base)] + extra
+
+    with patch("sys.argv", argv), patch("sys.stderr", StringIO()) as err:
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+    assert exc_info.value.code == 2
+    assert "--diff" in err.getvalue()
+
+
+def test_main_diff_ignores_policy_file_from_environment(tmp_path):
+    """Test that OIDCHECK_POLICY_FILE alone does not make --diff an error."""
+    base = tmp_path / "base.env"
+    base.write_text("scope=openid profile\n")
+    argv = ["oidcheck", "--file", str(base), "--diff", str(base)]
+    policy_file = str(tmp_path / "policies.json")
+
+    with patch.dict("os.environ", {"OIDCHECK_POLICY_FILE": policy_file}):
+        with patch("sys.argv", argv), patch("sys.stdout", StringIO()) as out:
+            main()
+
+    assert "Changed fields" in out.getvalue()
+
+
+def test_main_batch_report_to_file(tmp_path):
+    """Test that several files are streamed into one report file."""
+    import json
+
+    paths = []
+    for name in ("a.env", "b.env", "c.env"):
+        path = tmp_path / name
+        path.write_text("scope=openid profile\n")
+        paths.append(str(path))
+    output = tmp_path / "report.ndjson"
+
+    argv = ["oidcheck", "--format", "ndjson", "--output", str(output), "--strict"]
+    for path in paths:
+        argv += ["--file", path]
+
+    with patch("oidcheck.main.validate_config_async") as mock_validate:
+        mock_validate.return_value = [{"level": "WARNING", "message": "Test warning"}]
+        with patch("oidcheck.main.BATCH_WINDOW", 2):
+            with patch("sys.argv", argv):
+                captured_error = StringIO()
+                with patch("sys.stderr", captured_error):
+                    with pytest.raises(SystemExit):
+                        main()
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["source"] for r in records] == paths
+    assert "3 file(s)" in captured_error.getvalue()
+    assert "3 warning(s)" in captured_error.getvalue()
+
+
+@pytest.mark.parametrize("cprofile", [False, True])
+def test_main_batch_reports_invalid_file_and_continues(tmp_path, cprofile):
+    """Test that a file failing model validation does not drop its window."""
+    import json
+
+    paths = []
+    for name, text in (
+        ("good.env", "scope=openid profile\n"),
+        ("bad.env", "redirect_uri=not a url\n"),
+        ("m1.env", "log_level=DEBUG\n"),
+    ):
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(str(path))
+    argv = ["oidcheck", "--level", "quick", "--format", "sarif", "--no-daemon"]
+    if cprofile:
+        argv += ["--profile", str(tmp_path / "run.prof")]
+    for path in paths:
+        argv += ["--file", path]
+
+    with patch("sys.argv", argv), patch("sys.stderr", StringIO()):
+        captured_output = StringIO()
+        with patch("sys.stdout", captured_output):
+            main()
+
+    results = json.loads(captured_output.getvalue())["runs"][0]["results"]
+    uris = [
+        r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"]
+        for r in results
+    ]
+    assert {uri.rsplit("/", 1)[-1] for uri in uris} == {"good.env", "bad.env", "m1.env"}
+    [error] = [r for r in results if r["level"] == "error"]
+    assert error["message"]["text"].startswith(f"Cannot validate {paths[1]}")
+    assert any("LOG_LEVEL" in r["message"]["text"] for r in results)
+
+
+@pytest.mark.parametrize("output_format", ["text", "sarif", "junit"])
+def test_main_missing_file_is_validated_as_empty(tmp_path, output_format):
+    """Test that a missing --file behaves the same in every format."""
+    argv = ["oidcheck", "--level", "quick", "--format", output_format]
+    argv += ["--file", str(tmp_path / "missing.env")]
+    with patch("sys.argv", argv), patch("sys.stdout", StringIO()) as out:
+        main()
+    assert "SCOPE is missing" in out.getvalue()
+
+
+def test_main_uses_running_daemon(tmp_path):
+    """Test that the CLI validates through a running daemon."""
+    from unittest.mock import MagicMock
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("LOG_LEVEL=INFO\n")
+    client = MagicMock()
+    client.__enter__.return_value = client
+    client.validate.return_value = [{"level": "INFO", "message": "From daemon"}]
+
+    with patch("oidcheck.main.DaemonClient.connect", return_value=client):
+        with patch("sys.argv", ["oidcheck", "--file", str(env_file)]):
+            captured_output = StringIO()
+            with patch("sys.stdout", captured_output):
+                main()
+
+    client.validate.assert_called_once_with({"LOG_LEVEL": "INFO"}, "standard")
+    assert "[INFO] From daemon" in captured_output.getvalue()
+
+
+def test_main_falls_back_when_daemon_fails(tmp_path):
+    """Test in-process validation when the daemon cannot answer."""
+    from unittest.mock import MagicMock
+    from oidcheck.daemon import DaemonError
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("LOG_LEVEL=INFO\n")
+    client = MagicMock()
+    client.__enter__.return_value = client
+    client.validate.side_effect = DaemonError("Daemon closed the connection")
+
+    with patch("oidcheck.main.DaemonClient.connect", return_value=client):
+        with patch("oidcheck.main.validate_config") as mock_validate:
+            mock_validate.return_value = [{"level": "INFO", "message": "In-process"}]
+            with patch("sys.argv", ["oidcheck", "--file", str(env_file)]):
+                captured_output = StringIO()
+                with patch("sys.stdout", captured_output):
+                    main()
+
+    assert "[INFO] In-process" in captured_output.getvalue()
+
+
+def test_main_dispatches_daemon_command():
+    """Test that `oidcheck daemon` starts the daemon."""
+    with patch("oidcheck.daemon.serve") as mock_serve:
+        with patch("sys.argv", ["oidcheck", "daemon", "--socket", "/tmp/x.sock"]):
+            main()
+    mock_serve.assert_called_once_with("/tmp/x.sock", False)
+
+
+def test_main_resolves_secret_references(tmp_path):
+    """Test that --secrets-file reports on referenced secrets before validation."""
+    import json
+
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "client_secret=@Microsoft.KeyVault(VaultName=myvault;SecretName=absent)\n"
+    )
+    secrets_file = tmp_path / "vaults.json"
+    secrets_file.write_text(json.dumps({"myvault": {}}))
+    argv = ["oidcheck", "--file", str(env_file), "--secrets-file", str(secrets_file)]
+
+    with patch("oidcheck.main.DaemonClient.connect") as mock_connect:
+        with patch("oidcheck.main.validate_config_async", return_value=[]):
+            with patch("sys.argv", argv):
+                captured_output = StringIO()
+                with patch("sys.stdout", captured_output):
+                    main()
+
+    mock_connect.assert_not_called()
+    assert "[ERROR] CLIENT_SECRET references Key Vault secret 'absent'" in (
+        captured_output.getvalue()
+    )
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        None,
+        "{not json",
+        "[]",
+        '{"v": {"s": "not an object"}}',
+        '{"v": {"s": {"expires_on": "not-a-date"}}}',
+        '{"v": {"s": {"enabled": "no"}}}',
+        '{"v": {"s": {"versions": "v1"}}}',
+    ],
+)
+def test_main_rejects_unreadable_secrets_file(tmp_path, contents):
+    """Test that a missing or malformed --secrets-file is reported once."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("client_secret=@Microsoft.KeyVault(VaultName=v;SecretName=s)\n")
+    secrets_file = tmp_path / "vaults.json"
+    if contents is not None:
+        secrets_file.write_text(contents)
+    argv = ["oidcheck", "--file", str(env_file), "--secrets-file", str(secrets_file)]
+
+    with patch("sys.argv", argv), patch("sys.stderr", StringIO()) as err:
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+    assert exc_info.value.code == 2
+    assert err.getvalue().count("cannot read secrets file") == 1
+
+
+def test_main_dispatches_loadtest_command():
+    """Test that 'oidcheck loadtest' runs the load-test harness."""
+    with patch("oidcheck.loadtest.loadtest_main") as mock_loadtest:
+        with patch("sys.argv", ["oidcheck", "loadtest", "-n", "5"]):
+            main()
+    mock_loadtest.assert_called_once_with(["-n", "5"])
+
+
+def test_main_dedupe_reports_savings(tmp_path):
+    """Test that --dedupe validates in-process and reports evaluations saved."""
+    argv = ["oidcheck", "--level", "quick", "--dedupe", "--format", "ndjson"]
+    for name in ("a.env", "b.env"):
+        path = tmp_path / name
+        path.write_text("scope=openid profile\n")
+        argv += ["--file", str(path)]
+
+    with patch("oidcheck.main.DaemonClient.connect") as mock_connect:
+        with patch("sys.argv", argv):
+            captured_error = StringIO()
+            with patch("sys.stderr", captured_error), patch("sys.stdout", StringIO()):
+                main()
+
+    mock_connect.assert_not_called()
+    assert "Deduplication: 6 of 12 rule evaluations" in captured_error.getvalue()
+
+
+def test_main_with_policy(tmp_path):
+    """Test that --policy validates in-process with the policy's rule plan."""
+    policy_file = tmp_path / "policies.json"
+    policy_file.write_text('{"lax": {"disable": ["scope"]}}')
+    config_file = tmp_path / "app.env"
+    config_file.write_text("scope=profile\n")
+    argv = ["oidcheck", "--level", "quick", "--file", str(config_file)]
+    argv += ["--policy-file", str(policy_file), "--format", "json"]
+
+    with patch("sys.argv", argv), patch("sys.stdout", StringIO()) as out:
+        main()
+    assert "scope-missing-openid" in out.getvalue()
+
+    with patch("oidcheck.main.DaemonClient.connect") as mock_connect:
+        with patch("sys.argv", argv + ["--policy", "lax"]):
+            with patch("sys.stdout", StringIO()) as out:
+                main()
+    mock_connect.assert_not_called()
+    assert "scope-missing-openid" not in out.getvalue()
+
+
+def test_main_policy_applies_to_secret_references(tmp_path):
+    """Test that policy overrides apply to secret-reference findings too."""
+    policy_file = tmp_path / "policies.json"
+    policy_file.write_text(
+        '{"lax": {"severity": {"secret-reference-missing": "INFO"}}}'
+    )
+    secrets_file = tmp_path / "vaults.json"
+    secrets_file.write_text('{"myvault": {}}')
+    config_file = tmp_path / "app.env"
+    config_file.write_text(
+        "client_secret=@Microsoft.KeyVault(VaultName=myvault;SecretName=absent)\n"
+    )
+    argv = ["oidcheck", "--level", "quick", "--file", str(config_file)]
+    argv += ["--secrets-file", str(secrets_file), "--policy-file", str(policy_file)]
+    argv += ["--policy", "lax"]
+
+    with patch("sys.argv", argv), patch("sys.stdout", StringIO()) as out:
+        main()
+    assert "[INFO] CLIENT_SECRET references Key Vault secret 'absent'" in out.getvalue()
+    assert "[ERROR]" not in out.getvalue()
+
+
+def test_main_rejects_unknown_policy(tmp_path):
+    """Test that an unknown policy, or one without a policy file, is an error."""
+    policy_file = tmp_path / "policies.json"
+    policy_file.write_text("{}")
+    for argv in (
+        ["oidcheck", "--policy", "lax"],
+        ["oidcheck", "--policy-file", str(policy_file), "--policy", "lax"],
+    ):
+        with patch("sys.argv", argv), patch("sys.stderr", StringIO()):
+            with patch.dict("os.environ", {}, clear=False) as env:
+                env.pop("OIDCHECK_POLICY_FILE", None)
+                with pytest.raises(SystemExit):
+                    main()
+
+
+def test_main_rejects_unknown_profile_extension():
+    """Test that --profile with a file type it cannot write is an error."""
+    with patch("sys.argv", ["oidcheck", "--profile", "out.xyz"]):
+        with patch("sys.stderr", StringIO()) as err, pytest.raises(SystemExit):
+            main()
+    assert "profile file must end in" in err.getvalue()
@@ -0,0 +1,129 @@
+# tests/test_policy.py
+import json
+import pytest
+from oidcheck.models import AppConfig
+from oidcheck.policy import DEFAULT_POLICY, compile_policy, get_policy, load_policies
+from oidcheck.validator import get_rules, validate_config
+
+
+@pytest.fixture
+def config():
+    """A configuration with an HTTP localhost redirect and a DEBUG log level."""
+    return AppConfig(
+        client_id="test-client-id",
+        client_secret="test-client-secret",
+        tenant_id="test-tenant-id",
+        authority="https://login.microsoftonline.com/test-tenant-id",
+        redirect_uri="http://localhost:5000/callback",
+        scope=["openid"],
+        log_level="DEBUG",
+    )
+
+
+def findings(config, policy):
+    return {
+        r["rule"]: r["level"]
+        for r in validate_config(config, level="quick", plan=policy.plan("quick"))
+    }
+
+
+def test_default_policy_matches_level(config):
+    policy = compile_policy(DEFAULT_POLICY, {})
+    assert [r.name for r in policy.plan("full")] == [r.name for r in get_rules("full")]
+    assert validate_config(config, level="quick", plan=policy.plan("quick")) == (
+        validate_config(config, level="quick")
+    )
+
+
+def test_severity_override(config):
+    policy = compile_policy("strict", {"severity": {"log-level-sensitive": "error"}})
+    assert findings(config, policy)["log-level-sensitive"] == "ERROR"
+
+
+def test_disable_finding_and_rule(config):
+    policy = compile_policy("lax", {"disable": ["secret-storage", "log_level"]})
+    results = findings(config, policy)
+    assert "secret-storage" not in results
+    assert "log-level-sensitive" not in results
+    assert "redirect-uri-not-https" in results
+    assert "log_level" not in [r.name for r in policy.plan("quick")]
+
+
+def test_options(config):
+    policy = compile_policy(
+        "dev",
+        {"options": {"allow_http_localhost": True, "require_us_gov_authority": True}},
+    )
+    results = findings(config, policy)
+    assert "redirect-uri-not-https" not in results
+    assert results["authority-not-us-gov"] == "ERROR"
+
+
+@pytest.mark.parametrize(
+    "spec, message",
+    [
+        ({"rules": []}, "unknown settings"),
+        ({"severity": {"nope": "ERROR"}}, "unknown finding"),
+        ({"severity": {"secret-storage": "FATAL"}}, "unknown severity"),
+        ({"disable": ["nope"]}, "unknown rule or finding"),
+        ({"options": {"nope": True}}, "unknown option"),
+        ({"options": {"allow_http_localhost": "yes"}}, "must be true or false"),
+        (
+            {"severity": ["secret-storage"]},
+            "'bad' setting 'severity' must be an object",
+        ),
+        ({"options": True}, "'bad' setting 'options' must be an object"),
+        ({"disable": "secret-storage"}, "'bad' setting 'disable' must be a list"),
+        ({"disable": [{"rule": "scope"}]}, "which is not a name"),
+    ],
+)
+def test_invalid_policy(spec, message):
+    with pytest.raises(ValueError, match=message):
+        compile_policy("bad", spec)
+
+
+def test_unknown_level():
+    with pytest.raises(ValueError, match="Unknown validation level"):
+        compile_policy(DEFAULT_POLICY, {}).plan("exhaustive")
+
+
+def test_load_policies(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(
+        json.dumps({"dod": {"options": {"require_us_gov_authority": True}}})
+    )
+    policies = load_policies(str(path))
+    assert list(policies) == [DEFAULT_POLICY, "dod"]
+    assert get_policy(policies, "dod").name == "dod"
+    with pytest.raises(TypeError):
+        policies["other"] = policies["dod"]
+    with pytest.raises(ValueError, match="Unknown policy 'other'"):
+        get_policy(policies, "other")
+
+
+def test_load_policies_rejects_bad_files(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text("[]")
+    with pytest.raises(ValueError, match="JSON object of named profiles"):
+        load_policies(str(path))
+    path.write_text('{"dod": []}')
+    with pytest.raises(ValueError, match="must be a JSON object"):
+        load_policies(str(path))
+
+
+def test_policy_apply_is_idempotent():
+    policy = compile_policy(
+        "p",
+        {"severity": {"secret-storage": "ERROR"}, "disable": ["log-level-sensitive"]},
+    )
+    findings = [
+        {"level": "INFO", "rule": "secret-storage", "message": "a"},
+        {"level": "WARNING", "rule": "log-level-sensitive", "message": "b"},
+        {"level": "INFO", "message": "no rule"},
+    ]
+    applied = policy.apply(findings)
+    assert applied == [
+        {"level": "ERROR", "rule": "secret-storage", "message": "a"},
+        {"level": "INFO", "message": "no rule"},
+    ]
+    assert policy.apply(applied) == applied
@@ -0,0 +1,109 @@
+import json
+import logging
+import sys
+import threading
+from io import StringIO
+from oidcheck.logging_config import StructuredFormatter, log_validation_event
+from oidcheck.profiling import (
+    NULL_TIMER,
+    StageTimer,
+    format_stage_timings,
+    write_speedscope,
+)
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    """Test that repeated stages add up rather than overwrite."""
+    timer = StageTimer()
+    with timer.stage("rules"):
+        pass
+    with timer.stage("rules"):
+        pass
+    with timer.stage("msal_client"):
+        pass
+
+    assert list(timer.timings) == ["rules", "msal_client"]
+    assert len(timer.events) == 3
+    assert all(ms >= 0 for ms in timer.timings.values())
+
+
+def test_stage_timer_is_thread_safe():
+    """Test that stages timed from several threads are all accumulated."""
+    timer = StageTimer()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def run():
+        for _ in range(500):
+            with timer.stage("msal_client"):
+                pass
+
+    try:
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert len(timer.events) == 4000
+    recorded = sum(end - start for _, start, end in timer.events) * 1000
+    assert abs(timer.timings["msal_client"] - recorded) < 1e-6 * max(recorded, 1)
+
+
+def test_null_timer_records_nothing():
+    """Test that the disabled timer is a no-op."""
+    with NULL_TIMER.stage("rules"):
+        pass
+    assert NULL_TIMER.timings == {}
+    assert NULL_TIMER.events == []
+    assert NULL_TIMER.enabled is False
+
+
+def test_format_stage_timings():
+    """Test the human-readable stage breakdown."""
+    formatted = format_stage_timings({"load": 1.5, "rules": 0.5})
+    lines = formatted.split("\n")
+    assert lines[0].startswith("load")
+    assert lines[-1].startswith("total")
+    assert "2.000 ms" in lines[-1]
+
+
+def test_write_speedscope():
+    """Test that stages are written as a speedscope evented profile."""
+    timer = StageTimer()
+    with timer.stage("load"):
+        pass
+    with timer.stage("rules"):
+        pass
+
+    stream = StringIO()
+    write_speedscope(timer, stream)
+    document = json.loads(stream.getvalue())
+
+    assert [f["name"] for f in document["shared"]["frames"]] == ["load", "rules"]
+    events = document["profiles"][0]["events"]
+    assert [e["type"] for e in events] == ["O", "C", "O", "C"]
+
+
+def test_log_validation_event_includes_timings():
+    """Test that stage timings are logged as structured fields."""
+    logger = logging.getLogger("oidcheck.test_profiling")
+    stream = StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    results = [{"level": "WARNING", "message": "Test warning"}]
+    try:
+        log_validation_event(
+            logger, "127.0.0.1", "cli", results, "req-1", {"rules": 1.23456}
+        )
+    finally:
+        logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["config_validation"]["warning_count"] == 1
+    assert entry["config_validation"]["timings_ms"] == {"rules": 1.235}
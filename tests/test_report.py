@@ -0,0 +1,140 @@
+import csv
+import json
+import pytest
+from io import StringIO
+from oidcheck.report import ReportWriter, artifact_uri
+
+RESULTS = [
+    {"level": "ERROR", "message": "Test error message"},
+    {"level": "WARNING", "message": "Test warning message"},
+    {"level": "INFO", "message": "Test info message"},
+]
+
+
+def write_report(output_format, sources):
+    stream = StringIO()
+    with ReportWriter(stream, output_format, label_sources=True) as writer:
+        for source in sources:
+            writer.write_results(source, iter(RESULTS))
+    return stream.getvalue(), writer.summary
+
+
+def test_report_json():
+    """Test that the JSON report is a single array across sources."""
+    output, summary = write_report("json", ["a.env", "b.env"])
+    parsed = json.loads(output)
+    assert len(parsed) == 6
+    assert parsed[0] == {"source": "a.env", **RESULTS[0]}
+    assert parsed[-1]["source"] == "b.env"
+    assert summary == {"sources": 2, "ERROR": 2, "WARNING": 2, "INFO": 2}
+
+
+def test_report_json_empty():
+    """Test that an empty JSON report is still valid JSON."""
+    output, summary = write_report("json", [])
+    assert json.loads(output) == []
+    assert summary["sources"] == 0
+
+
+def test_report_ndjson():
+    """Test that NDJSON writes one finding per line."""
+    output, _ = write_report("ndjson", ["a.env"])
+    lines = output.strip().split("\n")
+    assert [json.loads(line)["level"] for line in lines] == ["ERROR", "WARNING", "INFO"]
+
+
+def test_report_csv():
+    """Test the CSV report header and rows."""
+    output, _ = write_report("csv", ["a.env"])
+    rows = list(csv.reader(StringIO(output)))
+    assert rows[0] == ["source", "level", "rule", "message"]
+    assert rows[1] == ["a.env", "ERROR", "", "Test error message"]
+
+
+def test_report_text_labels_sources():
+    """Test that text lines are prefixed with their source."""
+    output, _ = write_report("text", ["a.env"])
+    assert output.split("\n")[0] == "a.env: [ERROR] Test error message"
+
+
+def test_report_sarif():
+    """Test that the SARIF report is a valid single-run log."""
+    output, _ = write_report("sarif", ["a.env", "b.env"])
+    sarif = json.loads(output)
+    assert sarif["version"] == "2.1.0"
+    results = sarif["runs"][0]["results"]
+    assert len(results) == 6
+    assert [r["level"] for r in results[:3]] == ["error", "warning", "note"]
+    location = results[3]["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "b.env"
+
+
+def test_sarif_artifact_uri(tmp_path, monkeypatch):
+    """Test that SARIF URIs are relative, forward-slashed and percent-encoded."""
+    monkeypatch.chdir(tmp_path)
+    assert artifact_uri("b.env") == "b.env"
+    assert artifact_uri("my services/a b.env") == "my%20services/a%20b.env"
+    assert artifact_uri(str(tmp_path / "svc" / "c.env")) == "svc/c.env"
+    assert artifact_uri("dir\\x#1.env") == "dir%5Cx%231.env"
+
+
+def test_report_unknown_format():
+    """Test that unknown formats are rejected."""
+    with pytest.raises(ValueError, match="Unknown report format"):
+        ReportWriter(StringIO(), "xml")
+
+
+def test_report_sarif_rule_ids_and_locations():
+    """Test that SARIF findings carry their rule ID and key line."""
+    stream = StringIO()
+    results = [
+        {"level": "WARNING", "rule": "scope-missing-openid", "message": "No openid"},
+        {"level": "INFO", "rule": "secret-storage", "message": "Use Key Vault"},
+    ]
+    with ReportWriter(stream, "sarif") as writer:
+        writer.write_results("a.env", results, {"scope": 3})
+
+    run = json.loads(stream.getvalue())["runs"][0]
+    rule_ids = [rule["id"] for rule in run["tool"]["driver"]["rules"]]
+    first, second = run["results"]
+    assert first["ruleId"] == "scope-missing-openid"
+    assert rule_ids[first["ruleIndex"]] == "scope-missing-openid"
+    assert first["locations"][0]["physicalLocation"]["region"] == {"startLine": 3}
+    assert "region" not in second["locations"][0]["physicalLocation"]
+
+
+def test_report_junit():
+    """Test that JUnit writes one test suite per source."""
+    import xml.etree.ElementTree as ET
+
+    stream = StringIO()
+    results = [
+        {"level": "ERROR", "rule": "authority-format", "message": "Bad <authority>"},
+        {"level": "INFO", "rule": "secret-storage", "message": "Use Key Vault"},
+    ]
+    with ReportWriter(stream, "junit") as writer:
+        assert writer.uses_locations
+        writer.write_results("a.env", iter(results), {"authority": 4})
+        writer.write_results("b.env", [])
+
+    root = ET.fromstring(stream.getvalue())
+    suites = root.findall("testsuite")
+    assert [s.get("name") for s in suites] == ["a.env", "b.env"]
+    assert suites[0].get("tests") == "2"
+    assert suites[0].get("failures") == "1"
+    failing, passing = suites[0].findall("testcase")
+    assert failing.get("name") == "authority-format"
+    assert failing.get("line") == "4"
+    assert failing.find("failure").get("message") == "Bad <authority>"
+    assert passing.find("failure") is None
+    assert suites[1].get("tests") == "0"
+
+
+def test_aborted_report_is_not_terminated():
+    """Test that a report interrupted by an exception is not closed as complete."""
+    stream = StringIO()
+    with pytest.raises(RuntimeError):
+        with ReportWriter(stream, "json") as writer:
+            writer.write_results("a.env", [{"level": "INFO", "message": "one"}])
+            raise RuntimeError("aborted")
+    assert not stream.getvalue().rstrip().endswith("]")
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from oidcheck import request_context
+from oidcheck.logging_config import StructuredFormatter
+from oidcheck.request_context import (
+    begin_request,
+    current_request,
+    end_request,
+    get_correlation_id,
+    new_correlation_id,
+    peek_correlation_id,
+    submit,
+)
+
+
+def test_new_correlation_ids_are_unique():
+    """Test that generated IDs share a process prefix and never repeat."""
+    ids = {new_correlation_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert len({i.rsplit("-", 1)[0] for i in ids}) == 1
+
+
+def test_correlation_id_is_created_lazily(mocker):
+    """Test that no ID is generated until one is read."""
+    spy = mocker.spy(request_context, "new_correlation_id")
+    token = begin_request()
+    try:
+        assert spy.call_count == 0
+        correlation_id = get_correlation_id()
+        assert get_correlation_id() == correlation_id
+        assert spy.call_count == 1
+    finally:
+        end_request(token)
+    assert current_request() is None
+    assert get_correlation_id() is None
+
+
+def test_peek_never_creates_an_id(mocker):
+    """Test that peeking returns only an ID that was supplied or generated."""
+    spy = mocker.spy(request_context, "new_correlation_id")
+    assert peek_correlation_id() is None
+    token = begin_request()
+    try:
+        assert peek_correlation_id() is None
+        assert spy.call_count == 0
+        correlation_id = get_correlation_id()
+        assert peek_correlation_id() == correlation_id
+    finally:
+        end_request(token)
+
+
+def test_incoming_correlation_id_is_reused():
+    """Test that an incoming ID is used as is."""
+    token = begin_request("incoming-id", "10.0.0.1")
+    try:
+        assert get_correlation_id() == "incoming-id"
+        assert current_request().user_ip == "10.0.0.1"
+    finally:
+        end_request(token)
+
+
+def test_context_propagates_to_threads():
+    """Test that asyncio.to_thread and submit() run in the request context."""
+
+    async def in_thread():
+        return await asyncio.to_thread(get_correlation_id)
+
+    token = begin_request("threaded-id")
+    try:
+        assert asyncio.run(in_thread()) == "threaded-id"
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [submit(executor, get_correlation_id) for _ in range(4)]
+            assert {f.result() for f in futures} == {"threaded-id"}
+    finally:
+        end_request(token)
+
+
+def test_formatter_reads_request_context():
+    """Test that log records pick up the request's ID and user IP."""
+    record = logging.LogRecord("oidcheck", logging.INFO, __file__, 1, "msg", (), None)
+    token = begin_request("logged-id", "10.0.0.2")
+    try:
+        output = StructuredFormatter().format(record)
+    finally:
+        end_request(token)
+    assert '"request_id": "logged-id"' in output
+    assert '"user_ip": "10.0.0.2"' in output
+
+    assert "request_id" not in StructuredFormatter().format(record)
@@ -0,0 +1,196 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from oidcheck.secret_resolver import (
+    FileSecretProvider,
+    SecretMetadata,
+    SecretProvider,
+    SecretReference,
+    SecretResolver,
+    parse_secret_reference,
+)
+
+
+def _iso(days):
+    return (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
+
+
+@pytest.fixture
+def secrets_file(tmp_path):
+    path = tmp_path / "vaults.json"
+    path.write_text(
+        json.dumps(
+            {
+                "MyVault": {
+                    "ok": {"expires_on": _iso(365), "versions": ["v1"]},
+                    "expired": {"expires_on": _iso(-1)},
+                    "expiring": {"expires_on": _iso(5)},
+                    "disabled": {"enabled": False},
+                    "zulu": {"expires_on": "2999-01-01T00:00:00Z"},
+                }
+            }
+        )
+    )
+    return str(path)
+
+
+def _values(secret):
+    return {"CLIENT_SECRET": secret}
+
+
+def test_file_provider_accepts_zulu_timestamps(secrets_file):
+    """Test that a "Z" expiry suffix parses on every supported Python."""
+    provider = FileSecretProvider(secrets_file)
+    metadata = provider.get_metadata(SecretReference("myvault", "zulu", None))
+    assert metadata.expires_on == datetime(2999, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "secret, message",
+    [
+        ("plain", "must be a JSON object"),
+        ({"enabled": "yes"}, "non-boolean 'enabled'"),
+        ({"versions": "v1"}, "'versions' as strings"),
+        ({"expires_on": 20270101}, "non-string 'expires_on'"),
+        ({"expires_on": "not-a-date"}, "invalid 'expires_on' timestamp"),
+    ],
+)
+def test_file_provider_rejects_malformed_secrets(tmp_path, secret, message):
+    """Test that malformed secret metadata is rejected when the file is loaded."""
+    path = tmp_path / "vaults.json"
+    path.write_text(json.dumps({"myvault": {"s": secret}}))
+    with pytest.raises(ValueError, match=message):
+        FileSecretProvider(str(path)).load()
+
+
+def test_secret_provider_is_abstract():
+    """Test that providers must implement the lookup methods."""
+    with pytest.raises(TypeError):
+        SecretProvider()
+
+
+def test_parse_secret_uri_reference():
+    """Test parsing of the SecretUri reference form."""
+    reference = parse_secret_reference(
+        "@Microsoft.KeyVault(SecretUri=https://MyVault.vault.azure.net/secrets/ok/v1)"
+    )
+    assert reference == SecretReference("myvault", "ok", "v1")
+
+
+def test_parse_vault_name_reference():
+    """Test parsing of the VaultName/SecretName reference form."""
+    reference = parse_secret_reference(
+        "@Microsoft.KeyVault(VaultName=myvault; SecretName=ok)"
+    )
+    assert reference == SecretReference("myvault", "ok", None)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        "plain-secret",
+        "@Microsoft.KeyVault(SecretUri=https://example.com/ok)",
+        "@Microsoft.KeyVault(VaultName=myvault)",
+    ],
+)
+def test_parse_non_references(value):
+    """Test that plain values and malformed references are not references."""
+    assert parse_secret_reference(value) is None
+
+
+@pytest.mark.parametrize(
+    "secret, rule, level",
+    [
+        ("ok", "secret-reference-resolved", "INFO"),
+        ("ok/v1", "secret-reference-resolved", "INFO"),
+        ("ok/v2", "secret-reference-missing", "ERROR"),
+        ("absent", "secret-reference-missing", "ERROR"),
+        ("expired", "secret-reference-expired", "ERROR"),
+        ("expiring", "secret-reference-expiring", "WARNING"),
+        ("disabled", "secret-reference-disabled", "ERROR"),
+    ],
+)
+def test_resolve_outcomes(secrets_file, secret, rule, level):
+    """Test the finding reported for each state of a referenced secret."""
+    resolver = SecretResolver(FileSecretProvider(secrets_file))
+    value = f"@Microsoft.KeyVault(SecretUri=https://myvault.vault.azure.net/secrets/{secret})"
+
+    [results] = resolver.resolve_many([_values(value)])
+
+    assert [(r["rule"], r["level"]) for r in results] == [(rule, level)]
+
+
+def test_resolve_many_skips_plain_secrets(secrets_file):
+    """Test that configurations without a reference get no secret findings."""
+    resolver = SecretResolver(FileSecretProvider(secrets_file))
+    assert resolver.resolve_many([_values("plain"), {}]) == [[], []]
+
+
+class CountingProvider(SecretProvider):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.clients = 0
+        self.lookups = 0
+        self.lock = threading.Lock()
+
+    def _create_client(self, vault):
+        self.clients += 1
+        return object()
+
+    def get_metadata(self, reference):
+        self.client_for(reference.vault)
+        with self.lock:
+            self.lookups += 1
+        if self.fail:
+            raise OSError("unreachable")
+        return SecretMetadata(exists=True)
+
+
+def test_resolve_many_deduplicates_lookups():
+    """Test that each distinct reference is looked up once per batch."""
+    provider = CountingProvider()
+    resolver = SecretResolver(provider)
+    reference = "@Microsoft.KeyVault(VaultName=vault;SecretName={})"
+    values = [_values(reference.format(name)) for name in ("a", "a", "b", "a")]
+
+    results = resolver.resolve_many(values)
+
+    assert provider.lookups == 2
+    assert provider.clients == 1
+    assert all(r[0]["rule"] == "secret-reference-resolved" for r in results)
+
+
+def test_check_caches_until_ttl_expires(mocker):
+    """Test that lookups are reused until the TTL has elapsed."""
+    provider = CountingProvider()
+    resolver = SecretResolver(provider, ttl=10)
+    clock = mocker.patch("oidcheck.secret_resolver.time.monotonic", return_value=0.0)
+    reference = SecretReference("vault", "a")
+
+    resolver.check(reference)
+    clock.return_value = 5.0
+    resolver.check(reference)
+    assert provider.lookups == 1
+
+    clock.return_value = 11.0
+    resolver.check(reference)
+    assert provider.lookups == 2
+
+
+def test_unreachable_vault_is_unverified():
+    """Test that an unreachable vault produces a warning and is not cached."""
+    provider = CountingProvider(fail=True)
+    resolver = SecretResolver(provider)
+    values = [_values("@Microsoft.KeyVault(VaultName=vault;SecretName=a)")]
+
+    [results] = resolver.resolve_many(values)
+    resolver.resolve_many(values)
+
+    assert results[0]["rule"] == "secret-reference-unverified"
+    assert results[0]["level"] == "WARNING"
+    assert provider.lookups == 2
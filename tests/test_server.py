@@ -1,5 +1,5 @@
 import pytest
-from oidcheck.server import app
+from oidcheck.server import app, limiter
 from unittest.mock import patch
 
 
@@ -7,8 +7,10 @@ from unittest.mock import patch
 def client():
     app.config["TESTING"] = True
     app.config["WTF_CSRF_ENABLED"] = False
-    with app.test_client() as client:
-        yield client
+    # The suite makes more requests than the rate limits allow
+    with patch.object(limiter, "enabled", False):
+        with app.test_client() as client:
+            yield client
 
 
 def test_index_get(client):
@@ -52,14 +54,21 @@ def test_index_post_large_config(client):
     response = client.post("/", data={"config": large_config})
     assert response.status_code == 200
     assert b"Configuration is too large" in response.data
+    assert large_config.encode() not in response.data
 
 
 def test_rate_limiting(client):
-    """Test that rate limiting is working."""
-    # This would require more complex setup with time mocking
-    # For now, just ensure the endpoint exists
-    response = client.post("/", data={"config": "test"})
-    assert response.status_code in [200, 429]  # 429 would be rate limited
+    """Test that the form is rate limited to 10 submissions a minute."""
+    limiter.reset()
+    try:
+        with patch.object(limiter, "enabled", True):
+            statuses = [
+                client.post("/", data={"config": "test"}).status_code for _ in range(11)
+            ]
+    finally:
+        limiter.reset()
+
+    assert statuses == [200] * 10 + [429]
 
 
 def test_health_endpoint(client):
@@ -74,9 +83,14 @@ def test_health_endpoint(client):
 
 
 def test_correlation_id_header(client):
-    """Test that correlation ID is added to response headers."""
+    """Test that a correlation ID is echoed only once the request has one."""
     response = client.get("/")
     assert response.status_code == 200
+    assert "X-Correlation-ID" not in response.headers
+
+    # Validation logs an audit record, which generates an ID
+    response = client.post("/", data={"config": "CLIENT_ID=abc"})
+    assert response.status_code == 200
     assert "X-Correlation-ID" in response.headers
 
 
@@ -86,3 +100,370 @@ def test_custom_correlation_id(client):
     response = client.get("/", headers={"X-Correlation-ID": custom_id})
     assert response.status_code == 200
     assert response.headers["X-Correlation-ID"] == custom_id
+
+
+def test_health_reports_starting_until_warm_up_finishes(client):
+    """Test that health is not ready while warm-up is pending."""
+    with patch.dict("oidcheck.server._warmup_state", {"ready": False}):
+        response = client.get("/health")
+    assert response.status_code == 503
+    data = response.get_json()
+    assert data["status"] == "starting"
+    assert data["checks"]["warmup"] == "pending"
+
+
+def test_warm_up_primes_authorities_when_requested():
+    """Test that warm-up compiles templates and primes authority metadata."""
+    from oidcheck.server import warm_up
+
+    with patch(
+        "oidcheck.server.prime_authority_metadata",
+        return_value={"https://login.microsoftonline.us/organizations": "ok"},
+    ) as mock_prime:
+        state = warm_up(prime_authorities=True)
+
+    mock_prime.assert_called_once()
+    assert state["ready"] is True
+    assert state["steps"]["templates"] == "ok"
+    assert state["steps"]["msal"] == "ok"
+    assert "authority_metadata" in state["steps"]
+
+
+def test_start_warm_up_modes():
+    """Test the background and off warm-up modes."""
+    from oidcheck.server import start_warm_up
+
+    with patch.dict("oidcheck.server._warmup_state", {"ready": False}):
+        with patch.dict("os.environ", {"OIDCHECK_WARMUP": "off"}):
+            start_warm_up()
+        from oidcheck.server import _warmup_state
+
+        assert _warmup_state["ready"] is True
+
+    with patch("oidcheck.server.threading.Thread") as mock_thread:
+        with patch.dict("os.environ", {"OIDCHECK_WARMUP": "background"}):
+            start_warm_up()
+        mock_thread.return_value.start.assert_called_once()
+
+
+def test_failed_background_warm_up_is_logged_and_degraded(client, caplog):
+    """Test that a failing warm-up is logged and leaves the worker serving."""
+    from oidcheck import server
+
+    state = {"ready": False, "steps": {}}
+    with patch.object(server, "_warmup_state", state):
+        with patch("oidcheck.server.warm_up", side_effect=RuntimeError("boom")):
+            server._warm_up_in_background(False)
+        response = client.get("/health/ready")
+
+    assert "Warm-up failed" in caplog.text
+    assert state["ready"] is True
+    assert state["steps"]["error"] == "boom"
+    assert response.get_json()["checks"]["warmup"] == "degraded"
+
+
+def test_index_post_with_level(client):
+    """Test that the selected validation level is used."""
+    with patch("oidcheck.server.validate_config") as mock_validate:
+        mock_validate.return_value = [
+            {"level": "INFO", "message": "Validation successful"}
+        ]
+        response = client.post("/", data={"config": "CLIENT_ID=x", "level": "quick"})
+    assert response.status_code == 200
+    assert mock_validate.call_args.args[2] == "quick"
+    assert b'<option value="quick" selected>' in response.data
+
+
+def test_index_post_unknown_level(client):
+    """Test that an unknown validation level is rejected."""
+    with patch("oidcheck.server.validate_config") as mock_validate:
+        response = client.post("/", data={"config": "CLIENT_ID=x", "level": "deep"})
+    assert response.status_code == 200
+    assert b"Unknown validation level" in response.data
+    mock_validate.assert_not_called()
+
+
+def test_index_get_reuses_cached_form(client):
+    """Test that the empty form is rendered once and gets a fresh CSRF token."""
+    from oidcheck import server
+
+    server._page_cache.clear()
+    with patch(
+        "oidcheck.server.render_template", wraps=server.render_template
+    ) as render:
+        with patch("oidcheck.server.generate_csrf", side_effect=["token-1", "token-2"]):
+            first = client.get("/")
+            second = client.get("/")
+
+    render.assert_called_once()
+    assert b'name="csrf_token" value="token-1"' in first.data
+    assert b'name="csrf_token" value="token-2"' in second.data
+
+
+def test_cached_form_respects_script_root(client):
+    """Test that the cached form is not shared between mount points."""
+    from oidcheck import server
+
+    server._page_cache.clear()
+    client.get("/")
+    mounted = client.get("/", base_url="http://localhost/oidcheck/")
+
+    assert b'href="/oidcheck/static/' in mounted.data
+    assert b'href="/static/' not in mounted.data
+
+
+def test_static_assets_are_fingerprinted(client):
+    """Test that fingerprinted static URLs are served with long cache lifetimes."""
+    from oidcheck.server import STATIC_MAX_AGE, static_fingerprint
+
+    fingerprint = static_fingerprint("styles.css")
+    assert f"/static/styles.css?v={fingerprint}".encode() in client.get("/").data
+
+    response = client.get(f"/static/styles.css?v={fingerprint}")
+    assert response.cache_control.max_age == STATIC_MAX_AGE
+    assert response.cache_control.immutable
+    response.close()
+
+    response = client.get("/static/styles.css")
+    assert response.cache_control.max_age != STATIC_MAX_AGE
+    response.close()
+
+
+def test_results_page_is_compressed(client):
+    """Test that HTML is gzipped for clients that accept it."""
+    import gzip
+
+    with patch("oidcheck.server.validate_config") as mock_validate:
+        mock_validate.return_value = [
+            {"level": "INFO", "message": "Validation successful"}
+        ]
+        response = client.post(
+            "/",
+            data={"config": "CLIENT_ID=x"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert b"Validation Results" in gzip.decompress(response.data)
+
+
+def test_health_skips_request_context(client):
+    """Test that probes get no correlation ID."""
+    response = client.get("/health")
+    assert "X-Correlation-ID" not in response.headers
+
+
+def test_errors_are_logged_with_correlation_id(client):
+    """Test that log records carry the request's correlation ID."""
+    import logging
+    from oidcheck.logging_config import StructuredFormatter
+
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(StructuredFormatter().format(record))
+    logging.getLogger("oidcheck").addHandler(handler)
+    try:
+        with patch("oidcheck.server.validate_config", side_effect=RuntimeError("down")):
+            response = client.post(
+                "/",
+                data={"config": "CLIENT_ID=x"},
+                headers={"X-Correlation-ID": "err-123"},
+            )
+    finally:
+        logging.getLogger("oidcheck").removeHandler(handler)
+
+    assert response.headers["X-Correlation-ID"] == "err-123"
+    assert '"request_id": "err-123"' in lines[-1]
+    assert '"error": "down"' in lines[-1]
+
+
+def test_liveness_endpoint(client):
+    """Test that liveness answers without dependency checks."""
+    with patch("oidcheck.server.check_dependencies") as mock_checks:
+        response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "alive"}
+    mock_checks.assert_not_called()
+
+
+def test_readiness_checks_are_cached(client):
+    """Test that readiness reuses cached checks and refreshes stale ones."""
+    from oidcheck import server
+
+    checks = {
+        "app": "ok",
+        "logging": "ok",
+        "msal": "error",
+        "cache_backend": "ok",
+    }
+    with patch.dict(server._readiness, {"checks": None, "checked_at": 0.0}):
+        with patch("oidcheck.server.check_dependencies", return_value=checks) as mock:
+            first = client.get("/health/ready")
+            second = client.get("/health")
+            assert mock.call_count == 1
+
+            with patch("oidcheck.server.threading.Thread") as mock_thread:
+                with patch("oidcheck.server.READINESS_TTL", -1):
+                    client.get("/health/ready")
+            mock_thread.return_value.start.assert_called_once()
+            server._readiness_lock.release()
+
+    assert first.status_code == second.status_code == 503
+    assert first.get_json()["status"] == "unhealthy"
+    assert "X-Correlation-ID" not in first.headers
+
+
+def test_probes_are_exempt_from_rate_limits(client):
+    """Test that probes are never rate limited."""
+    from oidcheck.server import limiter
+
+    with patch.object(limiter, "enabled", True):
+        statuses = {client.get("/health/live").status_code for _ in range(60)}
+    assert statuses == {200}
+
+
+def test_logging_options_from_environment():
+    """Test that the audit log file sink is configured from the environment."""
+    from oidcheck.server import logging_options
+
+    assert logging_options() == {}
+    env = {
+        "OIDCHECK_LOG_FILE": "/var/log/oidcheck/audit.log",
+        "OIDCHECK_LOG_ROTATE_SECONDS": "86400",
+        "OIDCHECK_LOG_FSYNC": "always",
+    }
+    with patch.dict("os.environ", env):
+        options = logging_options()
+    assert options["log_file"] == "/var/log/oidcheck/audit.log"
+    assert options["rotate_interval"] == 86400.0
+    assert options["fsync"] == "always"
+    assert options["compression"] == "gzip"
+
+
+def test_index_post_with_policy(client):
+    """Test that the selected policy's rule plan is used."""
+    from oidcheck import server
+    from oidcheck.policy import compile_policy
+
+    policies = {
+        "default": compile_policy("default", {}),
+        "lax": compile_policy("lax", {"disable": ["scope"]}),
+    }
+    with patch.object(server, "policies", policies):
+        with patch("oidcheck.server.validate_config") as mock_validate:
+            mock_validate.return_value = []
+            response = client.post(
+                "/", data={"config": "CLIENT_ID=x", "level": "quick", "policy": "lax"}
+            )
+    assert response.status_code == 200
+    assert mock_validate.call_args.args[3] is policies["lax"].plan("quick")
+    assert b'<option value="lax" selected>' in response.data
+
+
+def test_index_post_unknown_policy(client):
+    """Test that an unknown policy is rejected."""
+    with patch("oidcheck.server.validate_config") as mock_validate:
+        response = client.post("/", data={"config": "CLIENT_ID=x", "policy": "dod"})
+    assert response.status_code == 200
+    assert b"Unknown policy" in response.data
+    assert b'id="policy-select"' not in response.data
+    mock_validate.assert_not_called()
+
+
+def test_server_policies_from_environment(tmp_path):
+    """Test that OIDCHECK_POLICY_FILE profiles are loaded alongside the default."""
+    from oidcheck.server import server_policies
+
+    path = tmp_path / "policies.json"
+    path.write_text('{"dod": {"options": {"require_us_gov_authority": true}}}')
+    with patch.dict("os.environ", {"OIDCHECK_POLICY_FILE": str(path)}):
+        assert list(server_policies()) == ["default", "dod"]
+    with patch.dict("os.environ", {"OIDCHECK_POLICY_FILE": ""}):
+        assert list(server_policies()) == ["default"]
+
+
+def test_oversized_body_is_rejected_before_parsing(client):
+    """Test that a body over MAX_CONTENT_LENGTH gets a 413 without form parsing."""
+    from oidcheck import server
+
+    with patch("oidcheck.server.parse_config_text") as mock_parse:
+        response = client.post(
+            "/", data={"config": "A" * (server.app.config["MAX_CONTENT_LENGTH"] + 1)}
+        )
+    assert response.status_code == 413
+    assert b"Request is too large" in response.data
+    mock_parse.assert_not_called()
+
+
+def test_secrets_are_redacted(client):
+    """Test that secret values are hidden in the re-rendered form and in logs."""
+    import logging
+    from oidcheck.logging_config import StructuredFormatter
+
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(StructuredFormatter().format(record))
+    logging.getLogger("oidcheck").addHandler(handler)
+    config_text = "client_id=x\nclient_secret=hunter2-secret"
+    try:
+        with patch("oidcheck.server.validate_config") as mock_validate:
+            mock_validate.side_effect = RuntimeError("rejected hunter2-secret")
+            response = client.post("/", data={"config": config_text})
+    finally:
+        logging.getLogger("oidcheck").removeHandler(handler)
+
+    assert response.status_code == 200
+    assert b"hunter2-secret" not in response.data
+    assert b"client_secret=********" in response.data
+    assert "hunter2-secret" not in lines[-1]
+    assert '"error": "rejected ********"' in lines[-1]
+
+
+def test_oversized_chunked_body_is_rejected(client):
+    """Test that a chunked body is refused once it passes MAX_CONTENT_LENGTH."""
+    import io
+    from oidcheck import server
+
+    limit = server.app.config["MAX_CONTENT_LENGTH"]
+    for size, status in ((limit + 1, 413), (100, 200)):
+        response = client.post(
+            "/",
+            input_stream=io.BytesIO(b"config=" + b"A" * size),
+            content_type="application/x-www-form-urlencoded",
+            # As passed on by a server that dechunks the body
+            headers={"Transfer-Encoding": "chunked"},
+            environ_overrides={"wsgi.input_terminated": True},
+        )
+        assert response.status_code == status
+
+
+def test_probes_do_not_read_the_input_stream(client):
+    """Test that requests other than form submissions skip the chunked-body check."""
+    import io
+
+    class UnreadableStream(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("the request body was read")
+
+        readinto = readline = read
+
+    for path in ("/health/live", "/health", "/"):
+        response = client.get(
+            path,
+            input_stream=UnreadableStream(),
+            # As gunicorn passes on every request
+            headers={"Transfer-Encoding": "chunked"},
+            environ_overrides={"wsgi.input_terminated": True},
+        )
+        assert response.status_code in (200, 503)
+
+
+def test_form_timings_only_recorded_when_profiling(client):
+    """Test that form validations only time their stages with OIDCHECK_PROFILE."""
+    from oidcheck.profiling import NULL_TIMER
+
+    for enabled in (False, True):
+        with patch("oidcheck.server.PROFILE_REQUESTS", enabled):
+            with patch("oidcheck.server.validate_config", return_value=[]) as mock:
+                client.post("/", data={"config": "CLIENT_ID=x", "level": "quick"})
+        assert (mock.call_args.args[1] is NULL_TIMER) is not enabled
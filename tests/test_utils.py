@@ -1,4 +1,10 @@
-from oidcheck.utils import format_validation_results, load_config_from_file
+import pytest
+from oidcheck.utils import (
+    REDACTED,
+    format_validation_results,
+    load_config_from_file,
+    parse_config_text,
+)
 from unittest.mock import patch
 
 
@@ -94,3 +100,117 @@ def test_load_config_from_file_with_empty_values():
         assert config["CLIENT_ID"] == ""
         assert config["CLIENT_SECRET"] is None
         assert config["TENANT_ID"] == "test-tenant-id"
+
+
+def test_iter_validation_results_is_lazy():
+    """Test that streaming formatting consumes results one at a time."""
+    from oidcheck.utils import iter_validation_results
+
+    def results():
+        yield {"level": "INFO", "message": "Test info message"}
+        raise AssertionError("results consumed eagerly")
+
+    chunks = iter_validation_results(results(), output_format="text")
+    assert next(chunks) == "[INFO] Test info message\n"
+
+
+def test_iter_validation_results_formats():
+    """Test streaming JSON, NDJSON and HTML formatting."""
+    import json
+    from oidcheck.utils import iter_validation_results
+
+    results = [
+        {"level": "INFO", "message": "Test info message"},
+        {"level": "WARNING", "message": "Test warning message"},
+    ]
+
+    assert json.loads("".join(iter_validation_results(results, "json"))) == results
+    assert json.loads("".join(iter_validation_results([], "json"))) == []
+    ndjson = "".join(iter_validation_results(results, "ndjson")).splitlines()
+    assert [json.loads(line) for line in ndjson] == results
+    html = "".join(iter_validation_results(results, "html"))
+    assert 'class="result-warning"' in html
+
+
+def test_locate_keys(tmp_path):
+    """Test finding the line of each key in a .env file."""
+    from oidcheck.utils import locate_keys
+
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "# comment\nCLIENT_ID=abc\n\nexport AUTHORITY = https://x/y\nSCOPE=a\nSCOPE=b\n"
+    )
+
+    assert locate_keys(str(env_file)) == {"client_id": 2, "authority": 4, "scope": 6}
+    assert locate_keys(str(tmp_path / "missing.env")) == {}
+
+
+def test_format_validation_results_sarif_and_junit():
+    """Test the SARIF and JUnit formats for a single file."""
+    import json
+
+    results = [
+        {"level": "WARNING", "rule": "log-level-sensitive", "message": "DEBUG"},
+    ]
+
+    sarif = json.loads(
+        format_validation_results(results, "sarif", "app.env", {"log_level": 7})
+    )
+    result = sarif["runs"][0]["results"][0]
+    assert result["ruleId"] == "log-level-sensitive"
+    location = result["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "app.env"
+    assert location["region"]["startLine"] == 7
+
+    junit = format_validation_results(results, "junit", "app.env")
+    assert '<testsuite name="app.env" tests="1" failures="1"' in junit
+
+
+def test_parse_config_text():
+    """Test that parsing matches splitting lines on the first "=" and stripping."""
+    text = " a = b = c \r\nno equals\r\n=y\n\nk=\n  z=1  \ra=2"
+    expected = {}
+    for line in text.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            expected[key.strip()] = value.strip()
+
+    parsed = parse_config_text(text)
+    assert parsed.values == expected
+    assert parsed.redacted_text is text
+    assert parsed.secrets == ()
+
+
+@pytest.mark.parametrize(
+    "line_break", ["\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029"]
+)
+def test_parse_config_text_splits_lines_like_splitlines(line_break):
+    """Test that every line boundary of str.splitlines() ends a line."""
+    text = f"a=1{line_break}b=2{line_break}CLIENT_SECRET=s3cr3t-value{line_break}c"
+    assert len(text.splitlines()) == 4
+
+    parsed = parse_config_text(text)
+    assert parsed.values == {"a": "1", "b": "2", "CLIENT_SECRET": "s3cr3t-value"}
+    assert parsed.redacted_text == (
+        f"a=1{line_break}b=2{line_break}CLIENT_SECRET={REDACTED}{line_break}c"
+    )
+
+
+def test_parse_config_text_redacts_secrets():
+    """Test that secret values are redacted, except Key Vault references."""
+    reference = "@Microsoft.KeyVault(VaultName=v;SecretName=s)"
+    text = (
+        "CLIENT_ID=x\nCLIENT_SECRET= s3cr3t-value \nAPI_TOKEN=abc\n"
+        f"PASSWORD=\nvault_secret={reference}"
+    )
+    parsed = parse_config_text(text)
+    assert parsed.values["CLIENT_SECRET"] == "s3cr3t-value"
+    assert parsed.redacted_text == (
+        f"CLIENT_ID=x\nCLIENT_SECRET= {REDACTED} \nAPI_TOKEN={REDACTED}\n"
+        f"PASSWORD=\nvault_secret={reference}"
+    )
+    # Values too short to search for in messages are only redacted in the text
+    assert parsed.secrets == ("s3cr3t-value",)
+    assert parsed.redact("bad secret s3cr3t-value, abc") == (
+        f"bad secret {REDACTED}, abc"
+    )
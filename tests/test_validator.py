@@ -1,7 +1,15 @@
 # tests/test_validator.py
 import pytest
 from oidcheck.models import AppConfig
-from oidcheck.validator import validate_config
+from oidcheck.validator import validate_config, prime_authority_metadata
+
+
+@pytest.fixture(autouse=True)
+def forget_failed_discoveries(mocker):
+    """Keep failed discoveries of one test from being reported in the next."""
+    from oidcheck import validator
+
+    mocker.patch.object(validator, "_failed_discoveries", {})
 
 
 @pytest.fixture
@@ -89,3 +97,203 @@ def test_missing_openid_scope(base_config, mocker):
     config = AppConfig(**base_config)
     results = validate_config(config)
     assert any("SCOPE is missing 'openid'" in r["message"] for r in results)
+
+
+def test_prime_authority_metadata(mocker):
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    mock_msal_app.side_effect = [mocker.Mock(), ValueError("unreachable")]
+    status = prime_authority_metadata()
+    assert status == {
+        "https://login.microsoftonline.com/organizations": "ok",
+        "https://login.microsoftonline.us/organizations": "error",
+    }
+    assert all("http_cache" in c.kwargs for c in mock_msal_app.call_args_list)
+
+
+def test_quick_level_skips_msal(base_config, mocker):
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    config = AppConfig(**base_config)
+    results = validate_config(config, level="quick")
+    assert not mock_msal_app.called
+    assert not any(r["level"] in ["ERROR", "WARNING"] for r in results)
+
+
+def test_quick_level_rejects_malformed_authority(base_config, mocker):
+    mock_msal_app = mocker.patch("msal.ConfidentialClientApplication")
+    base_config["authority"] = "http://login.microsoftonline.com"
+    config = AppConfig(**base_config)
+    results = validate_config(config, level="quick")
+    assert not mock_msal_app.called
+    assert any(
+        r["level"] == "ERROR" and "AUTHORITY must be an https URL" in r["message"]
+        for r in results
+    )
+
+
+def test_full_level_generates_auth_url(base_config, mocker):
+    mock_app = mocker.Mock()
+    mock_app.initiate_auth_code_flow.return_value = {"auth_uri": "http://mock_auth_uri"}
+    mocker.patch("msal.ConfidentialClientApplication", return_value=mock_app)
+    config = AppConfig(**base_config)
+
+    assert not any(
+        "Generated Auth URL" in r["message"] for r in validate_config(config)
+    )
+    mock_app.initiate_auth_code_flow.assert_not_called()
+
+    results = validate_config(config, level="full")
+    assert any(
+        "Generated Auth URL: http://mock_auth_uri" in r["message"] for r in results
+    )
+
+
+def test_unknown_level(base_config):
+    config = AppConfig(**base_config)
+    with pytest.raises(ValueError, match="Unknown validation level"):
+        validate_config(config, level="exhaustive")
+
+
+def test_findings_have_stable_rule_ids(base_config, mocker):
+    from oidcheck.validator import FINDING_FIELDS
+
+    mocker.patch("msal.ConfidentialClientApplication")
+    base_config["log_level"] = "DEBUG"
+    base_config["scope"] = []
+    config = AppConfig(**base_config)
+    results = validate_config(config)
+    rules = [r["rule"] for r in results]
+    assert "log-level-sensitive" in rules
+    assert "scope-missing-openid" in rules
+    assert all(rule in FINDING_FIELDS for rule in rules)
+
+
+def test_secret_reference_skips_storage_recommendation(base_config):
+    """Test that a Key Vault reference is not told to move to Key Vault."""
+    base_config["client_secret"] = "@Microsoft.KeyVault(VaultName=v;SecretName=s)"
+    results = validate_config(AppConfig(**base_config), level="quick")
+    assert not any(r.get("rule") == "secret-storage" for r in results)
+
+
+def test_rule_options(base_config):
+    """Test the options a policy can pass to the redirect URI and authority rules."""
+    from oidcheck.profiling import NULL_TIMER
+    from oidcheck.validator import _check_authority, _check_redirect_uri
+
+    base_config["redirect_uri"] = "http://localhost:5000/callback"
+    config = AppConfig(**base_config)
+    assert _check_redirect_uri(config, NULL_TIMER)
+    assert _check_redirect_uri(config, NULL_TIMER, allow_http_localhost=True) == []
+
+    base_config["redirect_uri"] = "http://example.com/callback"
+    config = AppConfig(**base_config)
+    assert _check_redirect_uri(config, NULL_TIMER, allow_http_localhost=True)
+
+    rules = [r["rule"] for r in _check_authority(config, NULL_TIMER, True)]
+    assert "authority-not-us-gov" in rules
+    base_config["authority"] = "https://login.microsoftonline.us/test-tenant-id"
+    config = AppConfig(**base_config)
+    rules = [r["rule"] for r in _check_authority(config, NULL_TIMER, True)]
+    assert "authority-not-us-gov" not in rules
+
+
+def test_async_quick_validation_stays_on_event_loop(base_config, mocker):
+    """Test that rules without MSAL run inline, without a thread hop."""
+    import asyncio
+    from oidcheck.validator import validate_config_async
+
+    executor = mocker.patch("oidcheck.validator._blocking_executor")
+    config = AppConfig(**base_config)
+    results = asyncio.run(validate_config_async(config, level="quick"))
+    assert results == validate_config(config, level="quick")
+    executor.assert_not_called()
+
+
+def test_async_blocking_rules_use_msal_pool(base_config, mocker):
+    """Test that MSAL rules run on the bounded pool in the caller's context."""
+    import asyncio
+    import threading
+    from oidcheck.request_context import begin_request, end_request
+    from oidcheck.request_context import get_correlation_id
+    from oidcheck.validator import validate_config_async
+
+    seen = []
+
+    def build(**kwargs):
+        seen.append((threading.current_thread().name, get_correlation_id()))
+        return mocker.Mock()
+
+    mocker.patch("msal.ConfidentialClientApplication", side_effect=build)
+    token = begin_request("corr-1")
+    try:
+        results = asyncio.run(validate_config_async(AppConfig(**base_config)))
+    finally:
+        end_request(token)
+    assert any(r["rule"] == "msal-client-initialized" for r in results)
+    assert seen[0][0].startswith("oidcheck-msal")
+    assert seen[0][1] == "corr-1"
+
+
+def test_authority_discovery_runs_once_at_a_time(base_config, mocker):
+    """Test that clients for an uncached authority wait for the first one."""
+    import asyncio
+    import time
+    from oidcheck import validator
+
+    mocker.patch.object(validator, "_discovered", set())
+    spans = []
+
+    def build(**kwargs):
+        start = time.monotonic()
+        time.sleep(0.01)
+        spans.append((start, time.monotonic()))
+        return mocker.Mock()
+
+    mocker.patch("msal.ConfidentialClientApplication", side_effect=build)
+    configs = [AppConfig(**base_config) for _ in range(4)]
+    asyncio.run(validator.validate_multiple_configs(configs))
+    first, *others = sorted(spans)
+    assert len(others) == 3
+    assert all(start >= first[1] for start, _ in others)
+    assert base_config["authority"] in validator._discovered
+
+
+def test_msal_clients_share_a_pooled_session():
+    """Test that MSAL clients reuse one connection-pooling session by default."""
+    from oidcheck.validator import _msal_options
+
+    assert _msal_options()["http_client"] is _msal_options()["http_client"]
+
+
+def test_failed_discovery_is_remembered_briefly(base_config, mocker):
+    """Test that a failed discovery is reported again without retrying it."""
+    from oidcheck import validator
+
+    mocker.patch.object(validator, "_discovered", set())
+    build = mocker.patch(
+        "msal.ConfidentialClientApplication",
+        side_effect=ValueError("Unable to get authority configuration"),
+    )
+    clock = mocker.patch("oidcheck.validator.time.monotonic", return_value=100.0)
+    config = AppConfig(**base_config)
+
+    first = validate_config(config)
+    second = validate_config(config)
+    assert build.call_count == 1
+    assert [r for r in first if r["level"] == "ERROR"] == [
+        r for r in second if r["level"] == "ERROR"
+    ]
+
+    clock.return_value = 100.0 + validator.FAILED_DISCOVERY_TTL
+    validate_config(config)
+    assert build.call_count == 2
+
+
+def test_forked_children_get_their_own_session(mocker):
+    """Test that the pooled session and MSAL pool are not shared after fork."""
+    from oidcheck import validator
+
+    mocker.patch.object(validator, "_msal_session", None)
+    mocker.patch.object(validator, "_msal_executor", None)
+    parent = validator._pooled_session()
+    validator._reset_after_fork()
+    assert validator._pooled_session() is not parent